@@ -0,0 +1,338 @@
+"""
+Motor de logros (Achievement / UserAchievement)
+
+El catálogo de logros se mantiene en memoria como un índice inmutable,
+agrupado por requirement_type y ordenado por requirement_value: encontrar
+los umbrales alcanzados por un contador es una bisección, no un recorrido
+de filas con check_unlock().
+
+- Sello de versión: (cantidad de logros, último updated_at), verificado
+  como mucho cada ACHIEVEMENT_CATALOG_CHECK_SECONDS (igual que el catálogo
+  de animales en api/catalog.py).
+- evaluate_achievements(user_ids): tras un lote de eventos (guardar chat,
+  importar, generar imagen, nueva racha) lee los contadores de
+  UserProgress, calcula los logros nuevos y los aplica con un bulk_create
+  de UserAchievement y un bulk_update de UserProgress. El nivel se calcula
+  en forma cerrada (level_for_points), sin bucle de subidas de nivel.
+- Los logros de puntos ('total_points') se miden con los puntos acumulados
+  desde el nivel 1; cada recompensa puede cruzar nuevos umbrales, así que
+  se evalúan en cascada hasta que no hay más.
+- backfill_achievements(user_ids): evalúa a muchos usuarios con SQL de
+  conjuntos (INSERT ... SELECT por tipo de logro) y recalcula puntos y
+  niveles con dos UPDATE.
+"""
+
+import logging
+import threading
+import time
+from bisect import bisect_right
+from collections import namedtuple
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Case, F, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .backfill import uuid_sql
+from .models import (
+    Achievement, UserAchievement, UserProgress, User,
+    LEVEL_STEPS, LEVEL_THRESHOLDS, level_for_points,
+)
+from .principal import bump_principal
+
+logger = logging.getLogger(__name__)
+
+# Contador de UserProgress que mide cada requirement_type
+METRIC_FIELDS = {
+    'questions_asked': 'total_questions_asked',
+    'animals_explored': 'total_animals_explored',
+    'images_generated': 'total_images_generated',
+    'streak_days': 'longest_streak_days',
+    'sessions_completed': 'total_chats',
+}
+# Se mide con UserProgress.lifetime_points (cambia con las propias recompensas)
+POINTS_TYPE = 'total_points'
+
+AchievementEntry = namedtuple(
+    'AchievementEntry', ['id', 'code', 'requirement_type', 'requirement_value', 'points_reward']
+)
+
+
+class AchievementIndex:
+    """Índice inmutable del catálogo de logros: no se modifica, se reemplaza entero"""
+
+    def __init__(self, achievements, version):
+        """achievements: iterable de dicts con los campos de AchievementEntry"""
+        by_type = {}
+        for achievement in sorted(achievements, key=lambda a: (a['requirement_value'], a['code'])):
+            entry = AchievementEntry(**{field: achievement[field] for field in AchievementEntry._fields})
+            by_type.setdefault(entry.requirement_type, []).append(entry)
+
+        self.version = version
+        self.entries = {requirement_type: tuple(entries) for requirement_type, entries in by_type.items()}
+        self.values = {
+            requirement_type: tuple(entry.requirement_value for entry in entries)
+            for requirement_type, entries in self.entries.items()
+        }
+        self.max_points = sum(entry.points_reward for entries in self.entries.values() for entry in entries)
+
+    def reached(self, requirement_type, value):
+        """Logros del tipo con requirement_value <= value"""
+        values = self.values.get(requirement_type, ())
+        return self.entries.get(requirement_type, ())[:bisect_right(values, value)]
+
+    def crossed(self, requirement_type, before, after):
+        """Logros del tipo cuyo umbral se cruzó al pasar de before a after"""
+        values = self.values.get(requirement_type, ())
+        return self.entries.get(requirement_type, ())[bisect_right(values, before):bisect_right(values, after)]
+
+    def __len__(self):
+        return sum(len(entries) for entries in self.entries.values())
+
+
+# ===========================
+# ÍNDICE COMPARTIDO POR WORKER
+# ===========================
+
+_index = None
+_next_check = 0.0
+_lock = threading.Lock()
+
+
+def _catalog_version():
+    from django.db.models import Count, Max
+
+    stamp = Achievement.objects.aggregate(count=Count('id'), updated=Max('updated_at'))
+    return f"{stamp['count']}:{stamp['updated'].isoformat() if stamp['updated'] else '-'}"
+
+
+def _load_index(version):
+    achievements = Achievement.objects.values(*AchievementEntry._fields)
+    index = AchievementIndex(list(achievements), version)
+    logger.info("🏆 Catálogo de logros cargado: %s logros (versión %s)", len(index), version)
+    return index
+
+
+def get_index():
+    """Índice actual; verifica la versión como mucho cada ACHIEVEMENT_CATALOG_CHECK_SECONDS"""
+    global _index, _next_check
+    from django.conf import settings
+
+    index = _index
+    if index is not None and time.monotonic() < _next_check:
+        return index
+
+    with _lock:
+        if _index is not None and time.monotonic() < _next_check:
+            return _index
+        version = _catalog_version()
+        if _index is None or _index.version != version:
+            _index = _load_index(version)
+        _next_check = time.monotonic() + settings.ACHIEVEMENT_CATALOG_CHECK_SECONDS
+        return _index
+
+
+def invalidate():
+    """Fuerza a verificar la versión en el próximo uso (p. ej. tras load_achievements)"""
+    global _next_check
+    _next_check = 0.0
+
+
+# ===========================
+# EVALUACIÓN POR EVENTOS
+# ===========================
+
+def _new_unlocks(index, progress, unlocked):
+    """Logros que progress alcanza y aún no están en unlocked: [(entry, valor medido)]"""
+    new = [
+        (entry, getattr(progress, field))
+        for requirement_type, field in METRIC_FIELDS.items()
+        for entry in index.reached(requirement_type, getattr(progress, field))
+        if entry.id not in unlocked
+    ]
+
+    # Puntos: primero los umbrales ya alcanzados, luego los que cruzan las recompensas
+    before = progress.lifetime_points
+    points = before + sum(entry.points_reward for entry, _ in new)
+    candidates = index.reached(POINTS_TYPE, points)
+    while candidates:
+        crossed = [entry for entry in candidates if entry.id not in unlocked]
+        new.extend((entry, points) for entry in crossed)
+        before, points = points, points + sum(entry.points_reward for entry in crossed)
+        candidates = index.crossed(POINTS_TYPE, before, points)
+    return new
+
+
+def _apply_unlocks(index, user_ids, now):
+    """Una transacción por lote: filas de progreso bloqueadas, un bulk_create y un bulk_update"""
+    fields = ['user_id', 'total_points', 'current_level', 'points_to_next_level', *METRIC_FIELDS.values()]
+
+    with transaction.atomic():
+        rows = list(
+            UserProgress.objects.select_for_update()
+            .filter(user_id__in=user_ids).order_by('user_id').only(*fields)
+        )
+        if not rows:
+            return {}
+
+        unlocked = {}
+        for user_id, achievement_id in UserAchievement.objects.filter(
+            user_id__in=[progress.user_id for progress in rows], is_unlocked=True
+        ).values_list('user_id', 'achievement_id'):
+            unlocked.setdefault(user_id, set()).add(achievement_id)
+
+        achievements = []
+        changed = []
+        result = {}
+        for progress in rows:
+            new = _new_unlocks(index, progress, unlocked.get(progress.user_id, ()))
+            if not new:
+                continue
+            reward = sum(entry.points_reward for entry, _ in new)
+            progress.current_level, progress.total_points, progress.points_to_next_level = level_for_points(
+                progress.lifetime_points + reward
+            )
+            progress.updated_at = now
+            changed.append(progress)
+            achievements.extend(
+                UserAchievement(
+                    user_id=progress.user_id, achievement_id=entry.id,
+                    current_progress=value, required_progress=entry.requirement_value,
+                    is_unlocked=True, unlocked_at=now,
+                )
+                for entry, value in new
+            )
+            result[progress.user_id] = [entry.code for entry, _ in new]
+
+        if achievements:
+            UserAchievement.objects.bulk_create(
+                achievements,
+                update_conflicts=True,
+                unique_fields=['user', 'achievement'],
+                update_fields=['current_progress', 'required_progress', 'is_unlocked', 'unlocked_at', 'updated_at'],
+            )
+            UserProgress.objects.bulk_update(
+                changed, ['total_points', 'current_level', 'points_to_next_level', 'updated_at']
+            )
+    return result
+
+
+def evaluate_achievements(user_ids, now=None):
+    """
+    Evalúa los logros de estos usuarios tras un lote de eventos y aplica los
+    desbloqueos (dos requests concurrentes no otorgan la misma recompensa
+    dos veces: las filas de progreso se bloquean).
+    Retorna {user_id: [códigos desbloqueados]} solo con los usuarios que ganaron algo.
+    """
+    if not user_ids:
+        return {}
+
+    index = get_index()
+    if not len(index):
+        return {}
+
+    try:
+        result = _apply_unlocks(index, user_ids, now or timezone.now())
+    except IntegrityError:
+        # Un logro del índice se borró del catálogo: se recarga y el próximo evento lo corrige
+        logger.warning("Catálogo de logros desactualizado; se recarga en el próximo uso")
+        invalidate()
+        return {}
+
+    bump_principal(list(result))
+    for user_id, codes in result.items():
+        logger.info("🏆 Logros desbloqueados para %s: %s", user_id, ', '.join(codes))
+    return result
+
+
+# ===========================
+# BACKFILL (SQL DE CONJUNTOS)
+# ===========================
+
+def _level_case(max_points, pick, default):
+    """CASE sobre total_points (acumulados) con un When por nivel alcanzable, del mayor al menor"""
+    levels = [index for index, threshold in enumerate(LEVEL_THRESHOLDS) if threshold <= max_points]
+    return Case(
+        *[When(total_points__gte=LEVEL_THRESHOLDS[index], then=Value(pick(index))) for index in reversed(levels)],
+        default=Value(default),
+    )
+
+
+def backfill_achievements(user_ids):
+    """
+    Evalúa todos los logros de estos usuarios en la base, sin traer filas a
+    Python: un INSERT ... SELECT por requirement_type (contadores de
+    user_progress contra el catálogo) y uno por logro de puntos, en orden
+    ascendente. Luego recalcula puntos y nivel desde las recompensas.
+    Idempotente. Retorna la cantidad de logros desbloqueados.
+    """
+    if not user_ids:
+        return 0
+
+    index = get_index()
+    now = timezone.now()
+    progress_table = UserProgress._meta.db_table
+    achievements_table = Achievement._meta.db_table
+    user_achievements = UserAchievement._meta.db_table
+    prep_user = User._meta.pk.get_db_prep_value
+    prep_date = UserAchievement._meta.get_field('unlocked_at').get_db_prep_value
+    prep_id = Achievement._meta.pk.get_db_prep_value
+    users = [prep_user(user_id, connection) for user_id in user_ids]
+    in_users = ', '.join(['%s'] * len(users))
+    stamp = prep_date(now, connection)
+
+    insert = (
+        f"INSERT INTO {user_achievements} "
+        f"(id, user_id, achievement_id, current_progress, required_progress, is_unlocked, unlocked_at, created_at, updated_at) "
+        f"{{select}} "
+        f"ON CONFLICT (user_id, achievement_id) DO UPDATE SET "
+        f"current_progress = EXCLUDED.current_progress, is_unlocked = EXCLUDED.is_unlocked, "
+        f"unlocked_at = EXCLUDED.unlocked_at, updated_at = EXCLUDED.updated_at "
+        f"WHERE {user_achievements}.is_unlocked = %s"
+    )
+    lifetime_points = (
+        f"(SELECT COALESCE(SUM(a.points_reward), 0) FROM {user_achievements} ua "
+        f"JOIN {achievements_table} a ON a.id = ua.achievement_id "
+        f"WHERE ua.user_id = p.user_id AND ua.is_unlocked = %s)"
+    )
+
+    unlocked = 0
+    with transaction.atomic(), connection.cursor() as cursor:
+        for requirement_type, field in METRIC_FIELDS.items():
+            if requirement_type not in index.entries:
+                continue
+            column = connection.ops.quote_name(field)
+            cursor.execute(insert.format(select=(
+                f"SELECT {uuid_sql()}, p.user_id, a.id, p.{column}, a.requirement_value, %s, %s, %s, %s "
+                f"FROM {progress_table} p "
+                f"JOIN {achievements_table} a ON a.requirement_type = %s AND p.{column} >= a.requirement_value "
+                f"WHERE p.user_id IN ({in_users})"
+            )), [True, stamp, stamp, stamp, requirement_type, *users, False])
+            unlocked += cursor.rowcount
+
+        # Cada logro de puntos suma recompensa para el siguiente: de menor a mayor
+        for entry in index.entries.get(POINTS_TYPE, ()):
+            cursor.execute(insert.format(select=(
+                f"SELECT {uuid_sql()}, p.user_id, %s, {lifetime_points}, %s, %s, %s, %s, %s "
+                f"FROM {progress_table} p "
+                f"WHERE p.user_id IN ({in_users}) AND {lifetime_points} >= %s"
+            )), [
+                prep_id(entry.id, connection), True, entry.requirement_value, True, stamp, stamp, stamp,
+                *users, True, entry.requirement_value, False,
+            ])
+            unlocked += cursor.rowcount
+
+        # Puntos acumulados -> (nivel, puntos en el nivel, puntos al siguiente) en dos UPDATE
+        progress = UserProgress.objects.filter(user_id__in=user_ids)
+        progress.update(total_points=Coalesce(Subquery(
+            UserAchievement.objects.filter(user_id=OuterRef('user_id'), is_unlocked=True)
+            .values('user_id').annotate(total=Sum('achievement__points_reward')).values('total')[:1]
+        ), 0))
+        # (todas las columnas del SET leen el total_points acumulado, anterior al UPDATE)
+        progress.update(
+            current_level=_level_case(index.max_points, lambda level: level + 1, 1),
+            points_to_next_level=_level_case(index.max_points, lambda level: LEVEL_STEPS[level], LEVEL_STEPS[0]),
+            total_points=F('total_points') - _level_case(index.max_points, lambda level: LEVEL_THRESHOLDS[level], 0),
+            updated_at=now,
+        )
+    return unlocked
@@ -0,0 +1,189 @@
+"""
+Actividad diaria por usuario (rollups para las gráficas del dashboard)
+
+Una fila por (usuario, día local) en user_daily_activity con mensajes,
+preguntas, animales nuevos, imágenes y segundos de voz (TTS).
+
+- record_daily_activity(user_id, messages=3, ...): un único upsert
+
+      INSERT ... ON CONFLICT (user_id, day)
+      DO UPDATE SET messages = user_daily_activity.messages + EXCLUDED.messages
+
+  llamado por las mismas escrituras que mueven los contadores de progreso.
+  Borrar un chat no resta: la tabla registra actividad, no contenido.
+- rebuild_daily_activity(user_ids): recalcula mensajes, preguntas y animales
+  nuevos desde chat_messages y animals_explored (GROUP BY día en la zona
+  horaria de cada usuario). Imágenes y TTS no se guardan en otra tabla y se
+  conservan tal cual.
+- activity_series(user_id, start, end, bucket): lee solo los rollups del
+  rango (una fila por día con actividad, por índice) y agrupa por día,
+  semana o mes en Python: un año de gráficas son unas decenas de filas.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Q
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import AnimalExplored, ChatMessage, DailyActivity, User, UserSettings
+from .streaks import get_zone, user_zone
+
+ACTIVITY_FIELDS = ('messages', 'questions', 'new_animals', 'images', 'tts_seconds')
+BUCKETS = ('day', 'week', 'month')
+
+# Google TTS devuelve MP3 a 32 kbps: la duración sale del tamaño del audio
+TTS_MP3_BYTES_PER_SECOND = 32000 / 8
+
+
+def tts_seconds(audio_content):
+    """Duración aproximada (segundos) de un MP3 de Google TTS"""
+    return len(audio_content) / TTS_MP3_BYTES_PER_SECOND
+
+
+def local_today(user_id, now=None):
+    """Fecha de hoy en la zona horaria del usuario"""
+    return (now or timezone.now()).astimezone(user_zone(user_id)).date()
+
+
+def _upsert_activity_sql(fields):
+    table = connection.ops.quote_name(DailyActivity._meta.db_table)
+    columns = ', '.join(ACTIVITY_FIELDS)
+    values = ', '.join(['%s'] * (len(ACTIVITY_FIELDS) + 2))
+    updates = ', '.join(f"{field} = {table}.{field} + EXCLUDED.{field}" for field in fields)
+    return (
+        f"INSERT INTO {table} (user_id, day, {columns}) VALUES ({values}) "
+        f"ON CONFLICT (user_id, day) DO UPDATE SET {updates}"
+    )
+
+
+def record_daily_activity(user_id, now=None, **deltas):
+    """
+    Suma deltas a la fila de hoy del usuario en una sola sentencia:
+        record_daily_activity(user.id, messages=12, questions=6, new_animals=1)
+    """
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    unknown = set(deltas) - set(ACTIVITY_FIELDS)
+    if unknown:
+        raise ValueError(f"Campos de actividad desconocidos: {', '.join(sorted(unknown))}")
+
+    prep_user = DailyActivity._meta.get_field('user').target_field.get_db_prep_value
+    prep_day = DailyActivity._meta.get_field('day').get_db_prep_value
+    params = [
+        prep_user(user_id, connection),
+        prep_day(local_today(user_id, now), connection),
+        *(deltas.get(field, 0) for field in ACTIVITY_FIELDS),
+    ]
+    with connection.cursor() as cursor:
+        cursor.execute(_upsert_activity_sql(sorted(deltas)), params)
+
+
+# ===========================
+# RECONSTRUCCIÓN (BACKFILL)
+# ===========================
+
+def rebuild_daily_activity(user_ids):
+    """
+    Recalcula messages, questions y new_animals de estos usuarios desde las
+    tablas, agrupando por día en la zona horaria de cada uno (una consulta
+    agregada por zona horaria en uso). Retorna la cantidad de días escritos.
+    """
+    if not user_ids:
+        return 0
+
+    user_ids = [User._meta.pk.to_python(user_id) for user_id in user_ids]
+    zones = dict(
+        UserSettings.objects.filter(user_id__in=user_ids).values_list('user_id', 'user_timezone')
+    )
+    by_zone = {}
+    for user_id in user_ids:
+        by_zone.setdefault(zones.get(user_id) or settings.TIME_ZONE, []).append(user_id)
+
+    days = {}
+
+    def add(user_id, day, **values):
+        row = days.setdefault((user_id, day), {'messages': 0, 'questions': 0, 'new_animals': 0})
+        row.update(values)
+
+    for zone_name, ids in by_zone.items():
+        zone = get_zone(zone_name)
+        messages = (
+            ChatMessage.objects.filter(chat__user_id__in=ids)
+            .annotate(day=TruncDate('created_at', tzinfo=zone))
+            .values('chat__user_id', 'day')
+            .annotate(messages=Count('pk'), questions=Count('pk', filter=Q(role='user')))
+            .order_by()
+        )
+        for row in messages:
+            add(row['chat__user_id'], row['day'], messages=row['messages'], questions=row['questions'])
+
+        animals = (
+            AnimalExplored.objects.filter(user_id__in=ids)
+            .annotate(day=TruncDate('first_explored_at', tzinfo=zone))
+            .values('user_id', 'day')
+            .annotate(new_animals=Count('pk'))
+            .order_by()
+        )
+        for row in animals:
+            add(row['user_id'], row['day'], new_animals=row['new_animals'])
+
+    with transaction.atomic():
+        DailyActivity.objects.filter(user_id__in=user_ids).update(messages=0, questions=0, new_animals=0)
+        DailyActivity.objects.bulk_create(
+            [DailyActivity(user_id=user_id, day=day, **values) for (user_id, day), values in days.items()],
+            update_conflicts=True,
+            unique_fields=['user', 'day'],
+            update_fields=['messages', 'questions', 'new_animals'],
+            batch_size=500,
+        )
+    return len(days)
+
+
+# ===========================
+# LECTURA POR RANGO
+# ===========================
+
+def _bucket_start(day, bucket):
+    if bucket == 'week':
+        return day - timedelta(days=day.weekday())
+    if bucket == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def _next_bucket(start, bucket):
+    if bucket == 'week':
+        return start + timedelta(days=7)
+    if bucket == 'month':
+        return (start + timedelta(days=32)).replace(day=1)
+    return start + timedelta(days=1)
+
+
+def activity_series(user_id, start, end, bucket='day'):
+    """
+    Serie densa (con ceros) de start a end inclusive, agrupada por día,
+    semana (lunes) o mes: [{"date": date, "messages": n, ...}, ...]
+    """
+    rows = (
+        DailyActivity.objects.filter(user_id=user_id, day__gte=start, day__lte=end)
+        .order_by('day')
+        .values('day', *ACTIVITY_FIELDS)
+    )
+    totals = {}
+    for row in rows:
+        bucket_totals = totals.setdefault(_bucket_start(row['day'], bucket), dict.fromkeys(ACTIVITY_FIELDS, 0))
+        for field in ACTIVITY_FIELDS:
+            bucket_totals[field] += row[field]
+
+    series = []
+    current = _bucket_start(start, bucket)
+    while current <= end:
+        values = totals.get(current, dict.fromkeys(ACTIVITY_FIELDS, 0))
+        values['tts_seconds'] = round(values['tts_seconds'], 1)
+        series.append({'date': current, **values})
+        current = _next_bucket(current, bucket)
+    return series
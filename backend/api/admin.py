@@ -1,8 +1,8 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from .models import (
-    User, UserSettings, Chat, ChatMessage, UserProgress,
-    AnimalExplored, GeneratedImage, Achievement, UserAchievement, GuestSession
+    User, UserSettings, Chat, ChatMessage, ImageBlob, UserProgress,
+    Animal, AnimalExplored, GeneratedImage, Achievement, UserAchievement, GuestSession
 )
 
 
@@ -83,6 +83,16 @@ class ChatMessageAdmin(admin.ModelAdmin):
     get_text_preview.short_description = 'Texto'
 
 
+@admin.register(ImageBlob)
+class ImageBlobAdmin(admin.ModelAdmin):
+    list_display = ['sha256', 'mime_type', 'size_bytes', 'created_at']
+    list_filter = ['mime_type']
+    search_fields = ['sha256']
+    readonly_fields = ['sha256', 'mime_type', 'size_bytes', 'created_at']
+    exclude = ['data']
+    ordering = ['-created_at']
+
+
 # ===========================
 # MODELOS ELIMINADOS
 # ===========================
@@ -106,6 +116,29 @@ class UserProgressAdmin(admin.ModelAdmin):
     readonly_fields = ['created_at', 'updated_at']
 
 
+# ===========================
+# ANIMAL CATALOG ADMIN
+# ===========================
+
+@admin.register(Animal)
+class AnimalAdmin(admin.ModelAdmin):
+    list_display = ['name', 'english_name', 'emoji', 'category', 'is_active', 'updated_at']
+    list_filter = ['category', 'is_active']
+    search_fields = ['name', 'english_name', 'slug']
+    readonly_fields = ['updated_at']
+    ordering = ['name']
+
+    def save_model(self, request, obj, form, change):
+        from .catalog import invalidate
+        super().save_model(request, obj, form, change)
+        invalidate()  # este worker lo ve al instante; el resto en ANIMAL_CATALOG_CHECK_SECONDS
+
+    def delete_model(self, request, obj):
+        from .catalog import invalidate
+        super().delete_model(request, obj)
+        invalidate()
+
+
 # ===========================
 # ANIMALS EXPLORED ADMIN
 # ===========================
@@ -7,7 +7,7 @@ from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
-from rest_framework_simplejwt.tokens import RefreshToken
+from django.conf import settings
 from django.contrib.auth import login, logout
 from django.utils import timezone
 
@@ -15,7 +15,9 @@ from .serializers import (
     RegisterSerializer, LoginSerializer, UserSerializer,
     GuestSessionSerializer
 )
-from .models import User, GuestSession
+from .models import User
+from .guest_sessions import read_guest_session, record_guest_activity
+from .revocation import RefreshToken
 
 
 # ===========================
@@ -194,13 +196,13 @@ def guest_session_view(request):
     serializer = GuestSessionSerializer(data=request.data)
     
     if serializer.is_valid():
-        session = serializer.save()
+        guest = serializer.save()
         
         return Response({
-            'guest_token': session.session_token,
-            'nickname': session.user_nickname,
-            'expires_at': session.expires_at,
-            'message': 'Sesión de invitado creada. Válida por 24 horas.'
+            'guest_token': guest.session_token,
+            'nickname': guest.nickname,
+            'expires_at': guest.expires_at,
+            'message': f'Sesión de invitado creada. Válida por {settings.GUEST_SESSION_HOURS} horas.'
         }, status=status.HTTP_201_CREATED)
     
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -214,6 +216,9 @@ def verify_guest_session_view(request):
     
     GET /api/auth/guest/verify?token=...
     
+    Los tokens firmados se verifican sin tocar la base; la actividad (si
+    GUEST_ACTIVITY_TRACKING) se escribe después, en lotes.
+    
     Response: {
         "valid": true/false,
         "nickname": "Invitado Curioso",
@@ -228,31 +233,28 @@ def verify_guest_session_view(request):
             'error': 'Token no proporcionado'
         }, status=status.HTTP_400_BAD_REQUEST)
     
-    try:
-        session = GuestSession.objects.get(session_token=token)
-        
-        if session.is_expired():
-            session.delete()
-            return Response({
-                'valid': False,
-                'error': 'Sesión expirada'
-            }, status=status.HTTP_401_UNAUTHORIZED)
-        
-        # Actualizar última actividad
-        session.last_activity_at = timezone.now()
-        session.save()
-        
-        return Response({
-            'valid': True,
-            'nickname': session.user_nickname,
-            'expires_at': session.expires_at
-        }, status=status.HTTP_200_OK)
+    guest = read_guest_session(token)
     
-    except GuestSession.DoesNotExist:
+    if guest is None:
         return Response({
             'valid': False,
             'error': 'Sesión no encontrada'
         }, status=status.HTTP_404_NOT_FOUND)
+    
+    if timezone.now() > guest.expires_at:
+        # Las filas vencidas las borra cleanup_guest_sessions
+        return Response({
+            'valid': False,
+            'error': 'Sesión expirada'
+        }, status=status.HTTP_401_UNAUTHORIZED)
+    
+    record_guest_activity(guest)
+    
+    return Response({
+        'valid': True,
+        'nickname': guest.nickname,
+        'expires_at': guest.expires_at
+    }, status=status.HTTP_200_OK)
 
 
 # ===========================
@@ -0,0 +1,64 @@
+"""
+Autenticación JWT
+
+- CachedJWTAuthentication: la de DRF, pero el usuario sale del principal
+  en caché (api/principal.py) en lugar de un SELECT por request.
+- Las vistas Django "planas" (generate_image, tts) y los decoradores que
+  corren antes de @api_view necesitan saber quién hace la request sin cargar
+  el usuario desde la base: el JWT ya trae el id y el claim is_guest.
+"""
+
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import UntypedToken
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .principal import get_principal
+
+BEARER_PREFIX = 'Bearer '
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication con el usuario (y su settings/progress) desde get_principal"""
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        user = get_principal(user_id)
+        if user is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        return user
+
+
+def get_token_claims(request):
+    """Claims del access token válido de la request, o None (sin consultar la base)"""
+    auth = request.META.get('HTTP_AUTHORIZATION', '')
+    if not auth.startswith(BEARER_PREFIX):
+        return None
+    try:
+        return UntypedToken(auth[len(BEARER_PREFIX):]).payload
+    except TokenError:
+        return None
+
+
+def get_token_user_id(request, include_guests=True):
+    """Id del usuario del JWT, o None si no hay token válido (o es invitado y include_guests=False)"""
+    claims = get_token_claims(request)
+    if claims is None:
+        return None
+    if not include_guests and claims.get('is_guest'):
+        return None
+    return claims.get(api_settings.USER_ID_CLAIM)
@@ -0,0 +1,244 @@
+"""
+Recalcular la exploración de animales desde el historial de chats
+
+Cuando cambia el catálogo de animales, `ChatMessage.animal_mentioned`,
+`ChatAnimal` y `AnimalExplored` quedan desactualizados. El backfill los
+reconstruye en dos fases, por partición de usuarios:
+
+1. messages:   recorre chat_messages por keyset (id) en lotes de `chunk_size`
+               con .iterator(), vuelve a detectar el animal con un índice
+               fijo del catálogo y hace bulk_update solo de los que cambiaron.
+2. aggregates: por lotes de usuarios, reconstruye chat_animals y
+               animals_explored con SQL de conjuntos (INSERT ... SELECT
+               ... GROUP BY / upsert), sin traer filas a Python, y
+               reconcilia los contadores de UserProgress.
+
+Particiones: el espacio de UUID de usuario se divide en N rangos contiguos
+del mismo tamaño (los uuid4 se reparten uniformemente), así N procesos
+pueden correr en paralelo sin pisarse.
+
+Checkpoint: tras cada lote se guarda el progreso en un archivo JSON
+(escritura atómica); al reanudar se continúa desde el último id procesado.
+Ambas fases son idempotentes: repetir un lote no cambia el resultado.
+"""
+
+import json
+import logging
+import os
+import time
+import uuid
+
+from django.db import connection, transaction
+
+from .catalog import get_index
+from .counters import reconcile_progress
+from .models import User, Chat, ChatMessage, ChatAnimal, AnimalExplored
+
+logger = logging.getLogger(__name__)
+
+PHASE_MESSAGES = 'messages'
+PHASE_AGGREGATES = 'aggregates'
+PHASE_DONE = 'done'
+
+
+# ===========================
+# PARTICIONES Y CHECKPOINT
+# ===========================
+
+def partition_bounds(partition, partitions):
+    """(desde, hasta) de UUID de usuario para la partición; hasta=None en la última"""
+    if not 0 <= partition < partitions:
+        raise ValueError(f"Partición {partition} fuera de rango (0..{partitions - 1})")
+    low = uuid.UUID(int=partition * (1 << 128) // partitions)
+    high = None if partition == partitions - 1 else uuid.UUID(int=(partition + 1) * (1 << 128) // partitions)
+    return low, high
+
+
+def new_checkpoint(partition, partitions):
+    return {
+        'partition': partition,
+        'partitions': partitions,
+        'catalog_version': get_index().version,
+        'phase': PHASE_MESSAGES,
+        'last_message_id': None,
+        'last_user_id': None,
+        'scanned': 0,
+        'updated': 0,
+        'users': 0,
+    }
+
+
+def load_checkpoint(path):
+    try:
+        with open(path, encoding='utf-8') as checkpoint_file:
+            return json.load(checkpoint_file)
+    except FileNotFoundError:
+        return None
+
+
+def save_checkpoint(path, checkpoint):
+    """Escritura atómica: un corte a mitad de escritura no deja un JSON roto"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as checkpoint_file:
+        json.dump(checkpoint, checkpoint_file)
+    os.replace(tmp_path, path)
+
+
+# ===========================
+# FASE 1: MENSAJES
+# ===========================
+
+def _user_range_filter(prefix, low, high):
+    lookups = {f'{prefix}__gte': low}
+    if high is not None:
+        lookups[f'{prefix}__lt'] = high
+    return lookups
+
+
+def backfill_messages(checkpoint, chunk_size, progress=None):
+    """
+    Re-detecta `animal_mentioned` en los mensajes de la partición.
+    Avanza checkpoint['last_message_id'] y llama a progress(checkpoint) por lote.
+    """
+    low, high = partition_bounds(checkpoint['partition'], checkpoint['partitions'])
+    lexicon = get_index().lexicon  # un índice fijo para toda la pasada
+    messages = ChatMessage.objects.filter(
+        chat__deleted_at__isnull=True, **_user_range_filter('chat__user_id', low, high)
+    ).order_by('id').only('id', 'text', 'animal_mentioned')
+
+    while True:
+        page = messages
+        if checkpoint['last_message_id']:
+            page = page.filter(id__gt=checkpoint['last_message_id'])
+
+        changed = []
+        last_id = None
+        scanned = 0
+        for message in page[:chunk_size].iterator(chunk_size=chunk_size):
+            scanned += 1
+            last_id = message.id
+            animal = lexicon.most_mentioned(message.text)
+            if animal != message.animal_mentioned:
+                message.animal_mentioned = animal
+                changed.append(message)
+        if not scanned:
+            return
+
+        if changed:
+            ChatMessage.objects.bulk_update(changed, ['animal_mentioned'], batch_size=chunk_size)
+        checkpoint['last_message_id'] = str(last_id)
+        checkpoint['scanned'] += scanned
+        checkpoint['updated'] += len(changed)
+        if progress:
+            progress(checkpoint)
+        if scanned < chunk_size:
+            return
+
+
+# ===========================
+# FASE 2: AGREGADOS (SQL DE CONJUNTOS)
+# ===========================
+
+def uuid_sql():
+    """Expresión SQL que genera un UUID nuevo (para filas insertadas con INSERT ... SELECT)"""
+    if connection.vendor == 'postgresql':
+        return 'gen_random_uuid()'
+    return 'lower(hex(randomblob(16)))'
+
+
+def rebuild_user_aggregates(user_ids):
+    """
+    Reconstruye chat_animals y animals_explored de un lote de usuarios a
+    partir de chat_messages.animal_mentioned, en una transacción.
+    Los favoritos se conservan aunque el animal ya no aparezca (quedan en 0).
+    """
+    if not user_ids:
+        return
+
+    messages = ChatMessage._meta.db_table
+    chats = Chat._meta.db_table
+    chat_animals = ChatAnimal._meta.db_table
+    explored = AnimalExplored._meta.db_table
+    prep_user = User._meta.pk.get_db_prep_value
+    users = [prep_user(user_id, connection) for user_id in user_ids]
+    in_users = ', '.join(['%s'] * len(users))
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {chat_animals} WHERE user_id IN ({in_users})", users)
+        cursor.execute(
+            f"""
+            INSERT INTO {chat_animals} (user_id, chat_id, animal_name, mentions, last_mentioned_at)
+            SELECT c.user_id, c.id, m.animal_mentioned, COUNT(*), c.updated_at
+            FROM {messages} m
+            JOIN {chats} c ON c.id = m.chat_id
+            WHERE c.user_id IN ({in_users})
+              AND c.deleted_at IS NULL
+              AND m.animal_mentioned IS NOT NULL
+            GROUP BY c.user_id, c.id, m.animal_mentioned, c.updated_at
+            """, users
+        )
+        cursor.execute(
+            f"""
+            INSERT INTO {explored}
+                (id, user_id, animal_name, times_explored, is_favorite, first_explored_at, last_explored_at)
+            SELECT {uuid_sql()}, a.user_id, a.animal_name, SUM(a.mentions), %s,
+                   MIN(c.created_at), MAX(a.last_mentioned_at)
+            FROM {chat_animals} a
+            JOIN {chats} c ON c.id = a.chat_id
+            WHERE a.user_id IN ({in_users})
+            GROUP BY a.user_id, a.animal_name
+            ON CONFLICT (user_id, animal_name) DO UPDATE SET
+                times_explored = EXCLUDED.times_explored,
+                last_explored_at = EXCLUDED.last_explored_at
+            """, [False, *users]
+        )
+        # Animales que ya no aparecen en ningún chat
+        stale = (
+            f"user_id IN ({in_users}) AND NOT EXISTS ("
+            f"SELECT 1 FROM {chat_animals} a "
+            f"WHERE a.user_id = {explored}.user_id AND a.animal_name = {explored}.animal_name)"
+        )
+        cursor.execute(f"DELETE FROM {explored} WHERE is_favorite = %s AND {stale}", [False, *users])
+        cursor.execute(f"UPDATE {explored} SET times_explored = 0 WHERE is_favorite = %s AND {stale}", [True, *users])
+
+    # Los contadores materializados de progreso dependen de estas tablas
+    reconcile_progress(user_ids)
+
+
+def backfill_aggregates(checkpoint, user_batch, progress=None):
+    """Reconstruye los agregados de los usuarios de la partición, por lotes (keyset por id)"""
+    low, high = partition_bounds(checkpoint['partition'], checkpoint['partitions'])
+    users = User.objects.filter(
+        is_guest=False, **_user_range_filter('id', low, high)
+    ).order_by('id').values_list('id', flat=True)
+
+    while True:
+        page = users
+        if checkpoint['last_user_id']:
+            page = page.filter(id__gt=checkpoint['last_user_id'])
+        user_ids = list(page[:user_batch])
+        if not user_ids:
+            return
+
+        rebuild_user_aggregates(user_ids)
+        checkpoint['last_user_id'] = str(user_ids[-1])
+        checkpoint['users'] += len(user_ids)
+        if progress:
+            progress(checkpoint)
+        if len(user_ids) < user_batch:
+            return
+
+
+def run_backfill(checkpoint, chunk_size, user_batch, progress=None):
+    """Ejecuta (o reanuda) las fases pendientes del checkpoint"""
+    if checkpoint['phase'] == PHASE_MESSAGES:
+        backfill_messages(checkpoint, chunk_size, progress)
+        checkpoint['phase'] = PHASE_AGGREGATES
+        if progress:
+            progress(checkpoint)
+    if checkpoint['phase'] == PHASE_AGGREGATES:
+        backfill_aggregates(checkpoint, user_batch, progress)
+        checkpoint['phase'] = PHASE_DONE
+        if progress:
+            progress(checkpoint)
+    return checkpoint
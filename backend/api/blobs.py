@@ -0,0 +1,149 @@
+"""
+Almacenamiento deduplicado de imágenes de chat
+
+Las imágenes base64 (data URLs) se guardan una sola vez en ImageBlob,
+con el SHA-256 del contenido como clave. Los mensajes guardan el hash y
+la API devuelve una URL /api/images/blob/<hash> cacheable para siempre.
+
+Los blobs se sirven públicamente, así que solo se aceptan imágenes PNG,
+JPEG, GIF y WebP: el tipo declarado debe estar permitido y los primeros
+bytes deben coincidir con una de esas firmas. El tipo guardado es el
+detectado en los bytes, nunca el que envía el cliente.
+"""
+
+import base64
+import binascii
+import hashlib
+import re
+
+from django.urls import reverse
+
+from .models import ImageBlob
+
+DATA_URL_RE = re.compile(r'^data:(?P<mime>[\w.+-]+/[\w.+-]+)?(?:;[^,]*)?;base64,', re.IGNORECASE)
+BLOB_URL_RE = re.compile(r'/images/blob/(?P<sha>[0-9a-f]{64})/?$')
+
+ALLOWED_IMAGE_TYPES = frozenset({'image/png', 'image/jpeg', 'image/gif', 'image/webp'})
+IMAGE_SIGNATURES = (
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+)
+
+
+class InvalidImage(ValueError):
+    """Data URL que no contiene una imagen PNG, JPEG, GIF o WebP"""
+
+
+def sniff_image_type(data):
+    """Tipo de imagen según los primeros bytes, o None si no es una imagen permitida"""
+    head = bytes(data[:12])
+    for signature, mime_type in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return mime_type
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image/webp'
+    return None
+
+
+def parse_data_url(value):
+    """
+    Decodifica una data URL base64 con una imagen.
+    Retorna (mime_type, bytes), o None si el valor no es una data URL.
+    Lanza InvalidImage si es una data URL pero no una imagen permitida.
+    """
+    if not value:
+        return None
+    match = DATA_URL_RE.match(value[:200])
+    if not match:
+        if value[:5].lower() == 'data:':
+            raise InvalidImage('Solo se aceptan imágenes en base64')
+        return None
+    declared = (match.group('mime') or 'image/png').lower()
+    if declared == 'image/jpg':
+        declared = 'image/jpeg'
+    if declared not in ALLOWED_IMAGE_TYPES:
+        raise InvalidImage(f'Tipo de imagen no permitido: {declared}')
+    try:
+        data = base64.b64decode(value[match.end():], validate=True)
+    except (binascii.Error, ValueError):
+        raise InvalidImage('Imagen base64 inválida')
+    mime_type = sniff_image_type(data)
+    if mime_type is None:
+        raise InvalidImage('El contenido no es una imagen PNG, JPEG, GIF o WebP')
+    return mime_type, data
+
+
+def store_blob(data, mime_type='image/png'):
+    """
+    Guarda los bytes si aún no existen y retorna su hash.
+    INSERT ... ON CONFLICT DO NOTHING: sin carreras y sin leer el blob existente.
+    """
+    sha = hashlib.sha256(data).hexdigest()
+    ImageBlob.objects.bulk_create(
+        [ImageBlob(sha256=sha, mime_type=mime_type, data=data, size_bytes=len(data))],
+        ignore_conflicts=True,
+    )
+    return sha
+
+
+def resolve_image_reference(image_url):
+    """
+    Normaliza el image_url recibido al guardar un mensaje (InvalidImage si
+    es una data URL que no es una imagen permitida).
+    Retorna (image_url, image_blob_id):
+    - data URL base64  -> (None, hash) guardando el blob
+    - URL de nuestro endpoint de blobs -> (None, hash) sin volver a guardar
+    - cualquier otra URL -> (url, None)
+    """
+    if not image_url:
+        return None, None
+    parsed = parse_data_url(image_url)
+    if parsed:
+        mime_type, data = parsed
+        return None, store_blob(data, mime_type)
+    match = BLOB_URL_RE.search(image_url)
+    if match and ImageBlob.objects.filter(pk=match.group('sha')).exists():
+        return None, match.group('sha')
+    return image_url, None
+
+
+def resolve_image_references(image_urls):
+    """
+    Versión por lotes de resolve_image_reference (importación masiva).
+    Una sola INSERT para todos los blobs nuevos y una sola lectura para
+    las URLs de blobs existentes. Retorna la lista de (image_url, image_blob_id).
+    Las data URLs deben venir ya validadas (ChatImportMessageSerializer).
+    """
+    results = []
+    new_blobs = {}
+    referenced = {}
+    for index, image_url in enumerate(image_urls):
+        results.append((image_url or None, None))
+        if not image_url:
+            continue
+        parsed = parse_data_url(image_url)
+        if parsed:
+            mime_type, data = parsed
+            sha = hashlib.sha256(data).hexdigest()
+            new_blobs.setdefault(sha, ImageBlob(sha256=sha, mime_type=mime_type, data=data, size_bytes=len(data)))
+            results[index] = (None, sha)
+            continue
+        match = BLOB_URL_RE.search(image_url)
+        if match:
+            referenced.setdefault(match.group('sha'), []).append(index)
+
+    if new_blobs:
+        ImageBlob.objects.bulk_create(new_blobs.values(), ignore_conflicts=True)
+    if referenced:
+        for sha in ImageBlob.objects.filter(pk__in=referenced).values_list('pk', flat=True):
+            for index in referenced[sha]:
+                results[index] = (None, sha)
+    return results
+
+
+def blob_url(sha, request=None):
+    """URL pública (absoluta si hay request) del blob"""
+    path = reverse('api:image_blob', args=[sha])
+    return request.build_absolute_uri(path) if request is not None else path
@@ -0,0 +1,172 @@
+"""
+Índice en memoria del catálogo de animales (modelo Animal)
+
+El catálogo vive en la base (sembrado por la migración 0011) y cada
+worker lo mantiene como un índice inmutable: léxico compilado para detectar
+animales en texto + datos por animal (traducción, emoji, categoría).
+
+- Se construye en el primer uso y se comparte entre requests/threads.
+- Sello de versión: (cantidad de animales, último updated_at). Cada worker
+  lo consulta como mucho cada ANIMAL_CATALOG_CHECK_SECONDS (una consulta
+  agregada barata) y solo reconstruye el índice si cambió. Los cambios
+  hechos desde el admin llegan a todos los workers sin reiniciar.
+- Si la base no está disponible (p. ej. antes de migrar) se usa la fixture.
+
+Uso:
+    detect_animal(texto)      -> "León" (el más mencionado) o None
+    count_animals(texto)      -> {"León": 2, "Tigre": 1}
+    find_animals(texto)       -> [AnimalMatch(...), ...]
+    translate_animal("León")  -> "lion"
+"""
+
+import json
+import logging
+import threading
+import time
+from collections import namedtuple
+from pathlib import Path
+from types import MappingProxyType
+
+from .lexicon import AnimalLexicon, EXCLUDED_CONTEXTS
+
+logger = logging.getLogger(__name__)
+
+FIXTURE_PATH = Path(__file__).resolve().parent / 'fixtures' / 'animals.json'
+
+AnimalEntry = namedtuple('AnimalEntry', ['slug', 'name', 'english_name', 'emoji', 'category'])
+
+
+class AnimalIndex:
+    """Índice inmutable del catálogo: no se modifica, se reemplaza entero"""
+
+    def __init__(self, animals, version):
+        """animals: iterable de dicts con los campos del modelo Animal"""
+        entries = {}
+        lexicon_entries = []
+        for animal in animals:
+            entry = AnimalEntry(
+                animal['slug'], animal['name'], animal['english_name'],
+                animal.get('emoji', ''), animal['category']
+            )
+            forms = [animal['name'], *animal.get('synonyms', []), *animal.get('plurals', [])]
+            entries[entry.name] = entry
+            lexicon_entries.append((entry.name, forms))
+
+        self.version = version
+        self.animals = MappingProxyType(entries)
+        self.lexicon = AnimalLexicon(lexicon_entries, EXCLUDED_CONTEXTS)
+
+    def get(self, name):
+        """AnimalEntry por nombre canónico, sinónimo o plural (sin tildes ni mayúsculas)"""
+        if not name:
+            return None
+        return self.animals.get(name) or self.animals.get(self.lexicon.most_mentioned(name))
+
+    def __len__(self):
+        return len(self.animals)
+
+
+def load_fixture_animals(path=FIXTURE_PATH):
+    """Animales de la fixture como dicts (sin base de datos)"""
+    with open(path, encoding='utf-8') as fixture:
+        records = json.load(fixture)
+    return [
+        {'slug': record['pk'], **record['fields']}
+        for record in records
+        if record['fields'].get('is_active', True)
+    ]
+
+
+# ===========================
+# ÍNDICE COMPARTIDO POR WORKER
+# ===========================
+
+_index = None
+_next_check = 0.0
+_lock = threading.Lock()
+
+
+def _catalog_version():
+    """Sello barato del catálogo; None si la tabla no está disponible"""
+    from django.db import DatabaseError
+    from django.db.models import Count, Max
+    from .models import Animal
+
+    try:
+        stamp = Animal.objects.aggregate(count=Count('slug'), updated=Max('updated_at'))
+    except DatabaseError:
+        return None
+    return f"{stamp['count']}:{stamp['updated'].isoformat() if stamp['updated'] else '-'}"
+
+
+def _load_index(version):
+    from .models import Animal
+
+    if version is None:
+        logger.warning("Catálogo de animales no disponible en la base; usando fixtures/animals.json")
+        return AnimalIndex(load_fixture_animals(), 'fixture')
+
+    animals = Animal.objects.filter(is_active=True).values(
+        'slug', 'name', 'synonyms', 'plurals', 'english_name', 'emoji', 'category'
+    )
+    index = AnimalIndex(list(animals), version)
+    logger.info("🐾 Catálogo de animales cargado: %s animales (versión %s)", len(index), version)
+    return index
+
+
+def get_index():
+    """Índice actual; verifica la versión como mucho cada ANIMAL_CATALOG_CHECK_SECONDS"""
+    global _index, _next_check
+    from django.conf import settings
+
+    index = _index
+    if index is not None and time.monotonic() < _next_check:
+        return index
+
+    with _lock:
+        if _index is not None and time.monotonic() < _next_check:
+            return _index
+        version = _catalog_version()
+        if _index is None or _index.version != (version or 'fixture'):
+            _index = _load_index(version)
+        _next_check = time.monotonic() + settings.ANIMAL_CATALOG_CHECK_SECONDS
+        return _index
+
+
+def invalidate():
+    """Fuerza a verificar la versión en el próximo uso (p. ej. tras editar el catálogo)"""
+    global _next_check
+    _next_check = 0.0
+
+
+# ===========================
+# ATAJOS
+# ===========================
+
+def find_animals(text):
+    return get_index().lexicon.find(text)
+
+
+def count_animals(text):
+    return get_index().lexicon.counts(text)
+
+
+def detect_animal(text):
+    return get_index().lexicon.most_mentioned(text)
+
+
+def canonical_name(name):
+    """
+    Nombre tal como lo guarda el catálogo ("oso polar" -> "Oso Polar"), para
+    comparar con animal_name de ChatAnimal / AnimalExplored. Fuera del
+    catálogo: capitalize(), como se guardaban antes del catálogo.
+    """
+    name = (name or '').strip()
+    entry = get_index().get(name)
+    return entry.name if entry else name.capitalize()
+
+
+def translate_animal(name):
+    """Nombre en inglés para el prompt de imágenes; el mismo nombre si no está en el catálogo"""
+    entry = get_index().get(name)
+    return entry.english_name if entry else name
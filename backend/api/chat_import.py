@@ -0,0 +1,157 @@
+"""
+Importación masiva de chats de invitado al registrarse
+
+El invitado guarda sus conversaciones en localStorage con IDs propios
+(`client_id`). Al crear la cuenta, el frontend las envía todas en una sola
+request y aquí se insertan con bulk_create, en transacciones de
+CHAT_IMPORT_BATCH_SIZE chats:
+
+    1 SELECT de client_id ya importados (idempotencia)
+    por lote: INSERT chats + INSERT mensajes + INSERT chat_animals (+ blobs)
+    al final: animales explorados agregados en una sola pasada y un UPDATE
+              de los contadores de UserProgress
+
+Reenviar la misma importación no duplica nada: los client_id existentes
+se omiten y se devuelve el chat_id ya asignado. Si dos importaciones del
+mismo chat corren a la vez, los chats se insertan con ON CONFLICT DO
+NOTHING y solo se completan (mensajes, contadores) los que este request
+insertó de verdad; los demás se informan con el id del chat ganador.
+
+Cada mensaje recibe un created_at estrictamente creciente (un microsegundo
+más que el anterior): los mensajes se ordenan por (created_at, id) y el id
+es un UUID aleatorio, así que con la misma hora volverían desordenados.
+"""
+
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .achievements import evaluate_achievements
+from .activity import record_daily_activity
+from .popularity import record_detections
+from .blobs import resolve_image_references
+from .chat_views import detect_animal_in_text, register_animals_explored
+from .counters import adjust_progress
+from .models import Chat, ChatMessage, ChatAnimal
+
+# Un chat del lote con sus filas dependientes y lo que aporta a los contadores
+ImportedChat = namedtuple('ImportedChat', 'chat messages chat_animals mentions questions')
+
+
+def _build_batch(user, items):
+    """Arma los objetos de un lote de chats (sin tocar la base salvo blobs)"""
+    batch = []
+
+    image_refs = resolve_image_references([
+        message['image_url'] for item in items for message in item['messages']
+    ])
+    image_refs = iter(image_refs)
+
+    for item in items:
+        created_at = item['created_at'] or timezone.now()
+        chat = Chat(user=user, client_id=item['client_id'], title=item['title'], created_at=created_at)
+
+        messages = []
+        mentions = {}
+        for index, message in enumerate(item['messages']):
+            animal = detect_animal_in_text(message['text'])
+            if animal:
+                mentions[animal] = mentions.get(animal, 0) + 1
+            image_url, image_blob_id = next(image_refs)
+            messages.append(ChatMessage(
+                chat=chat,
+                role=message['role'],
+                message_type=message['message_type'],
+                text=message['text'],
+                image_url=image_url,
+                image_blob_id=image_blob_id,
+                image_alt=message['image_alt'],
+                animal_mentioned=animal,
+                created_at=created_at + timedelta(microseconds=index)
+            ))
+
+        chat_animals = [
+            ChatAnimal(user=user, chat=chat, animal_name=animal, mentions=count, last_mentioned_at=created_at)
+            for animal, count in mentions.items()
+        ]
+        questions = sum(1 for message in item['messages'] if message['role'] == 'user')
+        batch.append(ImportedChat(chat, messages, chat_animals, mentions, questions))
+    return batch
+
+
+def import_chats(user, items):
+    """
+    Importa los chats validados por ChatImportSerializer.
+    Retorna {"imported": n, "skipped": n, "chats": {client_id: chat_id}}.
+    """
+    batch_size = settings.CHAT_IMPORT_BATCH_SIZE
+
+    # Idempotencia: incluye chats en soft-delete para no resucitarlos
+    existing = {
+        client_id: (None if deleted_at else str(chat_id))
+        for client_id, chat_id, deleted_at in Chat.all_objects.filter(
+            user=user, client_id__in=[item['client_id'] for item in items]
+        ).values_list('client_id', 'id', 'deleted_at')
+    }
+    result = dict(existing)
+
+    pending = []
+    for item in items:
+        if item['client_id'] in result:
+            continue
+        result[item['client_id']] = None
+        pending.append(item)
+
+    animal_totals = {}
+    imported = total_messages = total_questions = 0
+    for start in range(0, len(pending), batch_size):
+        batch = _build_batch(user, pending[start:start + batch_size])
+        with transaction.atomic():
+            Chat.objects.bulk_create([entry.chat for entry in batch], ignore_conflicts=True)
+            # Otra importación concurrente pudo ganar algunos client_id: solo siguen los insertados aquí
+            inserted = set(
+                Chat.objects.filter(pk__in=[entry.chat.pk for entry in batch]).values_list('pk', flat=True)
+            )
+            batch = [entry for entry in batch if entry.chat.pk in inserted]
+            ChatMessage.objects.bulk_create(
+                [message for entry in batch for message in entry.messages], batch_size=500
+            )
+            ChatAnimal.objects.bulk_create([row for entry in batch for row in entry.chat_animals])
+        for entry in batch:
+            result[entry.chat.client_id] = str(entry.chat.pk)
+            imported += 1
+            total_messages += len(entry.messages)
+            total_questions += entry.questions
+            for animal, count in entry.mentions.items():
+                animal_totals[animal] = animal_totals.get(animal, 0) + count
+
+    lost = [client_id for client_id, chat_id in result.items() if chat_id is None and client_id not in existing]
+    if lost:
+        result.update(
+            (client_id, None if deleted_at else str(chat_id))
+            for client_id, chat_id, deleted_at in Chat.all_objects.filter(
+                user=user, client_id__in=lost
+            ).values_list('client_id', 'id', 'deleted_at')
+        )
+
+    new_animals = register_animals_explored(user, animal_totals)
+    record_detections(animal_totals)
+    adjust_progress(
+        user.id,
+        refresh_animals=bool(animal_totals),
+        total_chats=imported,
+        total_messages=total_messages,
+        total_questions_asked=total_questions
+    )
+    evaluate_achievements([user.id])
+    record_daily_activity(user.id, messages=total_messages, questions=total_questions, new_animals=new_animals)
+
+    return {
+        'imported': imported,
+        'skipped': len(items) - imported,
+        'chats': {client_id: chat_id for client_id, chat_id in result.items() if chat_id},
+    }
+
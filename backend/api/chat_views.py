@@ -1,12 +1,23 @@
 """
 Vistas para manejo de chat y historial
 """
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, parser_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
 from django.utils import timezone
 from .models import User
+from .conditional import (
+    conditional_read, chats_version, chat_version, animals_version, stats_version
+)
+from .parsers import StreamingChatParser
+from .idempotency import idempotent
+from .catalog import canonical_name, detect_animal
+from .counters import adjust_progress
+from .streaks import record_activity, forget_activity_guard
+from .achievements import evaluate_achievements
+from .activity import record_daily_activity
+from .popularity import record_detections
 # ===========================
 # SISTEMA NUEVO DE CHATS
 # ===========================
@@ -21,10 +32,17 @@ from .models import User
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@conditional_read(chats_version)
 def list_chats(request):
     """
-    Lista todos los chats del usuario
-    GET /api/explorer/chats
+    Lista los chats del usuario, paginados por keyset
+    GET /api/explorer/chats?page_size=20&cursor=<next_cursor>
+    
+    Response: {
+        "results": [ ...chats sin mensajes ],
+        "next_cursor": "token o null si no hay más",
+        "page_size": 20
+    }
     """
     user = request.user
     
@@ -33,30 +51,42 @@ def list_chats(request):
     # No listar para invitados
     if user.is_guest:
         print("⚠️ Usuario invitado, devolviendo lista vacía")
-        return Response([], status=status.HTTP_200_OK)
+        return Response({
+            "results": [],
+            "next_cursor": None,
+            "page_size": 0
+        }, status=status.HTTP_200_OK)
     
+    from django.db.models import Count
     from .models import Chat
     from .serializers import ChatListSerializer
+    from .pagination import ChatKeysetPagination
     
-    chats = Chat.objects.filter(user=user).order_by('-updated_at')
-    print(f"📊 Chats encontrados en DB: {chats.count()}")
-    
-    for chat in chats:
-        print(f"  - Chat ID: {chat.id}, Título: {chat.title}, Mensajes: {chat.messages.count()}")
+    chats = Chat.objects.filter(user=user).annotate(message_count=Count('messages'))
     
-    serializer = ChatListSerializer(chats, many=True)
-    print(f"📦 Serializer data: {serializer.data}")
-    print(f"📤 Devolviendo {len(serializer.data)} chats")
+    paginator = ChatKeysetPagination()
+    page = paginator.paginate_queryset(chats, request)
+    serializer = ChatListSerializer(page, many=True)
+    print(f"📤 Devolviendo {len(page)} chats (más: {paginator.next_cursor is not None})")
     
-    return Response(serializer.data, status=status.HTTP_200_OK)
+    return paginator.get_paginated_response(serializer.data)
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@conditional_read(chat_version)
 def get_chat(request, chat_id):
     """
-    Obtiene un chat específico con todos sus mensajes
+    Obtiene un chat específico con sus mensajes
     GET /api/explorer/chats/<chat_id>
+    
+    Paginación opcional ("cargar anteriores"):
+    GET /api/explorer/chats/<chat_id>?page_size=50&before=<next_cursor>
+    
+    Con `page_size` o `before` se devuelven los mensajes más recientes de la
+    página (en orden cronológico) junto con `next_cursor`. Sin ellos se
+    devuelve el historial completo, porque el guardado reemplaza todos los
+    mensajes y los clientes antiguos reenvían la conversación entera.
     """
     user = request.user
     
@@ -65,21 +95,95 @@ def get_chat(request, chat_id):
             "error": "Los invitados no pueden acceder a chats guardados"
         }, status=status.HTTP_403_FORBIDDEN)
     
+    from django.db.models import Count
     from .models import Chat
-    from .serializers import ChatSerializer
+    from .serializers import ChatSerializer, ChatListSerializer, ChatMessageSerializer
+    from .pagination import MessageKeysetPagination
     
     try:
-        chat = Chat.objects.get(id=chat_id, user=user)
-        serializer = ChatSerializer(chat)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        chat = Chat.objects.annotate(message_count=Count('messages')).get(id=chat_id, user=user)
     except Chat.DoesNotExist:
         return Response({
             "error": "Chat no encontrado"
         }, status=status.HTTP_404_NOT_FOUND)
+    
+    paginator = MessageKeysetPagination()
+    wants_page = (
+        paginator.page_size_query_param in request.query_params or
+        paginator.cursor_query_param in request.query_params
+    )
+    if not wants_page:
+        serializer = ChatSerializer(chat, context={'request': request})
+        return Response(serializer.data, status=status.HTTP_200_OK)
+    
+    page = paginator.paginate_queryset(chat.messages.all(), request)
+    data = ChatListSerializer(chat).data
+    # La página viene de más reciente a más antiguo; el cliente la muestra cronológica
+    data['messages'] = ChatMessageSerializer(
+        reversed(page), many=True, context={'request': request}
+    ).data
+    data['next_cursor'] = paginator.next_cursor
+    data['page_size'] = paginator.page_size
+    return Response(data, status=status.HTTP_200_OK)
 
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def search_chats(request):
+    """
+    Busca en el historial de chats del usuario (texto completo, con ranking)
+    GET /api/explorer/search?q=tiburones&page=1&page_size=20
+    
+    Response: {
+        "results": [
+            {
+                "message_id": "...", "chat_id": "...", "chat_title": "...",
+                "role": "assistant", "created_at": "...", "rank": 0.42,
+                "snippet": "...los «tiburones» tienen varias filas de dientes..."
+            }
+        ],
+        "page": 1,
+        "page_size": 20,
+        "has_more": false
+    }
+    """
+    from django.conf import settings
+    from .search import search_messages
+    
+    user = request.user
+    q = (request.query_params.get('q') or '').strip()
+    
+    try:
+        page = max(1, int(request.query_params.get('page', 1)))
+        page_size = int(request.query_params.get('page_size', settings.CHAT_PAGE_SIZE))
+    except ValueError:
+        return Response({
+            "error": "page y page_size deben ser números"
+        }, status=status.HTTP_400_BAD_REQUEST)
+    page_size = max(1, min(page_size, settings.CHAT_MAX_PAGE_SIZE))
+    
+    if not q:
+        return Response({
+            "error": "El parámetro q es requerido"
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    if user.is_guest:
+        results, has_more = [], False
+    else:
+        results, has_more = search_messages(user, q, page=page, page_size=page_size)
+    
+    return Response({
+        "results": results,
+        "page": page,
+        "page_size": page_size,
+        "has_more": has_more
+    }, status=status.HTTP_200_OK)
+
+
+@idempotent
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@parser_classes([StreamingChatParser])
 def create_or_update_chat(request):
     """
     Crea un nuevo chat o actualiza uno existente
@@ -97,10 +201,13 @@ def create_or_update_chat(request):
             }
         ]
     }
+    
+    El cuerpo se lee en streaming (StreamingChatParser): los mensajes llegan
+    de a uno desde un spool temporal, con sus imágenes ya validadas. Los
+    blobs se escriben aquí, en la misma transacción que los mensajes.
     """
     user = request.user
     print(f"\n💾 CREATE/UPDATE CHAT - Usuario: {user.username}, ID: {user.id}, is_guest: {user.is_guest}")
-    print(f"📦 Data recibida: {request.data}")
     
     # No guardar para invitados
     if user.is_guest:
@@ -110,6 +217,9 @@ def create_or_update_chat(request):
             "chat_id": None
         }, status=status.HTTP_200_OK)
     
+    from django.db import transaction
+    from django.db.models import Count, Q
+    from .blobs import resolve_image_reference
     from .models import Chat, ChatMessage
     from .serializers import ChatSerializer
     
@@ -118,55 +228,178 @@ def create_or_update_chat(request):
     title = data.get('title', 'Nueva conversación')
     messages_data = data.get('messages', [])
     
-    # Crear o actualizar chat
-    if chat_id:
-        try:
-            chat = Chat.objects.get(id=chat_id, user=user)
-            chat.title = title
-            chat.save()
-            
-            # Eliminar mensajes anteriores y crear nuevos
-            chat.messages.all().delete()
-        except Chat.DoesNotExist:
-            chat = Chat.objects.create(user=user, title=title)
-    else:
-        chat = Chat.objects.create(user=user, title=title)
-    
-    # Crear mensajes y detectar animales
-    print(f"📝 Guardando {len(messages_data)} mensajes...")
-    for msg_data in messages_data:
-        text = msg_data.get('text', '')
+    # El spool de mensajes (archivo temporal) se cierra también si algo falla
+    try:
+        # Crear o actualizar chat
+        # Deltas para los contadores de UserProgress (se aplican en un solo UPDATE al final)
+        new_chats = 0
+        message_delta = 0
+        question_delta = 0
+        chat = None
+        previous_times = []
+        animal_mentions = {}
+        # Chat, mensajes y blobs en una transacción: un error no deja el chat a medias ni blobs sueltos
+        with transaction.atomic():
+            if chat_id:
+                try:
+                    chat = Chat.objects.get(id=chat_id, user=user)
+                    chat.title = title
+                    chat.save()
+                
+                    # Eliminar mensajes anteriores y crear nuevos
+                    previous = chat.messages.aggregate(total=Count('id'), questions=Count('id', filter=Q(role='user')))
+                    message_delta -= previous['total']
+                    question_delta -= previous['questions']
+                    # El cliente reenvía el historial completo: el mensaje i conserva la fecha
+                    # del mensaje i anterior (la actividad diaria se reconstruye desde created_at)
+                    previous_times = list(chat.messages.order_by('created_at', 'id').values_list('created_at', flat=True))
+                    chat.messages.all().delete()
+                except Chat.DoesNotExist:
+                    pass
+            if chat is None:
+                chat = Chat.objects.create(user=user, title=title)
+                new_chats = 1
         
-        # Detectar animal en el mensaje
-        animal_detected = detect_animal_in_text(text)
-        if animal_detected:
-            print(f"🐾 Animal detectado: {animal_detected}")
+            # Crear mensajes y detectar animales
+            print(f"📝 Guardando {len(messages_data)} mensajes...")
+            for position, msg_data in enumerate(messages_data):
+                text = msg_data.get('text', '')
+                role = msg_data.get('role', 'user')
+                message_delta += 1
+                if role == 'user':
+                    question_delta += 1
+            
+                # Detectar animal en el mensaje
+                animal_detected = detect_animal_in_text(text)
+                if animal_detected:
+                    print(f"🐾 Animal detectado: {animal_detected}")
+            
+                image_url, image_blob_id = resolve_image_reference(msg_data.get('image_url'))
+                ChatMessage.objects.create(
+                    chat=chat,
+                    role=role,
+                    message_type=msg_data.get('message_type', 'text'),
+                    text=text,
+                    image_url=image_url,
+                    image_blob_id=image_blob_id,
+                    image_alt=msg_data.get('image_alt'),
+                    animal_mentioned=animal_detected,
+                    created_at=previous_times[position] if position < len(previous_times) else timezone.now()
+                )
+            
+                if animal_detected:
+                    animal_mentions[animal_detected] = animal_mentions.get(animal_detected, 0) + 1
         
-        ChatMessage.objects.create(
-            chat=chat,
-            role=msg_data.get('role', 'user'),
-            message_type=msg_data.get('message_type', 'text'),
-            text=text,
-            image_url=msg_data.get('image_url'),
-            image_alt=msg_data.get('image_alt'),
-            animal_mentioned=animal_detected
+        # Animales explorados: un solo upsert con todas las menciones del chat
+        new_animals = register_animals_explored(user, animal_mentions)
+        previous_mentions = index_chat_animals(chat, animal_mentions)
+        # Tendencias: re-guardar un chat solo suma las menciones nuevas, no todo el historial
+        record_detections({
+            animal_name: mentions - previous_mentions.get(animal_name, 0)
+            for animal_name, mentions in animal_mentions.items()
+        })
+        adjust_progress(
+            user.id,
+            refresh_animals=bool(animal_mentions),
+            total_chats=new_chats,
+            total_messages=message_delta,
+            total_questions_asked=question_delta
+        )
+        record_activity(user.id)
+        evaluate_achievements([user.id])
+        # Rollup diario: re-guardar un chat con menos mensajes no resta actividad
+        record_daily_activity(
+            user.id,
+            messages=max(message_delta, 0),
+            questions=max(question_delta, 0),
+            new_animals=new_animals
         )
         
-        # Registrar animal explorado si se detectó uno
-        if animal_detected:
-            print(f"✅ Registrando animal explorado: {animal_detected}")
-            register_animal_explored(user, animal_detected)
+        print(f"✅ Chat guardado exitosamente: ID={chat.id}, Title={chat.title}")
+        
+        # Recargar el chat desde la base de datos para incluir todos los mensajes
+        chat.refresh_from_db()
+        print(f"🔄 Chat recargado desde DB, mensajes: {chat.messages.count()}")
+        
+        serializer = ChatSerializer(chat, context={'request': request})
+        print(f"📤 Devolviendo respuesta con status 201")
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+    finally:
+        if hasattr(messages_data, 'close'):
+            messages_data.close()
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def import_chats(request):
+    """
+    Importa de una vez los chats que el usuario tenía como invitado
+    POST /api/explorer/chats/import
+    {
+        "chats": [
+            {
+                "client_id": "id local del chat (ej. timestamp)",
+                "title": "título",
+                "created_at": "ISO 8601 (opcional)",
+                "messages": [{"role": "...", "text": "...", "image_url": "..."}]
+            }
+        ]
+    }
     
-    print(f"✅ Chat guardado exitosamente: ID={chat.id}, Title={chat.title}")
+    Idempotente por client_id: reenviar la misma importación no duplica chats.
+    """
+    user = request.user
     
-    # Recargar el chat desde la base de datos para incluir todos los mensajes
-    chat.refresh_from_db()
-    print(f"🔄 Chat recargado desde DB, mensajes: {chat.messages.count()}")
+    if user.is_guest:
+        return Response({
+            "error": "Los invitados no pueden importar chats"
+        }, status=status.HTTP_403_FORBIDDEN)
+    
+    from .serializers import ChatImportSerializer
+    from .chat_import import import_chats as run_import
+    
+    serializer = ChatImportSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    
+    result = run_import(user, serializer.validated_data['chats'])
+    print(f"📥 Importación de chats ({user.username}): {result['imported']} nuevos, {result['skipped']} omitidos")
     
-    serializer = ChatSerializer(chat)
-    print(f"📦 Serializer data: {serializer.data}")
-    print(f"📤 Devolviendo respuesta con status 201")
-    return Response(serializer.data, status=status.HTTP_201_CREATED)
+    return Response(result, status=status.HTTP_201_CREATED if result['imported'] else status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def export_chats(request):
+    """
+    Descarga todos los chats y mensajes del usuario en NDJSON (streaming)
+    GET /api/explorer/export
+    GET /api/explorer/export?gzip=1   (comprimido, .ndjson.gz)
+    
+    Una línea JSON por registro: cabecera "export", luego "chat" y "message".
+    Las imágenes se exportan como URL + image_sha256, no en base64.
+    """
+    user = request.user
+    
+    if user.is_guest:
+        return Response({
+            "error": "Los invitados no tienen chats guardados para exportar"
+        }, status=status.HTTP_403_FORBIDDEN)
+    
+    from django.http import StreamingHttpResponse
+    from .export import iter_ndjson
+    
+    compress = request.query_params.get('gzip') in ('1', 'true')
+    filename = f"fauna-kids-{user.username}-{timezone.now():%Y%m%d}.ndjson"
+    
+    response = StreamingHttpResponse(
+        iter_ndjson(user, request=request, compress=compress),
+        content_type='application/gzip' if compress else 'application/x-ndjson; charset=utf-8'
+    )
+    if compress:
+        filename += '.gz'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response['Cache-Control'] = 'no-store'
+    return response
 
 
 @api_view(['DELETE'])
@@ -175,6 +408,9 @@ def delete_chat(request, chat_id):
     """
     Elimina un chat específico
     DELETE /api/explorer/chats/<chat_id>
+    
+    Soft-delete: el chat se oculta al instante y `purge_deleted`
+    borra sus mensajes en lotes después.
     """
     user = request.user
     
@@ -183,18 +419,58 @@ def delete_chat(request, chat_id):
             "error": "Los invitados no pueden eliminar chats"
         }, status=status.HTTP_403_FORBIDDEN)
     
-    from .models import Chat
+    from django.db.models import Count, Q
+    from .models import Chat, ChatAnimal, ChatMessage
     
-    try:
-        chat = Chat.objects.get(id=chat_id, user=user)
-        chat.delete()
-        return Response({
-            "message": "Chat eliminado exitosamente"
-        }, status=status.HTTP_200_OK)
-    except Chat.DoesNotExist:
+    hidden = Chat.objects.filter(id=chat_id, user=user).update(deleted_at=timezone.now())
+    if not hidden:
         return Response({
             "error": "Chat no encontrado"
         }, status=status.HTTP_404_NOT_FOUND)
+    
+    # El índice animal -> chat es pequeño: se limpia ya para que no apunte a chats ocultos
+    ChatAnimal.objects.filter(chat_id=chat_id).delete()
+    
+    # Los mensajes se purgan después, pero dejan de contar ya (conteo por índice de chat_id)
+    removed = ChatMessage.objects.filter(chat_id=chat_id).aggregate(
+        total=Count('id'), questions=Count('id', filter=Q(role='user'))
+    )
+    adjust_progress(
+        user.id,
+        total_chats=-1,
+        total_messages=-removed['total'],
+        total_questions_asked=-removed['questions']
+    )
+    
+    return Response({
+        "message": "Chat eliminado exitosamente"
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['DELETE'])
+@permission_classes([IsAuthenticated])
+def delete_account(request):
+    """
+    Elimina la cuenta del usuario
+    DELETE /api/user/account
+    
+    La cuenta se desactiva al instante (los tokens dejan de autenticar)
+    y `purge_deleted` borra todos sus datos en lotes después.
+    """
+    user = request.user
+    
+    if user.is_guest:
+        return Response({
+            "error": "Los invitados no tienen una cuenta que eliminar"
+        }, status=status.HTTP_403_FORBIDDEN)
+    
+    from .purge import soft_delete_user
+    
+    soft_delete_user(user)
+    
+    return Response({
+        "message": "Cuenta eliminada. Tus datos se borrarán en breve."
+    }, status=status.HTTP_200_OK)
 
 
 @api_view(['GET', 'PUT'])
@@ -205,7 +481,9 @@ def user_settings(request):
     GET/PUT /api/user/settings
     {
         "voice_enabled": true/false,
-        "theme": "default"
+        "theme": "default",
+        "user_timezone": "America/Bogota",
+        "classroom_code": "3B-2026"
     }
     """
     user = request.user
@@ -225,17 +503,21 @@ def user_settings(request):
     from .models import UserSettings
     from .serializers import UserSettingsUpdateSerializer
     
-    # Obtener o crear configuraciones
-    settings, created = UserSettings.objects.get_or_create(user=user)
-    
     if request.method == 'GET':
+        # El principal autenticado ya trae settings: solo se consulta si la fila falta
+        settings = getattr(user, 'settings', None) or UserSettings.objects.get_or_create(user=user)[0]
         serializer = UserSettingsUpdateSerializer(settings)
         return Response(serializer.data, status=status.HTTP_200_OK)
     
     elif request.method == 'PUT':
+        # La fila se relee: el PUT no debe guardar encima un snapshot en caché
+        settings, created = UserSettings.objects.get_or_create(user=user)
         serializer = UserSettingsUpdateSerializer(settings, data=request.data, partial=True)
         if serializer.is_valid():
             serializer.save()
+            if 'user_timezone' in serializer.validated_data:
+                # El "día" de la racha cambió: la próxima actividad vuelve a evaluarse
+                forget_activity_guard(user.id)
             return Response(serializer.data, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -290,67 +572,54 @@ def update_user_profile(request):
 
 def detect_animal_in_text(text):
     """
-    Detecta menciones de animales en el texto
+    Detecta el animal principal del texto (el más mencionado)
+    Ver api/catalog.py: catálogo de animales con sinónimos y plurales
     """
-    animales = [
-        'león', 'tigre', 'elefante', 'jirafa', 'cebra', 'rinoceronte', 'hipopótamo',
-        'cocodrilo', 'serpiente', 'águila', 'búho', 'loro', 'tucán', 'pingüino',
-        'delfín', 'ballena', 'tiburón', 'oso', 'lobo', 'zorro', 'conejo', 'ardilla',
-        'perro', 'gato', 'caballo', 'vaca', 'cerdo', 'gallina', 'pato', 'pavo',
-        'mono', 'gorila', 'chimpancé', 'orangután', 'canguro', 'koala', 'panda',
-        'rana', 'sapo', 'tortuga', 'galápago', 'lagarto', 'iguana', 'camaleón',
-        'mariposa', 'abeja', 'hormiga', 'araña', 'mosquito', 'mosca', 'escarabajo',
-        'pájaro', 'paloma', 'gorrión', 'canario', 'flamenco', 'pelícano', 'gaviota',
-        'pez', 'salmón', 'atún', 'trucha', 'carpa', 'piraña', 'anguila',
-        'venado', 'ciervo', 'alce', 'bisonte', 'búfalo', 'camello', 'dromedario',
-        'llama', 'alpaca', 'oveja', 'cabra', 'burro', 'mula', 'yak',
-        'jaguar', 'leopardo', 'guepardo', 'pantera', 'lince', 'puma', 'ocelote',
-        'mapache', 'tejón', 'nutria', 'foca', 'morsa', 'león marino',
-        'murciélago', 'rata', 'ratón', 'hámster', 'cobaya', 'erizo', 'topo'
-    ]
-    
-    text_lower = text.lower()
-    
-    for animal in animales:
-        if animal in text_lower:
-            return animal.capitalize()
-    
-    return None
+    return detect_animal(text)
 
 
-def register_animal_explored(user, animal_name):
+def register_animals_explored(user, animal_counts):
     """
-    Registra o actualiza un animal explorado por el usuario
+    Suma a los animales explorados del usuario las menciones de una request
+    animal_counts: {"León": 3, "Tigre": 1}
+    Upserts atómicos para todo el lote (ver counters.py).
+    Retorna cuántos animales son nuevos para el usuario.
     """
-    if user.is_guest or not animal_name:
-        return None
+    if user.is_guest or not animal_counts:
+        return 0
     
-    from .models import AnimalExplored
+    from .counters import increment_animals_explored
     
-    try:
-        animal, created = AnimalExplored.objects.get_or_create(
-            user=user,
-            animal_name=animal_name.capitalize(),
-            defaults={
-                'times_explored': 1,
-                'first_explored_at': timezone.now(),
-                'last_explored_at': timezone.now()
-            }
+    return increment_animals_explored(user.id, animal_counts)
+
+
+def index_chat_animals(chat, animal_mentions):
+    """
+    Reemplaza las entradas del índice animal -> chat para este chat
+    animal_mentions: {"León": 3, "Tigre": 1}
+    Retorna las menciones que tenía el chat antes de reemplazarlas.
+    """
+    from .models import ChatAnimal
+    
+    previous = ChatAnimal.objects.filter(chat=chat)
+    previous_mentions = dict(previous.values_list('animal_name', 'mentions'))
+    previous.delete()
+    ChatAnimal.objects.bulk_create([
+        ChatAnimal(
+            user_id=chat.user_id,
+            chat=chat,
+            animal_name=animal_name,
+            mentions=mentions,
+            last_mentioned_at=chat.updated_at
         )
-        
-        if not created:
-            animal.times_explored += 1
-            animal.last_explored_at = timezone.now()
-            animal.save()
-        
-        return animal
-    except Exception as e:
-        print(f"Error registrando animal: {e}")
-        return None
+        for animal_name, mentions in animal_mentions.items()
+    ])
+    return previous_mentions
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@conditional_read(animals_version)
 def get_animals_explored(request):
     """
     Obtiene la lista de animales explorados por el usuario
@@ -379,16 +648,65 @@ def get_animals_explored(request):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+def get_animal_chats(request, animal_name):
+    """
+    Lista los chats donde se mencionó un animal, paginados por keyset
+    GET /api/explorer/animals/<animal_name>/chats?page_size=20&cursor=<next_cursor>
+    
+    Response: {
+        "results": [
+            { "id": "...", "title": "...", "mentions": 3, "last_mentioned_at": "...", "updated_at": "..." }
+        ],
+        "next_cursor": "token o null",
+        "page_size": 20
+    }
+    """
+    user = request.user
+    
+    if user.is_guest:
+        return Response({
+            "results": [],
+            "next_cursor": None,
+            "page_size": 0
+        }, status=status.HTTP_200_OK)
+    
+    from .models import ChatAnimal
+    from .pagination import ChatAnimalKeysetPagination
+    
+    entries = ChatAnimal.objects.filter(
+        user=user,
+        animal_name=canonical_name(animal_name)
+    ).select_related('chat')
+    
+    paginator = ChatAnimalKeysetPagination()
+    page = paginator.paginate_queryset(entries, request)
+    
+    data = [{
+        'id': str(entry.chat_id),
+        'title': entry.chat.title,
+        'mentions': entry.mentions,
+        'last_mentioned_at': entry.last_mentioned_at,
+        'created_at': entry.chat.created_at,
+        'updated_at': entry.chat.updated_at
+    } for entry in page]
+    
+    return paginator.get_paginated_response(data)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@conditional_read(stats_version)
 def get_user_stats(request):
     """
     Obtiene estadísticas del usuario para el dashboard
     GET /api/user/stats
+    
+    Una sola lectura de UserProgress (contadores materializados que mantienen
+    las escrituras), sin importar cuánto historial tenga el usuario.
     """
     try:
         user = request.user
         
-        print(f"🔍 DEBUG get_user_stats - Usuario: {user.username}, ID: {user.id}, is_guest: {user.is_guest}")
-        
         if user.is_guest:
             print("👤 Usuario invitado - retornando ceros")
             return Response({
@@ -398,39 +716,19 @@ def get_user_stats(request):
                 'current_streak': 0
             }, status=status.HTTP_200_OK)
         
-        from .models import AnimalExplored, Chat, ChatMessage, UserProgress
-        
-        # Contar animales únicos explorados
-        total_animals = AnimalExplored.objects.filter(user=user).count()
-        print(f"🐾 Total animales: {total_animals}")
-        
-        # Contar chats totales
-        total_chats = Chat.objects.filter(user=user).count()
-        print(f"💬 Total chats: {total_chats}")
-        
-        # Contar mensajes totales
-        total_messages = ChatMessage.objects.filter(
-            chat__user=user
-        ).count()
-        print(f"📝 Total mensajes: {total_messages}")
+        from .counters import get_progress_stats
         
-        # Obtener racha actual
-        try:
-            progress = UserProgress.objects.get(user=user)
-            current_streak = progress.current_streak_days
-            print(f"🔥 Racha actual: {current_streak}")
-        except UserProgress.DoesNotExist:
-            print("⚠️ UserProgress no existe - creando con racha 0")
-            current_streak = 0
+        # stats_version ya leyó la fila para el ETag
+        stats = getattr(request, 'progress_stats', None) or get_progress_stats(user.pk)
         
         response_data = {
-            'total_animals': total_animals,
-            'total_chats': total_chats,
-            'total_messages': total_messages,
-            'current_streak': current_streak
+            'total_animals': stats['total_animals_explored'],
+            'total_chats': stats['total_chats'],
+            'total_messages': stats['total_messages'],
+            'current_streak': stats['current_streak_days']
         }
         
-        print(f"✅ Respuesta exitosa: {response_data}")
+        print(f"✅ Estadísticas de {user.username}: {response_data}")
         return Response(response_data, status=status.HTTP_200_OK)
         
     except Exception as e:
@@ -441,3 +739,237 @@ def get_user_stats(request):
             'error': str(e),
             'type': type(e).__name__
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_user_activity(request):
+    """
+    Actividad del usuario por día, semana o mes (gráficas del dashboard)
+    GET /api/user/activity?from=2026-01-01&to=2026-03-31&bucket=week
+    
+    Lee solo los rollups diarios (user_daily_activity), nunca mensajes ni
+    animales. Por defecto: los últimos ACTIVITY_DEFAULT_DAYS días por día.
+    
+    Response: {
+        "from": "2026-01-01", "to": "2026-03-31", "bucket": "week",
+        "series": [
+            {"date": "2025-12-29", "messages": 12, "questions": 6,
+             "new_animals": 2, "images": 1, "tts_seconds": 35.5}
+        ]
+    }
+    """
+    from datetime import date, timedelta
+    from django.conf import settings
+    from .activity import BUCKETS, activity_series, local_today
+    
+    user = request.user
+    bucket = request.query_params.get('bucket', 'day')
+    if bucket not in BUCKETS:
+        return Response({
+            "error": f"bucket debe ser uno de: {', '.join(BUCKETS)}"
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        end = date.fromisoformat(request.query_params['to']) if 'to' in request.query_params else local_today(user.pk)
+        start = (
+            date.fromisoformat(request.query_params['from']) if 'from' in request.query_params
+            else end - timedelta(days=settings.ACTIVITY_DEFAULT_DAYS - 1)
+        )
+    except ValueError:
+        return Response({
+            "error": "from y to deben ser fechas YYYY-MM-DD"
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    if start > end or (end - start).days >= settings.ACTIVITY_MAX_RANGE_DAYS:
+        return Response({
+            "error": f"El rango debe ser de 1 a {settings.ACTIVITY_MAX_RANGE_DAYS} días"
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    series = [] if user.is_guest else activity_series(user.pk, start, end, bucket)
+    return Response({
+        "from": start,
+        "to": end,
+        "bucket": bucket,
+        "series": series
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_leaderboard(request, board):
+    """
+    Tabla de posiciones (precalculada por refresh_leaderboards)
+    GET /api/leaderboards/<points|animals|streak>?scope=global|classroom&limit=10
+    
+    Response: {
+        "board": "animals",
+        "scope": "classroom",
+        "refreshed_at": "...",
+        "top": [{"rank": 1, "display_name": "Ana", "avatar_url": null, "score": 42, "is_me": false}],
+        "me": {"rank": 12, "score": 9}    // null si no figura (invitado o puntaje 0)
+    }
+    """
+    from django.conf import settings
+    from .leaderboards import BOARDS, GLOBAL_SCOPE, top, my_rank
+    from .models import UserSettings
+    
+    user = request.user
+    if board not in BOARDS:
+        return Response({
+            "error": f"Tabla inválida. Opciones: {', '.join(BOARDS)}"
+        }, status=status.HTTP_404_NOT_FOUND)
+    
+    scope_name = request.query_params.get('scope', 'global')
+    if scope_name not in ('global', 'classroom'):
+        return Response({
+            "error": "scope debe ser 'global' o 'classroom'"
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        limit = int(request.query_params.get('limit', settings.LEADERBOARD_TOP_SIZE))
+    except ValueError:
+        return Response({
+            "error": "limit debe ser un número"
+        }, status=status.HTTP_400_BAD_REQUEST)
+    limit = max(1, min(limit, settings.LEADERBOARD_MAX_SIZE))
+    
+    scope = GLOBAL_SCOPE
+    if scope_name == 'classroom':
+        scope = '' if user.is_guest else (
+            UserSettings.objects.filter(user=user).values_list('classroom_code', flat=True).first() or ''
+        )
+        if not scope:
+            return Response({
+                "error": "No perteneces a ningún aula"
+            }, status=status.HTTP_400_BAD_REQUEST)
+    
+    entries = top(board, scope, limit)
+    mine = None if user.is_guest else my_rank(board, user.pk, scope)
+    
+    return Response({
+        "board": board,
+        "scope": scope_name,
+        "refreshed_at": entries[0].refreshed_at if entries else None,
+        "top": [{
+            "rank": entry.rank,
+            "display_name": entry.user.display_name,
+            "avatar_url": entry.user.avatar_url,
+            "score": entry.score,
+            "is_me": entry.user_id == user.pk
+        } for entry in entries],
+        "me": {"rank": mine[0], "score": mine[1]} if mine else None
+    }, status=status.HTTP_200_OK)
+
+
+# ===========================
+# DASHBOARD
+# ===========================
+
+DASHBOARD_SECTIONS = ('user', 'stats', 'animals', 'chats', 'settings')
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_dashboard(request):
+    """
+    Todo lo que pinta el dashboard en una sola respuesta
+    GET /api/dashboard?fields=stats,animals&limit=5
+    
+    fields (opcional) elige las secciones; limit acota animales y chats
+    recientes. Cantidad fija de consultas sin importar el historial:
+    user, stats y settings salen del principal autenticado (usuario con
+    settings y progress, ver api/principal.py), más una consulta para los
+    animales recientes y una para los chats recientes con su cantidad de
+    mensajes (anotada).
+    
+    Response: {
+        "user": { ...igual que /api/auth/me },
+        "stats": { ...igual que /api/user/stats },
+        "animals": [ ...igual que /api/explorer/animals, los más recientes ],
+        "chats": [ ...igual que /api/explorer/chats, los más recientes ],
+        "settings": { ...igual que /api/user/settings }
+    }
+    """
+    from django.conf import settings
+    from django.db.models import Count
+    from .models import AnimalExplored, Chat, UserSettings
+    from .serializers import ChatListSerializer, UserSerializer, UserSettingsUpdateSerializer
+    from .counters import get_progress_stats
+    
+    fields = request.query_params.get('fields')
+    sections = DASHBOARD_SECTIONS if not fields else tuple(
+        field.strip() for field in fields.split(',') if field.strip()
+    )
+    unknown = [section for section in sections if section not in DASHBOARD_SECTIONS]
+    if unknown or not sections:
+        return Response({
+            "error": f"fields debe ser una lista de: {', '.join(DASHBOARD_SECTIONS)}"
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        limit = int(request.query_params.get('limit', settings.DASHBOARD_RECENT_SIZE))
+    except ValueError:
+        return Response({
+            "error": "limit debe ser un número"
+        }, status=status.HTTP_400_BAD_REQUEST)
+    limit = max(1, min(limit, settings.DASHBOARD_MAX_RECENT_SIZE))
+    
+    user = request.user
+    data = {}
+    
+    if {'user', 'stats', 'settings'} & set(sections) and not user.is_guest and not User.progress.is_cached(user):
+        # Sesión de Django (admin): el usuario no viene del principal en caché
+        user = User.objects.select_related('settings', 'progress').get(pk=user.pk)
+    
+    if 'user' in sections:
+        data['user'] = UserSerializer(user).data
+    
+    if 'stats' in sections:
+        stats = None
+        if not user.is_guest:
+            progress = getattr(user, 'progress', None)
+            stats = (
+                {'total_animals_explored': progress.total_animals_explored,
+                 'total_chats': progress.total_chats,
+                 'total_messages': progress.total_messages,
+                 'current_streak_days': progress.current_streak_days}
+                if progress is not None else get_progress_stats(user.pk)
+            )
+        data['stats'] = {
+            'total_animals': stats['total_animals_explored'] if stats else 0,
+            'total_chats': stats['total_chats'] if stats else 0,
+            'total_messages': stats['total_messages'] if stats else 0,
+            'current_streak': stats['current_streak_days'] if stats else 0
+        }
+    
+    if 'animals' in sections:
+        animals = [] if user.is_guest else (
+            AnimalExplored.objects.filter(user_id=user.pk).order_by('-last_explored_at')[:limit]
+        )
+        data['animals'] = [{
+            'id': str(animal.id),
+            'name': animal.animal_name,
+            'times_explored': animal.times_explored,
+            'is_favorite': animal.is_favorite,
+            'first_explored_at': animal.first_explored_at,
+            'last_explored_at': animal.last_explored_at
+        } for animal in animals]
+    
+    if 'chats' in sections:
+        chats = [] if user.is_guest else (
+            Chat.objects.filter(user_id=user.pk)
+            .annotate(message_count=Count('messages'))
+            .order_by('-updated_at', '-id')[:limit]
+        )
+        data['chats'] = ChatListSerializer(chats, many=True).data
+    
+    if 'settings' in sections:
+        if user.is_guest:
+            data['settings'] = {"voice_enabled": False, "theme": "default"}
+        else:
+            # Sin fila aún: los valores por defecto, sin escribir en un GET
+            user_settings = getattr(user, 'settings', None) or UserSettings(user=user)
+            data['settings'] = UserSettingsUpdateSerializer(user_settings).data
+    
+    return Response(data, status=status.HTTP_200_OK)
@@ -0,0 +1,191 @@
+"""
+GET condicional (ETag / Last-Modified) para lecturas frecuentes del dashboard
+
+Cada endpoint declara una función de "versión" barata (agregados sobre
+índices por usuario). Si el cliente envía un If-None-Match que coincide,
+se responde 304 sin ejecutar las consultas pesadas ni serializar nada.
+
+ConditionalGetStatsMiddleware mide cuántos bytes y cuánto tiempo de vista
+(consultas + serialización) se ahorran por usuario gracias a los 304.
+"""
+
+import hashlib
+import logging
+import time
+from calendar import timegm
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from .models import Chat, AnimalExplored
+
+logger = logging.getLogger(__name__)
+
+
+# ===========================
+# SELLOS DE VERSIÓN POR USUARIO
+# ===========================
+
+def _aggregate_stamp(queryset, field):
+    row = queryset.aggregate(last=Max(field), total=Count('pk'))
+    return row['last'], (row['last'].isoformat() if row['last'] else '', row['total'])
+
+
+def chats_version(request, *args, **kwargs):
+    """Último updated_at y cantidad de chats del usuario"""
+    return _aggregate_stamp(Chat.objects.filter(user=request.user), 'updated_at')
+
+
+def chat_version(request, chat_id, *args, **kwargs):
+    """updated_at del chat (el guardado siempre lo actualiza)"""
+    updated_at = (
+        Chat.objects.filter(id=chat_id, user=request.user)
+        .values_list('updated_at', flat=True)
+        .first()
+    )
+    if updated_at is None:
+        return None
+    return updated_at, (str(chat_id), updated_at.isoformat())
+
+
+def animals_version(request, *args, **kwargs):
+    """Último last_explored_at y cantidad de animales del usuario"""
+    return _aggregate_stamp(AnimalExplored.objects.filter(user=request.user), 'last_explored_at')
+
+
+def stats_version(request, *args, **kwargs):
+    """
+    Fila de UserProgress del usuario: todos los contadores del dashboard
+    viven ahí. La fila leída queda en la request para que la vista no
+    vuelva a consultarla.
+    """
+    from .counters import get_progress_stats
+
+    if request.user.is_guest:
+        return None, ('guest',)
+    row = get_progress_stats(request.user.pk)
+    request.progress_stats = row
+    return row['updated_at'], tuple(str(row[field]) for field in sorted(row))
+
+
+# ===========================
+# DECORADOR
+# ===========================
+
+def _make_etag(request, parts):
+    """ETag fuerte: usuario + sello de versión + query string (cursor, page_size...)"""
+    digest = hashlib.sha256()
+    digest.update(request.path.encode('utf-8'))
+    digest.update(str(request.user.pk).encode('utf-8'))
+    for part in parts:
+        digest.update(b'\x00' + str(part).encode('utf-8'))
+    digest.update(b'\x00' + '&'.join(sorted(request.GET.urlencode().split('&'))).encode('utf-8'))
+    return quote_etag(digest.hexdigest()[:32])
+
+
+def conditional_read(version_func):
+    """
+    Añade ETag/Last-Modified a una vista GET y responde 304 si no hubo cambios.
+
+    version_func(request, *args, **kwargs) debe retornar
+    (last_modified | None, partes_hashables) o None para no usar validadores.
+    Los invitados no llevan validadores (sus respuestas son constantes).
+    Debe aplicarse debajo de @api_view para que request.user ya esté autenticado.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def inner(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD') or request.user.is_guest:
+                return view_func(request, *args, **kwargs)
+
+            version = version_func(request, *args, **kwargs)
+            if version is None:
+                return view_func(request, *args, **kwargs)
+
+            last_modified, parts = version
+            etag = _make_etag(request, parts)
+            last_modified_ts = timegm(last_modified.utctimetuple()) if last_modified else None
+
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified_ts)
+            if response is None:
+                started = time.perf_counter()
+                response = view_func(request, *args, **kwargs)
+                response.conditional_elapsed_ms = (time.perf_counter() - started) * 1000
+                if response.status_code != 200:
+                    return response
+
+            response.headers['ETag'] = etag
+            if last_modified_ts is not None:
+                response.headers['Last-Modified'] = http_date(last_modified_ts)
+            response.conditional_etag = etag
+            # El navegador guarda la respuesta pero siempre revalida (privada: va con JWT)
+            patch_cache_control(response, private=True, no_cache=True)
+            patch_vary_headers(response, ('Authorization',))
+            return response
+        return inner
+    return decorator
+
+
+# ===========================
+# MÉTRICAS DE AHORRO
+# ===========================
+
+def _cost_key(etag):
+    return f'conditional:cost:{etag}'
+
+
+def _savings_key(user_id):
+    return f'conditional:savings:{user_id}'
+
+
+def get_conditional_savings(user_id):
+    """
+    Ahorro acumulado del usuario (ventana CONDITIONAL_STATS_TTL):
+    {"not_modified": n, "bytes_saved": b, "view_ms_saved": ms}
+    """
+    return cache.get(_savings_key(user_id)) or {
+        'not_modified': 0,
+        'bytes_saved': 0,
+        'view_ms_saved': 0.0,
+    }
+
+
+class ConditionalGetStatsMiddleware:
+    """
+    Registra el costo de cada 200 con ETag (bytes del cuerpo y tiempo de la
+    vista) y, cuando ese mismo ETag se responde con 304, lo suma como ahorro.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        etag = getattr(response, 'conditional_etag', None)
+        if not etag:
+            return response
+
+        ttl = settings.CONDITIONAL_STATS_TTL
+        if response.status_code == 200 and not response.streaming:
+            cost = (len(response.content), getattr(response, 'conditional_elapsed_ms', 0.0))
+            cache.set(_cost_key(etag), cost, ttl)
+        elif response.status_code == 304:
+            cost = cache.get(_cost_key(etag))
+            user_id = getattr(getattr(request, 'user', None), 'pk', None)
+            if cost and user_id:
+                savings = get_conditional_savings(user_id)
+                savings['not_modified'] += 1
+                savings['bytes_saved'] += cost[0]
+                savings['view_ms_saved'] += cost[1]
+                cache.set(_savings_key(user_id), savings, ttl)
+                logger.info(
+                    "304 %s user=%s ahorro=%sB/%.1fms total=%sB/%.1fms",
+                    request.path, user_id, cost[0], cost[1],
+                    savings['bytes_saved'], savings['view_ms_saved'],
+                )
+        return response
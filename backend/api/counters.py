@@ -0,0 +1,192 @@
+"""
+Contadores atómicos por usuario
+
+Los contadores se incrementan en la base, sin leer la fila en Python:
+
+- Animales explorados: un único upsert
+
+    INSERT ... ON CONFLICT (user_id, animal_name)
+    DO UPDATE SET times_explored = animals_explored.times_explored + EXCLUDED.times_explored
+
+  Dos requests concurrentes del mismo usuario no pierden incrementos ni
+  chocan con la restricción única (antes: get_or_create + `+= 1` + save()).
+  Antes, un INSERT ... ON CONFLICT DO NOTHING con times_explored = 0 crea
+  las filas que faltan: su rowcount es la cantidad de animales nuevos, sin
+  contarlos dos veces si otra request gana la carrera (solo un INSERT crea
+  cada fila). Si el proceso se corta entre las dos sentencias queda una fila
+  en 0, igual que un favorito que ya no aparece: los contadores la ignoran.
+  Funciona igual en PostgreSQL y en SQLite (>= 3.24).
+
+- UserProgress.total_*: UPDATE con F() por cada escritura (guardar chat,
+  importar, borrar, generar imagen), así `user/stats` es una sola lectura.
+  `reconcile_progress` los recalcula desde las tablas para reparar desvíos.
+"""
+
+import uuid
+
+from django.db import connection
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .catalog import canonical_name
+from .models import AnimalExplored, Chat, ChatMessage, User, UserProgress
+from .principal import bump_principal
+
+
+def _upsert_animals_sql(rows, increment=True):
+    table = connection.ops.quote_name(AnimalExplored._meta.db_table)
+    values = ', '.join(['(%s, %s, %s, %s, %s, %s, %s)'] * rows)
+    on_conflict = (
+        f"DO UPDATE SET "
+        f"times_explored = {table}.times_explored + EXCLUDED.times_explored, "
+        f"last_explored_at = EXCLUDED.last_explored_at"
+    ) if increment else "DO NOTHING"
+    return (
+        f"INSERT INTO {table} "
+        f"(id, user_id, animal_name, times_explored, is_favorite, first_explored_at, last_explored_at) "
+        f"VALUES {values} "
+        f"ON CONFLICT (user_id, animal_name) {on_conflict}"
+    )
+
+
+def increment_animals_explored(user_id, animal_counts, now=None):
+    """
+    Suma animal_counts ({"León": 3, "Tigre": 1}) a los animales explorados
+    del usuario con dos sentencias. Los nombres se normalizan al del
+    catálogo (canonical_name), el mismo que guarda ChatAnimal.
+    Retorna cuántos animales son nuevos para el usuario (filas insertadas).
+    """
+    pending = {}
+    for animal_name, count in animal_counts.items():
+        if animal_name and count:
+            name = canonical_name(animal_name)
+            pending[name] = pending.get(name, 0) + count
+    if not pending:
+        return 0
+
+    fields = AnimalExplored._meta
+    prep_id = fields.get_field('id').get_db_prep_value
+    prep_user = fields.get_field('user').target_field.get_db_prep_value
+    prep_date = fields.get_field('last_explored_at').get_db_prep_value
+    now = prep_date(now or timezone.now(), connection)
+    user_id = prep_user(user_id, connection)
+
+    # Orden fijo de filas: dos upserts concurrentes bloquean en el mismo orden (sin deadlocks)
+    names = sorted(pending)
+
+    def rows(counts):
+        params = []
+        for name in names:
+            params.extend([prep_id(uuid.uuid4(), connection), user_id, name, counts[name], False, now, now])
+        return params
+
+    with connection.cursor() as cursor:
+        cursor.execute(_upsert_animals_sql(len(names), increment=False), rows(dict.fromkeys(names, 0)))
+        created = cursor.rowcount
+        cursor.execute(_upsert_animals_sql(len(names)), rows(pending))
+    return created
+
+
+# ===========================
+# CONTADORES DE PROGRESO
+# ===========================
+
+def _count_subquery(queryset, group_field):
+    """COUNT(*) correlacionado con UserProgress.user_id (0 si no hay filas)"""
+    return Coalesce(Subquery(
+        queryset.values(group_field).annotate(total=Count('pk')).values('total')[:1]
+    ), 0)
+
+
+def derived_counters():
+    """Expresiones que recalculan cada contador derivable desde sus tablas"""
+    user = OuterRef('user_id')
+    messages = ChatMessage.objects.filter(chat__user_id=user, chat__deleted_at__isnull=True)
+    return {
+        'total_chats': _count_subquery(Chat.objects.filter(user_id=user), 'user_id'),
+        'total_messages': _count_subquery(messages, 'chat__user_id'),
+        'total_questions_asked': _count_subquery(messages.filter(role='user'), 'chat__user_id'),
+        'total_animals_explored': _count_subquery(
+            AnimalExplored.objects.filter(user_id=user, times_explored__gt=0), 'user_id'
+        ),
+    }
+
+
+def adjust_progress(user_id, refresh_animals=False, **deltas):
+    """
+    Suma deltas a los contadores de UserProgress en un solo UPDATE:
+        adjust_progress(user.id, total_chats=1, total_messages=12)
+    refresh_animals recalcula total_animals_explored en la misma sentencia
+    (un COUNT sobre los animales del usuario, que son pocos).
+    """
+    updates = {field: F(field) + delta for field, delta in deltas.items() if delta}
+    if refresh_animals:
+        updates['total_animals_explored'] = derived_counters()['total_animals_explored']
+    if not updates:
+        return
+
+    if UserProgress.objects.filter(user_id=user_id).update(**updates, updated_at=timezone.now()):
+        bump_principal([user_id])
+        return
+
+    # Cuenta sin fila de progreso (anterior a los contadores): se crea ya reconciliada
+    UserProgress.objects.get_or_create(user_id=user_id)
+    reconcile_progress([user_id])
+    extra = {field: delta for field, delta in deltas.items() if field not in derived_counters()}
+    if extra:
+        adjust_progress(user_id, **extra)
+
+
+def reconcile_progress(user_ids):
+    """
+    Recalcula los contadores derivables de estos usuarios con SQL de
+    conjuntos y corrige solo las filas desviadas. Crea las filas faltantes.
+    total_images_generated no se puede derivar (las imágenes no se guardan)
+    y se deja como está. Retorna {"created": n, "fixed": n}.
+    """
+    if not user_ids:
+        return {'created': 0, 'fixed': 0}
+
+    # Como UUID: comparados con los pk leídos de la base ("abc..." != UUID("abc..."))
+    user_ids = [User._meta.pk.to_python(user_id) for user_id in user_ids]
+    existing = set(UserProgress.objects.filter(user_id__in=user_ids).values_list('user_id', flat=True))
+    missing = [user_id for user_id in user_ids if user_id not in existing]
+    UserProgress.objects.bulk_create(
+        [UserProgress(user_id=user_id) for user_id in missing], ignore_conflicts=True
+    )
+
+    expected = derived_counters()
+    drift = Q()
+    for field in expected:
+        drift |= ~Q(**{field: F(f'expected_{field}')})
+    drifted = list(
+        UserProgress.objects.filter(user_id__in=user_ids)
+        .annotate(**{f'expected_{field}': expression for field, expression in expected.items()})
+        .filter(drift)
+        .values_list('pk', flat=True)
+    )
+    if drifted:
+        UserProgress.objects.filter(pk__in=drifted).update(**expected, updated_at=timezone.now())
+        bump_principal(UserProgress.objects.filter(pk__in=drifted).values_list('user_id', flat=True))
+    return {'created': len(missing), 'fixed': len(drifted)}
+
+
+STATS_FIELDS = ('total_animals_explored', 'total_chats', 'total_messages', 'current_streak_days', 'updated_at')
+
+
+def get_progress_stats(user_id):
+    """Contadores del dashboard en una sola lectura por user_id (crea la fila si falta)"""
+    row = UserProgress.objects.filter(user_id=user_id).values(*STATS_FIELDS).first()
+    if row is None:
+        reconcile_progress([user_id])
+        row = UserProgress.objects.filter(user_id=user_id).values(*STATS_FIELDS).first()
+    return row
+
+
+def registered_user_ids(after=None, limit=500):
+    """Ids de usuarios registrados activos por keyset (para recorrer en lotes)"""
+    users = User.objects.filter(is_guest=False, deleted_at__isnull=True).order_by('id')
+    if after is not None:
+        users = users.filter(id__gt=after)
+    return list(users.values_list('id', flat=True)[:limit])
@@ -0,0 +1,148 @@
+"""
+Sesiones de invitado firmadas (sin fila por invitado)
+
+Antes cada POST /api/auth/guest insertaba un GuestSession y cada verify
+hacía un SELECT más un save() de la fila completa para mover
+last_activity_at. Con GUEST_SESSION_MODE = 'signed' (por defecto):
+
+- El token es autocontenido: {sid, apodo, vencimiento} firmado con
+  SECRET_KEY (django.core.signing, sal propia). Crear y verificar no tocan
+  la base; un token alterado no pasa la firma.
+- GUEST_ACTIVITY_TRACKING (opcional): cada verify solo anota (sid, hora)
+  en memoria del worker; cada GUEST_ACTIVITY_FLUSH_SECONDS lo acumulado se
+  escribe en guest_sessions con un bulk upsert por lote (una fila por
+  invitado activo, session_token = "signed:<sid>"). Si el worker muere se
+  pierde como mucho un intervalo de actividad.
+
+Los tokens opacos ya emitidos (modo 'database', sin ':') se siguen
+verificando contra guest_sessions hasta que vencen.
+"""
+
+import logging
+import secrets
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core import signing
+from django.db import DatabaseError
+from django.utils import timezone
+
+from .models import GuestSession
+
+logger = logging.getLogger(__name__)
+
+SIGNING_SALT = 'api.guest_sessions'
+SIGNED_PREFIX = 'signed:'
+
+GuestPass = namedtuple('GuestPass', 'session_token nickname expires_at')
+
+
+def _signed(token):
+    # Los tokens firmados llevan ':' (separador de la firma); los opacos nunca
+    return ':' in token
+
+
+def create_guest_session(nickname, now=None):
+    """Emite una sesión de invitado y retorna su GuestPass"""
+    now = now or timezone.now()
+    expires_at = now + timedelta(hours=settings.GUEST_SESSION_HOURS)
+
+    if settings.GUEST_SESSION_MODE != 'signed':
+        session = GuestSession.objects.create(
+            session_token=secrets.token_urlsafe(32),
+            user_nickname=nickname,
+            expires_at=expires_at
+        )
+        return GuestPass(session.session_token, session.user_nickname, session.expires_at)
+
+    payload = {'sid': secrets.token_urlsafe(12), 'nick': nickname, 'exp': int(expires_at.timestamp())}
+    token = signing.dumps(payload, salt=SIGNING_SALT, compress=True)
+    return GuestPass(token, nickname, datetime.fromtimestamp(payload['exp'], dt_timezone.utc))
+
+
+def read_guest_session(token):
+    """
+    GuestPass del token (vencido o no: el llamador compara expires_at),
+    o None si la firma no es válida o la sesión no existe.
+    """
+    if not _signed(token):
+        session = GuestSession.objects.filter(session_token=token).first()
+        if session is None:
+            return None
+        return GuestPass(session.session_token, session.user_nickname, session.expires_at)
+
+    try:
+        payload = signing.loads(token, salt=SIGNING_SALT)
+        expires_at = datetime.fromtimestamp(payload['exp'], dt_timezone.utc)
+        return GuestPass(SIGNED_PREFIX + payload['sid'], payload['nick'], expires_at)
+    except (signing.BadSignature, KeyError, TypeError, ValueError, OverflowError):
+        return None
+
+
+# ===========================
+# ACTIVIDAD (WRITE-BEHIND)
+# ===========================
+
+_pending = {}            # session_token -> (GuestPass, primera vista, última vista)
+_next_flush = 0.0
+_lock = threading.Lock()
+_flush_lock = threading.Lock()
+
+
+def record_guest_activity(guest, now=None):
+    """
+    Anota actividad del invitado en memoria (sin consultas). No hace nada
+    si GUEST_ACTIVITY_TRACKING está apagado.
+    """
+    if not settings.GUEST_ACTIVITY_TRACKING:
+        return
+    now = now or timezone.now()
+    with _lock:
+        _, first_seen, _ = _pending.get(guest.session_token, (guest, now, now))
+        _pending[guest.session_token] = (guest, first_seen, now)
+    if time.monotonic() >= _next_flush:
+        flush_guest_activity()
+
+
+def flush_guest_activity():
+    """
+    Escribe lo acumulado en guest_sessions: un upsert por lote de
+    GUEST_ACTIVITY_BATCH_SIZE invitados que solo mueve last_activity_at.
+    Si la base falla, lo acumulado vuelve al buffer. Retorna filas escritas.
+    """
+    global _pending, _next_flush
+
+    if not _flush_lock.acquire(blocking=False):
+        return 0  # otro thread de este worker ya está escribiendo
+    try:
+        with _lock:
+            pending, _pending = _pending, {}
+            _next_flush = time.monotonic() + settings.GUEST_ACTIVITY_FLUSH_SECONDS
+
+        rows = [
+            GuestSession(
+                session_token=token, user_nickname=guest.nickname, expires_at=guest.expires_at,
+                created_at=first_seen, last_activity_at=last_seen,
+            )
+            for token, (guest, first_seen, last_seen) in sorted(pending.items())
+        ]
+        try:
+            GuestSession.objects.bulk_create(
+                rows,
+                update_conflicts=True,
+                unique_fields=['session_token'],
+                update_fields=['last_activity_at'],
+                batch_size=settings.GUEST_ACTIVITY_BATCH_SIZE,
+            )
+        except DatabaseError:
+            logger.exception("No se pudo guardar la actividad de invitados; se reintenta en el próximo intervalo")
+            with _lock:
+                for token, entry in pending.items():
+                    _pending.setdefault(token, entry)
+            return 0
+        return len(rows)
+    finally:
+        _flush_lock.release()
@@ -0,0 +1,203 @@
+"""
+Soporte para el header Idempotency-Key en POST costosos
+
+La red del colegio es inestable y el frontend reintenta `images/generate`,
+`tts/synthesize` y `explorer/chats/save`. Con `@idempotent`:
+
+- la primera request con una clave reserva un IdempotencyRecord (INSERT;
+  la PK hace que solo un worker gane) y ejecuta la vista;
+- el registro guarda el sha256 del cuerpo: reusar la clave con otro cuerpo
+  responde 422 en vez de devolver la respuesta de otra request;
+- la respuesta (< 500) se guarda en la base durante IDEMPOTENCY_TTL y los
+  reintentos la reciben tal cual, con `Idempotent-Replayed: true`;
+- un duplicado mientras la ejecución original sigue en curso recibe 409
+  enseguida (con Retry-After), sin ocupar el worker esperando;
+- si la vista falla (excepción o 5xx) la reserva se libera para reintentar.
+
+Para hashear el cuerpo sin tenerlo entero en memoria se copia a un
+SpooledTemporaryFile (IDEMPOTENCY_SPOOL_BYTES en memoria, el resto a disco)
+y la vista lo lee desde ahí; los cuerpos de más de IDEMPOTENCY_MAX_BODY_BYTES
+reciben 413.
+
+La clave se asocia al usuario del JWT (o a la IP si no hay token), al
+método y a la ruta, así que no se comparten respuestas entre usuarios.
+Sin header la vista se ejecuta normalmente.
+"""
+
+import hashlib
+import logging
+import tempfile
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse, JsonResponse
+from django.utils import timezone
+
+from .authentication import get_token_user_id
+from .models import IdempotencyRecord
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = 'HTTP_IDEMPOTENCY_KEY'
+MAX_KEY_LENGTH = 255
+# Headers de la respuesta original que se reproducen en los reintentos
+STORED_HEADERS = ('Content-Type', 'Content-Disposition', 'Content-Language', 'ETag', 'Last-Modified', 'Location')
+# Respuestas que dependen del momento (auth, límites, conflictos): no se guardan
+TRANSIENT_STATUSES = {401, 403, 408, 409, 425, 429}
+READ_CHUNK_SIZE = 64 * 1024
+
+
+def _principal(request):
+    """Usuario del JWT (sin consultar la base) o, si no hay token válido, la IP"""
+    user_id = get_token_user_id(request)
+    if user_id is not None:
+        return f"user:{user_id}"
+    return f"ip:{request.META.get('REMOTE_ADDR', '')}"
+
+
+def _key_hash(request, key):
+    scope = '\n'.join([_principal(request), request.method, request.path, key])
+    return hashlib.sha256(scope.encode('utf-8')).hexdigest()
+
+
+def _hash_body(request):
+    """
+    Retorna (sha256 del cuerpo, spool), o (None, None) si supera
+    IDEMPOTENCY_MAX_BODY_BYTES. El spool reemplaza al stream de la request,
+    así la vista (y los parsers en streaming) leen el cuerpo como si nada.
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=settings.IDEMPOTENCY_SPOOL_BYTES)
+    digest = hashlib.sha256()
+    size = 0
+    while True:
+        chunk = request.read(READ_CHUNK_SIZE)
+        if not chunk:
+            break
+        size += len(chunk)
+        if size > settings.IDEMPOTENCY_MAX_BODY_BYTES:
+            spool.close()
+            return None, None
+        digest.update(chunk)
+        spool.write(chunk)
+    spool.seek(0)
+    request._stream = spool
+    request._read_started = False
+    return digest.hexdigest(), spool
+
+
+def _claim(key_hash, request_hash):
+    """
+    Intenta reservar la clave. Retorna (True, None) si esta request debe
+    ejecutar la vista, o (False, registro) si ya existe uno vigente
+    (registro None si no se pudo reservar ni leer).
+    """
+    ttl = timedelta(seconds=settings.IDEMPOTENCY_TTL)
+    lock_timeout = timedelta(seconds=settings.IDEMPOTENCY_LOCK_TIMEOUT)
+
+    for _ in range(3):
+        now = timezone.now()
+        try:
+            with transaction.atomic():
+                IdempotencyRecord.objects.create(
+                    key_hash=key_hash, request_hash=request_hash, started_at=now, expires_at=now + ttl
+                )
+            return True, None
+        except IntegrityError:
+            pass
+
+        record = IdempotencyRecord.objects.filter(pk=key_hash).first()
+        if record is None:
+            continue  # se liberó entre el INSERT y la lectura
+        expired = record.expires_at <= now
+        abandoned = not record.is_complete and record.started_at <= now - lock_timeout
+        if not (expired or abandoned):
+            return False, record
+
+        # Registro vencido o abandonado: UPDATE condicional, solo un worker lo toma
+        taken = IdempotencyRecord.objects.filter(pk=key_hash, started_at=record.started_at).update(
+            request_hash=request_hash, is_complete=False, status_code=None, headers={}, body=None,
+            started_at=now, expires_at=now + ttl
+        )
+        if taken:
+            return True, None
+    return False, None
+
+
+def _release(key_hash):
+    IdempotencyRecord.objects.filter(pk=key_hash, is_complete=False).delete()
+
+
+def _store(key_hash, response):
+    IdempotencyRecord.objects.filter(pk=key_hash).update(
+        is_complete=True,
+        status_code=response.status_code,
+        headers={name: response[name] for name in STORED_HEADERS if response.has_header(name)},
+        body=response.content,
+    )
+
+
+def _replay(record):
+    response = HttpResponse(bytes(record.body or b''), status=record.status_code)
+    for name, value in record.headers.items():
+        response[name] = value
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def _in_progress():
+    response = JsonResponse({"error": "Hay una solicitud en curso con este Idempotency-Key"}, status=409)
+    response['Retry-After'] = '1'
+    return response
+
+
+def _run_once(view_func, request, key, request_hash, *args, **kwargs):
+    """Reserva la clave y ejecuta la vista, o responde el replay / 422 / 409"""
+    key_hash = _key_hash(request, key)
+    claimed, record = _claim(key_hash, request_hash)
+    if not claimed:
+        if record is not None and record.request_hash not in ('', request_hash):
+            return JsonResponse({
+                "error": "Este Idempotency-Key ya se usó con otro cuerpo de solicitud"
+            }, status=422)
+        if record is not None and record.is_complete:
+            logger.info("♻️ Idempotency-Key repetido en %s: se reproduce la respuesta guardada", request.path)
+            return _replay(record)
+        return _in_progress()
+
+    try:
+        response = view_func(request, *args, **kwargs)
+        if hasattr(response, 'render') and not getattr(response, 'is_rendered', True):
+            response.render()
+    except Exception:
+        _release(key_hash)
+        raise
+
+    if response.streaming or response.status_code >= 500 or response.status_code in TRANSIENT_STATUSES:
+        _release(key_hash)
+    else:
+        _store(key_hash, response)
+    return response
+
+
+def idempotent(view_func):
+    """
+    Decorador para vistas POST. Debe ir por fuera de todo (incluido @api_view)
+    para que los reintentos no vuelvan a parsear el cuerpo ni a autenticar.
+    """
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        key = request.META.get(IDEMPOTENCY_HEADER)
+        if not key or request.method != 'POST':
+            return view_func(request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return JsonResponse({"error": "Idempotency-Key demasiado largo"}, status=400)
+
+        request_hash, spool = _hash_body(request)
+        if request_hash is None:
+            return JsonResponse({"error": "El cuerpo de la solicitud es demasiado grande"}, status=413)
+        with spool:
+            return _run_once(view_func, request, key, request_hash, *args, **kwargs)
+
+    return wrapper
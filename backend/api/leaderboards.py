@@ -0,0 +1,105 @@
+"""
+Tablas de posiciones globales y por aula
+
+Las posiciones no se calculan por request (COUNT(*) WHERE puntos > x sobre
+user_progress no escala). Se guardan ya rankeadas en leaderboard_entries:
+
+- refresh_leaderboards() reconstruye cada tabla con SQL de conjuntos:
+  un INSERT ... SELECT con RANK() OVER (PARTITION BY aula ORDER BY score)
+  para el ranking global y otro para las aulas, dentro de una transacción
+  por tabla (los lectores ven la versión anterior hasta el commit).
+  Pensado para correr por cron cada pocos minutos.
+- top(board, scope, n):   rango del índice (board, scope, rank), O(log n + N)
+- my_rank(board, scope):  búsqueda por la clave única (board, scope, user), O(log n)
+
+Tablas: points (puntos acumulados desde el nivel 1), animals (animales
+explorados) y streak (racha actual). Solo usuarios registrados activos con
+puntaje > 0. Los empates comparten posición (RANK).
+"""
+
+import logging
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import LeaderboardEntry, User, UserProgress, UserSettings, LEVEL_THRESHOLDS
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_SCOPE = ''
+
+
+def _lifetime_points_sql():
+    """Puntos acumulados de user_progress p (nivel -> puntos al llegar + puntos del nivel)"""
+    whens = ' '.join(f"WHEN {level} THEN {threshold}" for level, threshold in enumerate(LEVEL_THRESHOLDS, start=1))
+    return f"(CASE p.current_level {whens} ELSE {LEVEL_THRESHOLDS[-1]} END + p.total_points)"
+
+
+# Expresión SQL del puntaje de cada tabla (sobre user_progress p)
+BOARD_SCORES = {
+    'points': _lifetime_points_sql,
+    'animals': lambda: 'p.total_animals_explored',
+    'streak': lambda: 'p.current_streak_days',
+}
+BOARDS = tuple(BOARD_SCORES)
+
+
+def _insert_ranked_sql(score, classrooms):
+    entries = LeaderboardEntry._meta.db_table
+    progress = UserProgress._meta.db_table
+    users = User._meta.db_table
+    user_settings = UserSettings._meta.db_table
+    scope = 's.classroom_code' if classrooms else '%s'
+    join = f"JOIN {user_settings} s ON s.user_id = p.user_id AND s.classroom_code <> ''" if classrooms else ''
+    partition = 'PARTITION BY scope ' if classrooms else ''
+    return f"""
+        INSERT INTO {entries} (board, scope, user_id, score, rank, refreshed_at)
+        SELECT %s, scope, user_id, score, RANK() OVER ({partition}ORDER BY score DESC), %s
+        FROM (
+            SELECT {scope} AS scope, p.user_id AS user_id, {score} AS score
+            FROM {progress} p
+            JOIN {users} u ON u.id = p.user_id
+            {join}
+            WHERE u.is_guest = %s AND u.deleted_at IS NULL
+        ) ranked
+        WHERE score > 0
+    """
+
+
+def refresh_leaderboards(boards=BOARDS, now=None):
+    """
+    Reconstruye las tablas indicadas (global y todas las aulas).
+    Retorna {board: filas escritas}.
+    """
+    now = now or timezone.now()
+    stamp = LeaderboardEntry._meta.get_field('refreshed_at').get_db_prep_value(now, connection)
+    written = {}
+    for board in boards:
+        score = BOARD_SCORES[board]()
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {LeaderboardEntry._meta.db_table} WHERE board = %s", [board])
+            cursor.execute(_insert_ranked_sql(score, classrooms=False), [board, stamp, GLOBAL_SCOPE, False])
+            written[board] = cursor.rowcount
+            cursor.execute(_insert_ranked_sql(score, classrooms=True), [board, stamp, False])
+            written[board] += cursor.rowcount
+        logger.info("🏅 Tabla de posiciones '%s' reconstruida: %s filas", board, written[board])
+    return written
+
+
+def top(board, scope=GLOBAL_SCOPE, limit=10):
+    """Primeros `limit` de la tabla (empates por orden de usuario)"""
+    return list(
+        LeaderboardEntry.objects.filter(board=board, scope=scope)
+        .order_by('rank', 'user_id')
+        .select_related('user')
+        .only('rank', 'score', 'refreshed_at', 'user_id', 'user__display_name', 'user__avatar_url')[:limit]
+    )
+
+
+def my_rank(board, user_id, scope=GLOBAL_SCOPE):
+    """(posición, puntaje) del usuario, o None si no figura (puntaje 0 o aún sin refrescar)"""
+    return (
+        LeaderboardEntry.objects.filter(board=board, scope=scope, user_id=user_id)
+        .values_list('rank', 'score')
+        .first()
+    )
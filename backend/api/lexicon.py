@@ -0,0 +1,176 @@
+"""
+Léxico compilado de animales para detección en texto
+
+Motor de coincidencias puro (sin base de datos). Los nombres vienen del
+catálogo de animales: api/catalog.py construye el léxico una vez por
+versión del catálogo y lo comparten la detección de animales en los
+chats y la generación de imágenes.
+
+- No distingue mayúsculas ni tildes ("León" == "leon" == "LEON") y las
+  posiciones devueltas apuntan al texto original.
+- Reconoce singular y plural ("tiburón"/"tiburones", "pez"/"peces") y
+  nombres de varias palabras ("león marino").
+- Solo coincide con palabras completas: "gatorade" no es "gato" y
+  "precioso" no es "oso".
+- Recorre el texto una sola vez: todas las formas se compilan en un trie de
+  caracteres convertido a una única expresión regular, sin volver a
+  escanear el texto por cada animal (ver scripts/bench_lexicon.py).
+
+Uso:
+    lexicon = AnimalLexicon([("León", ["león"]), ("León marino", ["león marino", "lobo marino"])])
+    lexicon.find(texto)            -> [AnimalMatch(name, start, end, text), ...]
+    lexicon.counts(texto)          -> {"León": 2, "León marino": 1}
+    lexicon.most_mentioned(texto)  -> "León" o None
+"""
+
+import re
+from collections import namedtuple
+
+# Palabras que, justo antes de un nombre, indican que no es el animal ("se llama")
+EXCLUDED_CONTEXTS = {
+    'llama': {'se', 'me', 'te', 'le', 'lo', 'nos', 'les'},
+}
+
+AnimalMatch = namedtuple('AnimalMatch', ['name', 'start', 'end', 'text'])
+
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+_FOLD_TABLE = str.maketrans('áéíóúüñàèìòùâêîôû', 'aeiouunaeiouaeiou')
+# Cada letra base del trie acepta también sus variantes con tilde
+_CHAR_CLASSES = {
+    'a': '[aáàâ]', 'e': '[eéèê]', 'i': '[iíìî]', 'o': '[oóòô]', 'u': '[uúùûü]', 'n': '[nñ]',
+    ' ': r'\s+',
+}
+_END = object()  # clave del trie que marca "aquí termina un nombre"
+
+
+def lower_preserving_length(text):
+    """Minúsculas sin cambiar la longitud (posiciones estables)"""
+    lowered = text.lower()
+    if len(lowered) != len(text):
+        # Algunos caracteres raros cambian de longitud al pasar a minúsculas
+        lowered = ''.join(c.lower() if len(c.lower()) == 1 else c for c in text)
+    return lowered
+
+
+def fold(text):
+    """Minúsculas y sin tildes"""
+    return lower_preserving_length(text).translate(_FOLD_TABLE)
+
+
+def pluralize(word):
+    """Plural regular en español de una palabra ya normalizada"""
+    if word.endswith('z'):
+        return word[:-1] + 'ces'
+    if word[-1] in 'aeiou':
+        return word + 's'
+    return word + 'es'
+
+
+def pluralize_phrase(words):
+    """Plural de un nombre de varias palabras: "leon marino" -> "leones marinos",
+    "conejillo de indias" -> "conejillos de indias" (no se toca lo que sigue a "de")"""
+    result = []
+    for index, word in enumerate(words):
+        if word in ('de', 'del'):
+            return result + words[index:]
+        result.append(pluralize(word))
+    return result
+
+
+def _trie_pattern(node):
+    """Convierte un trie de caracteres en una expresión regular sin retroceso entre ramas"""
+    end = _END in node
+    branches = []
+    singles = []
+    for char in sorted(key for key in node if key is not _END):
+        child = _trie_pattern(node[char])
+        if child is None:
+            singles.append(char)
+        else:
+            branches.append(_CHAR_CLASSES.get(char, re.escape(char)) + child)
+    if len(singles) == 1:
+        branches.append(_CHAR_CLASSES.get(singles[0], re.escape(singles[0])))
+    elif singles and not any(char in _CHAR_CLASSES for char in singles):
+        # Solo literales de un carácter: una clase [abc]
+        branches.append('[' + ''.join(re.escape(char) for char in singles) + ']')
+    elif singles:
+        # Hay clases ([aáàâ]) o \s+: no se pueden anidar dentro de otra clase
+        branches.append('(?:' + '|'.join(_CHAR_CLASSES.get(char, re.escape(char)) for char in singles) + ')')
+    if not branches:
+        return None
+    pattern = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+    if end:
+        pattern = '(?:' + pattern + ')?'
+    return pattern
+
+
+class AnimalLexicon:
+    """
+    Formas normalizadas (singular y plural) -> nombre canónico del animal.
+    Las formas se compilan en un trie de caracteres convertido a una sola
+    expresión regular: el motor (en C) recorre el texto en minúsculas una
+    vez y en cada posición solo sigue la rama del trie que coincide.
+    """
+
+    def __init__(self, entries, excluded_contexts=None):
+        """
+        entries: iterable de (nombre_canónico, [formas en español]).
+        Cada forma se agrega en singular y con su plural regular; los plurales
+        irregulares se pasan como formas adicionales.
+        """
+        self._forms = {}
+        for canonical, forms in entries:
+            for form in forms:
+                words = fold(form).split()
+                if not words:
+                    continue
+                self._forms.setdefault(' '.join(words), canonical)
+                self._forms.setdefault(' '.join(pluralize_phrase(words)), canonical)
+        self._excluded = {
+            fold(name).split()[0]: {fold(word) for word in words}
+            for name, words in (excluded_contexts or {}).items()
+        }
+
+        root = {}
+        for form in self._forms:
+            node = root
+            for char in form:
+                node = node.setdefault(char, {})
+            node[_END] = True
+        # (?<!\w) ... (?!\w): solo palabras completas; el trie prueba primero las formas más largas
+        pattern = _trie_pattern(root)
+        self._regex = re.compile(r'(?<!\w)' + pattern + r'(?!\w)') if pattern else None
+
+    def find(self, text):
+        """Todas las menciones, en orden de aparición (coincidencia más larga primero)"""
+        if not text or self._regex is None:
+            return []
+        lowered = lower_preserving_length(text)
+        matches = []
+        for m in self._regex.finditer(lowered):
+            form = ' '.join(fold(m.group()).split())
+            if self._is_excluded(lowered, m.start(), form):
+                continue
+            matches.append(AnimalMatch(self._forms[form], m.start(), m.end(), text[m.start():m.end()]))
+        return matches
+
+    def _is_excluded(self, lowered, start, form):
+        context = self._excluded.get(form.split()[0])
+        if not context:
+            return False
+        previous = _WORD_RE.findall(fold(lowered[max(0, start - 20):start]))
+        return bool(previous) and previous[-1] in context
+
+    def counts(self, text):
+        """{nombre: menciones}, en orden de primera aparición"""
+        result = {}
+        for match in self.find(text):
+            result[match.name] = result.get(match.name, 0) + 1
+        return result
+
+    def most_mentioned(self, text):
+        """El animal con más menciones (empate: el que aparece primero) o None"""
+        counts = self.counts(text)
+        if not counts:
+            return None
+        return max(counts, key=counts.get)
@@ -0,0 +1,102 @@
+"""
+Comando para recalcular animales detectados y explorados desde el historial
+Ejecutar con: python manage.py backfill_animals
+
+Usar después de cambiar el catálogo de animales. En paralelo, un proceso
+por partición:
+    python manage.py backfill_animals --partitions 4 --partition 0
+    python manage.py backfill_animals --partitions 4 --partition 1  (etc.)
+
+Si se corta, volver a ejecutarlo con los mismos argumentos y --resume.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.backfill import (
+    PHASE_DONE, new_checkpoint, load_checkpoint, save_checkpoint, run_backfill
+)
+from api.catalog import get_index
+
+
+class Command(BaseCommand):
+    help = 'Re-detecta animales en los mensajes y reconstruye animales explorados por usuario'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--partitions', type=int, default=1,
+            help='Cantidad total de particiones de usuarios (default: 1)'
+        )
+        parser.add_argument(
+            '--partition', type=int, default=0,
+            help='Partición que procesa este proceso, 0..partitions-1 (default: 0)'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=2000,
+            help='Mensajes por lote (default: 2000)'
+        )
+        parser.add_argument(
+            '--user-batch', type=int, default=200,
+            help='Usuarios por transacción al reconstruir agregados (default: 200)'
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help='Archivo de checkpoint (default: backfill_animals.<partition>-of-<partitions>.json)'
+        )
+        parser.add_argument(
+            '--resume', action='store_true',
+            help='Continuar desde el checkpoint existente'
+        )
+
+    def handle(self, *args, **options):
+        partitions, partition = options['partitions'], options['partition']
+        if partitions < 1 or not 0 <= partition < partitions:
+            raise CommandError('--partition debe estar entre 0 y --partitions - 1')
+        path = options['checkpoint'] or f'backfill_animals.{partition}-of-{partitions}.json'
+
+        checkpoint = load_checkpoint(path) if options['resume'] else None
+        if checkpoint is None:
+            checkpoint = new_checkpoint(partition, partitions)
+        elif (checkpoint['partition'], checkpoint['partitions']) != (partition, partitions):
+            raise CommandError(f'El checkpoint {path} es de otra partición')
+        elif checkpoint['phase'] == PHASE_DONE:
+            self.stdout.write(self.style.SUCCESS(f'✅ La partición {partition}/{partitions} ya estaba terminada'))
+            return
+        else:
+            self.stdout.write(f"↩️ Reanudando desde {path} (fase {checkpoint['phase']})")
+            if checkpoint['catalog_version'] != get_index().version:
+                self.stdout.write(self.style.WARNING(
+                    '⚠️ El catálogo cambió desde el checkpoint: los lotes ya procesados usaron la versión anterior'
+                ))
+
+        started = time.monotonic()
+        initial = {'scanned': checkpoint['scanned'], 'users': checkpoint['users']}
+        last_report = [started]
+
+        def progress(state):
+            save_checkpoint(path, state)
+            now = time.monotonic()
+            if now - last_report[0] < 5 and state['phase'] != PHASE_DONE:
+                return
+            last_report[0] = now
+            self.stdout.write(self._status(state, initial, now - started))
+
+        self.stdout.write(
+            f'🐾 Backfill partición {partition}/{partitions} (catálogo {checkpoint["catalog_version"]})'
+        )
+        run_backfill(checkpoint, options['chunk_size'], options['user_batch'], progress)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Terminado en {time.monotonic() - started:.1f}s: {self._status(checkpoint, initial, time.monotonic() - started)}'
+        ))
+
+    def _status(self, state, initial, elapsed):
+        elapsed = max(elapsed, 1e-6)
+        scanned = state['scanned'] - initial['scanned']
+        users = state['users'] - initial['users']
+        return (
+            f"[{state['phase']}] {state['scanned']} mensajes revisados, {state['updated']} corregidos "
+            f"({scanned / elapsed:,.0f} filas/s), {state['users']} usuarios reconstruidos "
+            f"({users / elapsed:,.1f} usuarios/s)"
+        )
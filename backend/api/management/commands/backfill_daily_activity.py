@@ -0,0 +1,60 @@
+"""
+Comando para reconstruir los rollups de actividad diaria
+Ejecutar con: python manage.py backfill_daily_activity
+
+Recalcula mensajes, preguntas y animales nuevos por día desde
+chat_messages y animals_explored (imágenes y segundos de voz no se pueden
+derivar y se conservan). Útil una vez al desplegar los rollups.
+Los mensajes cuentan en el día de su created_at; re-guardar un chat conserva
+la fecha de los mensajes que ya tenía. Los chats re-guardados antes de que
+se conservaran esas fechas cuentan en el día de su último guardado.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.activity import rebuild_daily_activity
+from api.counters import registered_user_ids
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye la actividad diaria de los usuarios desde sus chats y animales'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Usuarios por lote (default: 500)'
+        )
+        parser.add_argument(
+            '--user', action='append', default=[],
+            help='Reconstruir solo este id de usuario (se puede repetir)'
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        users = days = 0
+
+        if options['user']:
+            batches = [options['user']]
+        else:
+            batches = self._batches(options['batch_size'])
+
+        for user_ids in batches:
+            days += rebuild_daily_activity(user_ids)
+            users += len(user_ids)
+
+        elapsed = max(time.monotonic() - started, 1e-6)
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {users} usuarios procesados en {elapsed:.2f}s "
+            f"({users / elapsed:,.0f} usuarios/s): {days} días de actividad escritos"
+        ))
+
+    def _batches(self, batch_size):
+        last = None
+        while True:
+            user_ids = registered_user_ids(after=last, limit=batch_size)
+            if not user_ids:
+                return
+            yield user_ids
+            last = user_ids[-1]
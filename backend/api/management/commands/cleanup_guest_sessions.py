@@ -2,29 +2,40 @@
 Comando para limpiar sesiones de invitados expiradas
 Ejecutar con: python manage.py cleanup_guest_sessions
 
+Borra en lotes acotados (sin contar ni cargar las filas). Para limpiar
+también las cuentas de invitado usar `reap_guest_data`.
 Recomendado: Configurar como tarea CRON para ejecutar cada hora
 """
 
+import time
+
+from django.conf import settings
 from django.core.management.base import BaseCommand
-from django.utils import timezone
-from api.models import GuestSession
+
+from api.purge import reap_guest_sessions
 
 
 class Command(BaseCommand):
-    help = 'Elimina sesiones de invitados expiradas (> 24 horas)'
+    help = 'Elimina en lotes acotados las sesiones de invitados expiradas'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.PURGE_BATCH_SIZE,
+            help='Filas por sentencia DELETE (default: PURGE_BATCH_SIZE)'
+        )
+        parser.add_argument(
+            '--pause', type=float, default=settings.GUEST_REAP_PAUSE_SECONDS,
+            help='Segundos de espera entre lotes (default: GUEST_REAP_PAUSE_SECONDS)'
+        )
 
     def handle(self, *args, **options):
-        now = timezone.now()
-        
-        # Buscar sesiones expiradas
-        expired_sessions = GuestSession.objects.filter(expires_at__lt=now)
-        count = expired_sessions.count()
-        
+        started = time.monotonic()
+        count = sum(reap_guest_sessions(options['batch_size'], options['pause']).values())
+        elapsed = time.monotonic() - started
+
         if count > 0:
-            # Eliminar sesiones expiradas
-            expired_sessions.delete()
             self.stdout.write(
-                self.style.SUCCESS(f'✅ Se eliminaron {count} sesiones expiradas')
+                self.style.SUCCESS(f'✅ Se eliminaron {count} sesiones expiradas en {elapsed:.2f}s')
             )
         else:
             self.stdout.write(
@@ -0,0 +1,26 @@
+"""
+Comando para limpiar respuestas guardadas de Idempotency-Key vencidas
+Ejecutar con: python manage.py cleanup_idempotency_keys
+
+Recomendado: Configurar como tarea CRON para ejecutar cada hora
+"""
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from api.models import IdempotencyRecord
+
+
+class Command(BaseCommand):
+    help = 'Elimina las respuestas de Idempotency-Key cuyo TTL ya venció'
+
+    def handle(self, *args, **options):
+        count, _ = IdempotencyRecord.objects.filter(expires_at__lt=timezone.now()).delete()
+        
+        if count > 0:
+            self.stdout.write(
+                self.style.SUCCESS(f'✅ Se eliminaron {count} claves de idempotencia vencidas')
+            )
+        else:
+            self.stdout.write(
+                self.style.SUCCESS('✅ No hay claves de idempotencia vencidas')
+            )
@@ -0,0 +1,58 @@
+"""
+Comando para evaluar los logros de todos los usuarios
+Ejecutar con: python manage.py evaluate_achievements
+
+Desbloquea con SQL de conjuntos los logros que los contadores de
+UserProgress ya alcanzan y recalcula puntos y nivel. Útil tras
+load_achievements (logros nuevos o umbrales cambiados) o para usuarios
+anteriores al motor de logros. Idempotente.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.achievements import backfill_achievements
+from api.counters import registered_user_ids
+
+
+class Command(BaseCommand):
+    help = 'Evalúa los logros de los usuarios registrados y recalcula puntos y niveles'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Usuarios por lote/transacción (default: 500)'
+        )
+        parser.add_argument(
+            '--user', action='append', default=[],
+            help='Evaluar solo este id de usuario (se puede repetir)'
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        users = unlocked = 0
+
+        if options['user']:
+            batches = [options['user']]
+        else:
+            batches = self._batches(options['batch_size'])
+
+        for user_ids in batches:
+            unlocked += backfill_achievements(user_ids)
+            users += len(user_ids)
+
+        elapsed = max(time.monotonic() - started, 1e-6)
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {users} usuarios evaluados en {elapsed:.2f}s "
+            f"({users / elapsed:,.0f} usuarios/s): {unlocked} logros desbloqueados"
+        ))
+
+    def _batches(self, batch_size):
+        last = None
+        while True:
+            user_ids = registered_user_ids(after=last, limit=batch_size)
+            if not user_ids:
+                return
+            yield user_ids
+            last = user_ids[-1]
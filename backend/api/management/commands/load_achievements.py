@@ -5,6 +5,7 @@ Ejecutar con: python manage.py load_achievements
 
 from django.core.management.base import BaseCommand
 from api.models import Achievement
+from api.achievements import invalidate
 
 
 class Command(BaseCommand):
@@ -207,6 +208,7 @@ class Command(BaseCommand):
                     self.style.WARNING(f'🔄 Actualizado: {achievement.icon_emoji} {achievement.name}')
                 )
         
+        invalidate()
         self.stdout.write('\n')
         self.stdout.write(
             self.style.SUCCESS(f'🎉 Proceso completado:')
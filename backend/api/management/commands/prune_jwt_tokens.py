@@ -0,0 +1,38 @@
+"""
+Comando para podar los refresh tokens vencidos de la lista negra de simplejwt
+Ejecutar con: python manage.py prune_jwt_tokens
+
+Reemplaza a `flushexpiredtokens` (un solo DELETE sin límite a través del
+Collector). Recomendado: Configurar como tarea CRON cada hora.
+"""
+
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.revocation import prune_expired_tokens
+
+
+class Command(BaseCommand):
+    help = 'Borra en lotes acotados los tokens JWT vencidos (pendientes y en lista negra)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.PURGE_BATCH_SIZE,
+            help='Filas por sentencia DELETE (default: PURGE_BATCH_SIZE)'
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        deleted = prune_expired_tokens(options['batch_size'])
+        elapsed = time.monotonic() - started
+
+        total = sum(deleted.values())
+        if total:
+            detail = ', '.join(f'{table}: {count}' for table, count in deleted.items() if count)
+            self.stdout.write(
+                self.style.SUCCESS(f'✅ Podados {total} tokens vencidos en {elapsed:.2f}s ({detail})')
+            )
+        else:
+            self.stdout.write(self.style.SUCCESS('✅ No hay tokens vencidos'))
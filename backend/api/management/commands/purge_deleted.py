@@ -0,0 +1,54 @@
+"""
+Comando para purgar chats y cuentas eliminados (soft-delete)
+Ejecutar con: python manage.py purge_deleted
+
+Recomendado: Configurar como tarea CRON cada pocos minutos,
+o dejarlo corriendo con --loop.
+"""
+
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.purge import purge_deleted_chats, purge_deleted_users, purge_orphan_blobs
+
+
+class Command(BaseCommand):
+    help = 'Borra en lotes acotados los chats y cuentas marcados como eliminados'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.PURGE_BATCH_SIZE,
+            help='Filas por sentencia DELETE (default: PURGE_BATCH_SIZE)'
+        )
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Seguir ejecutando indefinidamente'
+        )
+        parser.add_argument(
+            '--sleep', type=float, default=30.0,
+            help='Segundos de espera entre pasadas con --loop (default: 30)'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.monotonic()
+            deleted = purge_deleted_chats(options['batch_size'])
+            for table, count in purge_deleted_users(options['batch_size']).items():
+                deleted[table] = deleted.get(table, 0) + count
+            deleted.update(purge_orphan_blobs(options['batch_size']))
+            elapsed = time.monotonic() - started
+
+            total = sum(deleted.values())
+            if total:
+                detail = ', '.join(f'{table}: {count}' for table, count in deleted.items() if count)
+                self.stdout.write(
+                    self.style.SUCCESS(f'✅ Purgadas {total} filas en {elapsed:.2f}s ({detail})')
+                )
+            else:
+                self.stdout.write(self.style.SUCCESS('✅ No hay nada pendiente de purgar'))
+
+            if not options['loop']:
+                break
+            time.sleep(options['sleep'])
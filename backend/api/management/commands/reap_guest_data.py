@@ -0,0 +1,64 @@
+"""
+Comando para limpiar los datos de invitados vencidos
+Ejecutar con: python manage.py reap_guest_data
+
+Borra sesiones de invitado vencidas y cuentas de invitado abandonadas (con
+sus chats, progreso, etc.) en lotes acotados por PK, cada uno en su
+transacción corta y con una pausa entre lotes. Recomendado: Configurar como
+tarea CRON cada hora, o dejarlo corriendo con --loop.
+"""
+
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.purge import reap_guest_data
+
+
+class Command(BaseCommand):
+    help = 'Borra en lotes acotados las sesiones y cuentas de invitado vencidas'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.PURGE_BATCH_SIZE,
+            help='Filas por sentencia DELETE (default: PURGE_BATCH_SIZE)'
+        )
+        parser.add_argument(
+            '--pause', type=float, default=settings.GUEST_REAP_PAUSE_SECONDS,
+            help='Segundos de espera entre lotes (default: GUEST_REAP_PAUSE_SECONDS)'
+        )
+        parser.add_argument(
+            '--max-users', type=int, default=100,
+            help='Cuentas de invitado purgadas por pasada (default: 100)'
+        )
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Seguir ejecutando indefinidamente'
+        )
+        parser.add_argument(
+            '--sleep', type=float, default=60.0,
+            help='Segundos de espera entre pasadas con --loop (default: 60)'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.monotonic()
+            deleted = reap_guest_data(options['batch_size'], options['pause'], options['max_users'])
+            elapsed = time.monotonic() - started
+
+            total = sum(deleted.values())
+            if total:
+                detail = ', '.join(f'{table}: {count}' for table, count in deleted.items() if count)
+                self.stdout.write(
+                    self.style.SUCCESS(
+                        f'✅ Borradas {total} filas en {elapsed:.2f}s '
+                        f'({total / max(elapsed, 1e-6):.0f} filas/s; {detail})'
+                    )
+                )
+            else:
+                self.stdout.write(self.style.SUCCESS('✅ No hay datos de invitados vencidos'))
+
+            if not options['loop']:
+                break
+            time.sleep(options['sleep'])
@@ -0,0 +1,25 @@
+"""
+Comando para reconstruir el índice de búsqueda de mensajes
+Ejecutar con: python manage.py rebuild_search_index
+
+Útil en SQLite si una migración recreó la tabla chat_messages
+(lo que elimina los triggers de FTS5), o para reindexar en PostgreSQL.
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from api.search import install_search_index, drop_search_index
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye el índice de búsqueda de texto completo de los mensajes'
+
+    def handle(self, *args, **options):
+        with connection.schema_editor() as schema_editor:
+            drop_search_index(schema_editor)
+            install_search_index(schema_editor)
+
+        self.stdout.write(
+            self.style.SUCCESS(f'✅ Índice de búsqueda reconstruido ({connection.vendor})')
+        )
@@ -0,0 +1,73 @@
+"""
+Comando para reparar los contadores materializados de UserProgress
+Ejecutar con: python manage.py reconcile_user_progress
+
+Recalcula total_chats, total_messages, total_questions_asked y
+total_animals_explored desde las tablas y corrige solo las filas desviadas.
+Recomendado: Configurar como tarea CRON diaria (fuera de horario de clases).
+"""
+
+import time
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from api.counters import reconcile_progress, registered_user_ids
+from api.models import User
+
+
+class Command(BaseCommand):
+    help = 'Recalcula los contadores de progreso de los usuarios y repara desvíos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Usuarios por lote (default: 500)'
+        )
+        parser.add_argument(
+            '--user', action='append', default=[],
+            help='Reconciliar solo este id de usuario (se puede repetir)'
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        totals = {'users': 0, 'created': 0, 'fixed': 0}
+
+        if options['user']:
+            batches = [self._user_ids(options['user'])]
+        else:
+            batches = self._batches(options['batch_size'])
+
+        for user_ids in batches:
+            result = reconcile_progress(user_ids)
+            totals['users'] += len(user_ids)
+            totals['created'] += result['created']
+            totals['fixed'] += result['fixed']
+
+        elapsed = max(time.monotonic() - started, 1e-6)
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {totals['users']} usuarios revisados en {elapsed:.2f}s "
+            f"({totals['users'] / elapsed:,.0f} usuarios/s): "
+            f"{totals['fixed']} con contadores desviados corregidos, {totals['created']} filas creadas"
+        ))
+
+    def _user_ids(self, values):
+        """Ids de --user como UUID (los de la base), solo de usuarios existentes"""
+        try:
+            user_ids = [User._meta.pk.to_python(value) for value in values]
+        except ValidationError:
+            raise CommandError(f"--user debe ser un id de usuario válido: {', '.join(values)}")
+        found = set(User.objects.filter(pk__in=user_ids).values_list('pk', flat=True))
+        unknown = [str(user_id) for user_id in user_ids if user_id not in found]
+        if unknown:
+            raise CommandError(f"No existen usuarios con id: {', '.join(unknown)}")
+        return user_ids
+
+    def _batches(self, batch_size):
+        last = None
+        while True:
+            user_ids = registered_user_ids(after=last, limit=batch_size)
+            if not user_ids:
+                return
+            yield user_ids
+            last = user_ids[-1]
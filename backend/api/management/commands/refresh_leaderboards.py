@@ -0,0 +1,32 @@
+"""
+Comando para reconstruir las tablas de posiciones (global y por aula)
+Ejecutar con: python manage.py refresh_leaderboards
+
+Recomendado: Configurar como tarea CRON cada 5 minutos. Cada tabla se
+reconstruye con SQL de conjuntos en una transacción.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.leaderboards import BOARDS, refresh_leaderboards
+
+
+class Command(BaseCommand):
+    help = 'Recalcula las posiciones de las tablas de puntos, animales y rachas'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--board', action='append', choices=BOARDS, default=[],
+            help='Reconstruir solo esta tabla (se puede repetir)'
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        written = refresh_leaderboards(options['board'] or BOARDS)
+
+        elapsed = time.monotonic() - started
+        for board, rows in written.items():
+            self.stdout.write(f'   • {board}: {rows} posiciones')
+        self.stdout.write(self.style.SUCCESS(f'✅ Tablas de posiciones actualizadas en {elapsed:.2f}s'))
@@ -0,0 +1,26 @@
+"""
+Comando para reiniciar las rachas de actividad que se cortaron
+Ejecutar con: python manage.py reset_broken_streaks
+
+Recomendado: Configurar como tarea CRON cada hora, así cada zona horaria
+se procesa poco después de su medianoche (un UPDATE por zona horaria).
+"""
+
+from django.core.management.base import BaseCommand
+from api.streaks import reset_broken_streaks
+
+
+class Command(BaseCommand):
+    help = 'Pone en 0 las rachas de los usuarios sin actividad ayer ni hoy'
+
+    def handle(self, *args, **options):
+        count = reset_broken_streaks()
+        
+        if count > 0:
+            self.stdout.write(
+                self.style.SUCCESS(f'✅ Se reiniciaron {count} rachas cortadas')
+            )
+        else:
+            self.stdout.write(
+                self.style.SUCCESS('✅ No hay rachas cortadas')
+            )
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.5 on 2026-10-19 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_alter_chatmessage_image_url'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='chat',
+            name='chats_user_id_5516a9_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='chatmessage',
+            name='chat_messag_chat_id_012ed9_idx',
+        ),
+        migrations.AddIndex(
+            model_name='chat',
+            index=models.Index(fields=['user', '-updated_at', '-id'], name='chats_user_id_e6473c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(fields=['chat', 'created_at', 'id'], name='chat_messag_chat_id_01b68d_idx'),
+        ),
+    ]
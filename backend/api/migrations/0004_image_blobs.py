@@ -0,0 +1,35 @@
+# Generated by Django 5.2.5 on 2026-10-19 12:02
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageBlob',
+            fields=[
+                ('sha256', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('mime_type', models.CharField(default='image/png', max_length=50)),
+                ('data', models.BinaryField()),
+                ('size_bytes', models.IntegerField()),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Imagen (blob)',
+                'verbose_name_plural': 'Imágenes (blobs)',
+                'db_table': 'image_blobs',
+            },
+        ),
+        migrations.AddField(
+            model_name='chatmessage',
+            name='image_blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='messages', to='api.imageblob'),
+        ),
+    ]
@@ -0,0 +1,97 @@
+"""
+Mueve las imágenes base64 de chat_messages.image_url a image_blobs.
+
+Recorre los mensajes por keyset de pk en lotes pequeños (nunca carga toda
+la tabla) y confirma cada lote por separado (atomic = False), así que
+puede interrumpirse y volver a ejecutarse sin perder trabajo.
+"""
+
+import base64
+import binascii
+import hashlib
+import re
+
+from django.db import migrations, transaction
+
+BATCH_SIZE = 100
+DATA_URL_RE = re.compile(r'^data:(?P<mime>[\w.+-]+/[\w.+-]+)?(?:;[^,]*)?;base64,', re.IGNORECASE)
+
+
+def _decode(value):
+    match = DATA_URL_RE.match(value[:200])
+    if not match:
+        return None
+    try:
+        return (match.group('mime') or 'image/png').lower(), base64.b64decode(value[match.end():])
+    except (binascii.Error, ValueError):
+        return None
+
+
+def forwards(apps, schema_editor):
+    ChatMessage = apps.get_model('api', 'ChatMessage')
+    ImageBlob = apps.get_model('api', 'ImageBlob')
+    db = schema_editor.connection.alias
+
+    pending = ChatMessage.objects.using(db).filter(image_url__startswith='data:')
+    last_pk = None
+    while True:
+        batch_qs = pending if last_pk is None else pending.filter(pk__gt=last_pk)
+        batch = list(batch_qs.order_by('pk').values_list('pk', 'image_url')[:BATCH_SIZE])
+        if not batch:
+            break
+        last_pk = batch[-1][0]
+
+        blobs = {}
+        links = {}
+        for pk, image_url in batch:
+            decoded = _decode(image_url)
+            if decoded is None:
+                continue
+            mime_type, data = decoded
+            sha = hashlib.sha256(data).hexdigest()
+            blobs.setdefault(sha, ImageBlob(sha256=sha, mime_type=mime_type, data=data, size_bytes=len(data)))
+            links.setdefault(sha, []).append(pk)
+        del batch
+
+        with transaction.atomic(using=db):
+            ImageBlob.objects.using(db).bulk_create(blobs.values(), ignore_conflicts=True)
+            for sha, pks in links.items():
+                ChatMessage.objects.using(db).filter(pk__in=pks).update(image_blob_id=sha, image_url=None)
+
+
+def backwards(apps, schema_editor):
+    ChatMessage = apps.get_model('api', 'ChatMessage')
+    ImageBlob = apps.get_model('api', 'ImageBlob')
+    db = schema_editor.connection.alias
+
+    linked = ChatMessage.objects.using(db).filter(image_blob__isnull=False)
+    last_pk = None
+    while True:
+        batch_qs = linked if last_pk is None else linked.filter(pk__gt=last_pk)
+        batch = list(batch_qs.order_by('pk').values_list('pk', 'image_blob_id')[:BATCH_SIZE])
+        if not batch:
+            break
+        last_pk = batch[-1][0]
+
+        shas = {sha for _, sha in batch}
+        with transaction.atomic(using=db):
+            for sha, mime_type, data in ImageBlob.objects.using(db).filter(pk__in=shas).values_list(
+                'sha256', 'mime_type', 'data'
+            ):
+                data_url = f"data:{mime_type};base64,{base64.b64encode(bytes(data)).decode('ascii')}"
+                ChatMessage.objects.using(db).filter(
+                    pk__in=[pk for pk, s in batch if s == sha]
+                ).update(image_url=data_url, image_blob_id=None)
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('api', '0004_image_blobs'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
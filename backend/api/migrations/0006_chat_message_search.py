@@ -0,0 +1,85 @@
+"""
+Índice de búsqueda de texto completo sobre chat_messages.text
+
+El DDL está copiado aquí (no se importa de api.search) para que la
+migración siga haciendo lo mismo aunque cambie el código de la app:
+- PostgreSQL: columna generada search_vector (tsvector 'spanish') + GIN
+- SQLite: tabla FTS5 de contenido externo sincronizada con triggers
+- Otros motores: nada (la búsqueda cae a LIKE)
+"""
+
+from django.db import migrations
+
+POSTGRES_SETUP = [
+    """
+    ALTER TABLE chat_messages ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS (to_tsvector('spanish', coalesce(text, ''))) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS chat_messages_search_gin ON chat_messages USING GIN (search_vector)",
+]
+
+POSTGRES_TEARDOWN = [
+    "DROP INDEX IF EXISTS chat_messages_search_gin",
+    "ALTER TABLE chat_messages DROP COLUMN IF EXISTS search_vector",
+]
+
+SQLITE_SETUP = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS chat_messages_fts USING fts5(
+        text, content='chat_messages', content_rowid='rowid',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS chat_messages_fts_ai AFTER INSERT ON chat_messages BEGIN
+        INSERT INTO chat_messages_fts(rowid, text) VALUES (new.rowid, new.text);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS chat_messages_fts_ad AFTER DELETE ON chat_messages BEGIN
+        INSERT INTO chat_messages_fts(chat_messages_fts, rowid, text) VALUES ('delete', old.rowid, old.text);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS chat_messages_fts_au AFTER UPDATE OF text ON chat_messages BEGIN
+        INSERT INTO chat_messages_fts(chat_messages_fts, rowid, text) VALUES ('delete', old.rowid, old.text);
+        INSERT INTO chat_messages_fts(rowid, text) VALUES (new.rowid, new.text);
+    END
+    """,
+    "INSERT INTO chat_messages_fts(chat_messages_fts) VALUES ('rebuild')",
+]
+
+SQLITE_TEARDOWN = [
+    "DROP TRIGGER IF EXISTS chat_messages_fts_ai",
+    "DROP TRIGGER IF EXISTS chat_messages_fts_ad",
+    "DROP TRIGGER IF EXISTS chat_messages_fts_au",
+    "DROP TABLE IF EXISTS chat_messages_fts",
+]
+
+STATEMENTS = {
+    'postgresql': (POSTGRES_SETUP, POSTGRES_TEARDOWN),
+    'sqlite': (SQLITE_SETUP, SQLITE_TEARDOWN),
+}
+
+
+def forwards(apps, schema_editor):
+    setup, _ = STATEMENTS.get(schema_editor.connection.vendor, ([], []))
+    for sql in setup:
+        schema_editor.execute(sql)
+
+
+def backwards(apps, schema_editor):
+    _, teardown = STATEMENTS.get(schema_editor.connection.vendor, ([], []))
+    for sql in teardown:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_move_base64_images_to_blobs'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
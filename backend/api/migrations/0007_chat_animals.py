@@ -0,0 +1,68 @@
+# Generated by Django 5.2.5 on 2026-10-19 12:05
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+BATCH_SIZE = 1000
+
+
+def index_existing_messages(apps, schema_editor):
+    """Construye chat_animals a partir de chat_messages.animal_mentioned"""
+    ChatMessage = apps.get_model('api', 'ChatMessage')
+    ChatAnimal = apps.get_model('api', 'ChatAnimal')
+    db = schema_editor.connection.alias
+
+    grouped = (
+        ChatMessage.objects.using(db)
+        .filter(animal_mentioned__isnull=False)
+        .values('chat_id', 'chat__user_id', 'chat__updated_at', 'animal_mentioned')
+        .annotate(mentions=Count('id'))
+        .order_by()
+    )
+    batch = []
+    for row in grouped.iterator(chunk_size=BATCH_SIZE):
+        batch.append(ChatAnimal(
+            chat_id=row['chat_id'],
+            user_id=row['chat__user_id'],
+            animal_name=row['animal_mentioned'],
+            mentions=row['mentions'],
+            last_mentioned_at=row['chat__updated_at'],
+        ))
+        if len(batch) >= BATCH_SIZE:
+            ChatAnimal.objects.using(db).bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    if batch:
+        ChatAnimal.objects.using(db).bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_chat_message_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChatAnimal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('animal_name', models.CharField(max_length=100)),
+                ('mentions', models.IntegerField(default=1)),
+                ('last_mentioned_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('chat', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='animals', to='api.chat')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chat_animals', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Animal en Chat',
+                'verbose_name_plural': 'Animales en Chats',
+                'db_table': 'chat_animals',
+                'indexes': [models.Index(fields=['user', 'animal_name', '-last_mentioned_at', '-id'], name='chat_animal_user_id_b56333_idx')],
+                'unique_together': {('chat', 'animal_name')},
+            },
+        ),
+        migrations.RunPython(index_existing_messages, migrations.RunPython.noop),
+    ]
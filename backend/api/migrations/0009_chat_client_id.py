@@ -0,0 +1,22 @@
+# Generated by Django 5.2.5 on 2026-10-19 12:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_soft_delete'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chat',
+            name='client_id',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='chat',
+            constraint=models.UniqueConstraint(condition=models.Q(('client_id__isnull', False)), fields=('user', 'client_id'), name='chats_user_client_id_uniq'),
+        ),
+    ]
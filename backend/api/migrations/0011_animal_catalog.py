@@ -0,0 +1,160 @@
+# Generated by Django 5.2.5 on 2026-10-19 12:17
+
+from django.db import migrations, models
+
+# Catálogo inicial copiado aquí (no se lee fixtures/animals.json) para que la
+# migración cargue siempre las mismas filas aunque la fixture cambie.
+# (slug, nombre, sinónimos, plurales irregulares, inglés, emoji, categoría)
+ANIMALS = [
+    ('leon', 'León', [], [], 'lion', '🦁', 'mamifero'),
+    ('tigre', 'Tigre', [], [], 'tiger', '🐯', 'mamifero'),
+    ('elefante', 'Elefante', [], [], 'elephant', '🐘', 'mamifero'),
+    ('jirafa', 'Jirafa', [], [], 'giraffe', '🦒', 'mamifero'),
+    ('cebra', 'Cebra', [], [], 'zebra', '🦓', 'mamifero'),
+    ('rinoceronte', 'Rinoceronte', [], [], 'rhinoceros', '🦏', 'mamifero'),
+    ('hipopotamo', 'Hipopótamo', [], [], 'hippopotamus', '🦛', 'mamifero'),
+    ('cocodrilo', 'Cocodrilo', ['caimán', 'yacaré'], [], 'crocodile', '🐊', 'reptil'),
+    ('serpiente', 'Serpiente', ['culebra', 'víbora'], [], 'snake', '🐍', 'reptil'),
+    ('aguila', 'Águila', [], [], 'eagle', '🦅', 'ave'),
+    ('buho', 'Búho', ['lechuza', 'tecolote'], [], 'owl', '🦉', 'ave'),
+    ('loro', 'Loro', ['perico', 'cotorra', 'guacamaya', 'papagayo'], [], 'parrot', '🦜', 'ave'),
+    ('tucan', 'Tucán', [], [], 'toucan', '🐦', 'ave'),
+    ('pinguino', 'Pingüino', [], [], 'penguin', '🐧', 'ave'),
+    ('delfin', 'Delfín', [], [], 'dolphin', '🐬', 'mamifero'),
+    ('ballena', 'Ballena', [], [], 'whale', '🐋', 'mamifero'),
+    ('tiburon', 'Tiburón', [], [], 'shark', '🦈', 'pez'),
+    ('oso', 'Oso', [], [], 'bear', '🐻', 'mamifero'),
+    ('lobo', 'Lobo', [], [], 'wolf', '🐺', 'mamifero'),
+    ('zorro', 'Zorro', [], [], 'fox', '🦊', 'mamifero'),
+    ('conejo', 'Conejo', [], [], 'rabbit', '🐰', 'mamifero'),
+    ('ardilla', 'Ardilla', [], [], 'squirrel', '🐿️', 'mamifero'),
+    ('perro', 'Perro', ['perrito'], [], 'dog', '🐶', 'mamifero'),
+    ('gato', 'Gato', ['gatito', 'minino'], [], 'cat', '🐱', 'mamifero'),
+    ('caballo', 'Caballo', ['yegua', 'potro'], [], 'horse', '🐴', 'mamifero'),
+    ('vaca', 'Vaca', ['toro'], [], 'cow', '🐮', 'mamifero'),
+    ('cerdo', 'Cerdo', ['chancho', 'cochino', 'puerco'], [], 'pig', '🐷', 'mamifero'),
+    ('gallina', 'Gallina', ['gallo', 'pollito'], [], 'chicken', '🐔', 'ave'),
+    ('pato', 'Pato', [], [], 'duck', '🦆', 'ave'),
+    ('pavo', 'Pavo', ['guajolote'], [], 'turkey', '🦃', 'ave'),
+    ('mono', 'Mono', ['chango'], [], 'monkey', '🐒', 'mamifero'),
+    ('gorila', 'Gorila', [], [], 'gorilla', '🦍', 'mamifero'),
+    ('chimpance', 'Chimpancé', [], [], 'chimpanzee', '🐒', 'mamifero'),
+    ('orangutan', 'Orangután', [], [], 'orangutan', '🦧', 'mamifero'),
+    ('canguro', 'Canguro', [], [], 'kangaroo', '🦘', 'mamifero'),
+    ('koala', 'Koala', [], [], 'koala', '🐨', 'mamifero'),
+    ('panda', 'Panda', [], [], 'panda', '🐼', 'mamifero'),
+    ('rana', 'Rana', [], [], 'frog', '🐸', 'anfibio'),
+    ('sapo', 'Sapo', [], [], 'toad', '🐸', 'anfibio'),
+    ('tortuga', 'Tortuga', [], [], 'turtle', '🐢', 'reptil'),
+    ('galapago', 'Galápago', [], [], 'giant tortoise', '🐢', 'reptil'),
+    ('lagarto', 'Lagarto', ['lagartija'], [], 'lizard', '🦎', 'reptil'),
+    ('iguana', 'Iguana', [], [], 'iguana', '🦎', 'reptil'),
+    ('camaleon', 'Camaleón', [], [], 'chameleon', '🦎', 'reptil'),
+    ('mariposa', 'Mariposa', [], [], 'butterfly', '🦋', 'insecto'),
+    ('abeja', 'Abeja', [], [], 'bee', '🐝', 'insecto'),
+    ('hormiga', 'Hormiga', [], [], 'ant', '🐜', 'insecto'),
+    ('arana', 'Araña', [], [], 'spider', '🕷️', 'aracnido'),
+    ('mosquito', 'Mosquito', ['zancudo'], [], 'mosquito', '🦟', 'insecto'),
+    ('mosca', 'Mosca', [], [], 'fly', '🪰', 'insecto'),
+    ('escarabajo', 'Escarabajo', [], [], 'beetle', '🪲', 'insecto'),
+    ('pajaro', 'Pájaro', ['ave'], [], 'bird', '🐦', 'ave'),
+    ('paloma', 'Paloma', [], [], 'pigeon', '🕊️', 'ave'),
+    ('gorrion', 'Gorrión', [], [], 'sparrow', '🐦', 'ave'),
+    ('canario', 'Canario', [], [], 'canary', '🐤', 'ave'),
+    ('flamenco', 'Flamenco', [], [], 'flamingo', '🦩', 'ave'),
+    ('pelicano', 'Pelícano', [], [], 'pelican', '🐦', 'ave'),
+    ('gaviota', 'Gaviota', [], [], 'seagull', '🐦', 'ave'),
+    ('pez', 'Pez', ['pececito'], [], 'fish', '🐟', 'pez'),
+    ('salmon', 'Salmón', [], [], 'salmon', '🐟', 'pez'),
+    ('atun', 'Atún', [], [], 'tuna', '🐟', 'pez'),
+    ('trucha', 'Trucha', [], [], 'trout', '🐟', 'pez'),
+    ('carpa', 'Carpa', [], [], 'carp', '🐟', 'pez'),
+    ('pirana', 'Piraña', [], [], 'piranha', '🐟', 'pez'),
+    ('anguila', 'Anguila', [], [], 'eel', '🐍', 'pez'),
+    ('venado', 'Venado', [], [], 'deer', '🦌', 'mamifero'),
+    ('ciervo', 'Ciervo', [], [], 'deer', '🦌', 'mamifero'),
+    ('alce', 'Alce', [], [], 'moose', '\U0001face', 'mamifero'),
+    ('bisonte', 'Bisonte', [], [], 'bison', '🦬', 'mamifero'),
+    ('bufalo', 'Búfalo', [], [], 'buffalo', '🐃', 'mamifero'),
+    ('camello', 'Camello', [], [], 'camel', '🐫', 'mamifero'),
+    ('dromedario', 'Dromedario', [], [], 'dromedary', '🐪', 'mamifero'),
+    ('llama', 'Llama', [], [], 'llama', '🦙', 'mamifero'),
+    ('alpaca', 'Alpaca', [], [], 'alpaca', '🦙', 'mamifero'),
+    ('oveja', 'Oveja', ['cordero', 'borrego'], [], 'sheep', '🐑', 'mamifero'),
+    ('cabra', 'Cabra', ['chivo'], [], 'goat', '🐐', 'mamifero'),
+    ('burro', 'Burro', ['asno'], [], 'donkey', '\U0001facf', 'mamifero'),
+    ('mula', 'Mula', [], [], 'mule', '\U0001facf', 'mamifero'),
+    ('yak', 'Yak', [], ['yaks'], 'yak', '🐃', 'mamifero'),
+    ('jaguar', 'Jaguar', ['yaguar'], [], 'jaguar', '🐆', 'mamifero'),
+    ('leopardo', 'Leopardo', [], [], 'leopard', '🐆', 'mamifero'),
+    ('guepardo', 'Guepardo', ['chita'], [], 'cheetah', '🐆', 'mamifero'),
+    ('pantera', 'Pantera', [], [], 'panther', '🐆', 'mamifero'),
+    ('lince', 'Lince', [], [], 'lynx', '🐈', 'mamifero'),
+    ('puma', 'Puma', [], [], 'puma', '🐆', 'mamifero'),
+    ('ocelote', 'Ocelote', [], [], 'ocelot', '🐆', 'mamifero'),
+    ('mapache', 'Mapache', [], [], 'raccoon', '🦝', 'mamifero'),
+    ('tejon', 'Tejón', [], [], 'badger', '🦡', 'mamifero'),
+    ('nutria', 'Nutria', [], [], 'otter', '🦦', 'mamifero'),
+    ('foca', 'Foca', [], [], 'seal', '🦭', 'mamifero'),
+    ('morsa', 'Morsa', [], [], 'walrus', '🦭', 'mamifero'),
+    ('leon-marino', 'León marino', ['lobo marino'], [], 'sea lion', '🦭', 'mamifero'),
+    ('murcielago', 'Murciélago', [], [], 'bat', '🦇', 'mamifero'),
+    ('rata', 'Rata', [], [], 'rat', '🐀', 'mamifero'),
+    ('raton', 'Ratón', [], [], 'mouse', '🐭', 'mamifero'),
+    ('hamster', 'Hámster', [], [], 'hamster', '🐹', 'mamifero'),
+    ('cobaya', 'Cobaya', ['cuy', 'conejillo de indias'], [], 'guinea pig', '🐹', 'mamifero'),
+    ('erizo', 'Erizo', [], [], 'hedgehog', '🦔', 'mamifero'),
+    ('topo', 'Topo', [], [], 'mole', '🐀', 'mamifero'),
+    ('dragon', 'Dragón', [], [], 'dragon', '🐉', 'fantastico'),
+]
+
+
+def load_catalog(apps, schema_editor):
+    """Carga el catálogo inicial (con el modelo histórico)"""
+    Animal = apps.get_model('api', 'Animal')
+    Animal.objects.using(schema_editor.connection.alias).bulk_create(
+        [
+            Animal(
+                slug=slug, name=name, synonyms=synonyms, plurals=plurals,
+                english_name=english_name, emoji=emoji, category=category,
+            )
+            for slug, name, synonyms, plurals, english_name, emoji, category in ANIMALS
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def unload_catalog(apps, schema_editor):
+    Animal = apps.get_model('api', 'Animal')
+    Animal.objects.using(schema_editor.connection.alias).all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_idempotency_keys'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Animal',
+            fields=[
+                ('slug', models.SlugField(max_length=100, primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('synonyms', models.JSONField(blank=True, default=list)),
+                ('plurals', models.JSONField(blank=True, default=list)),
+                ('english_name', models.CharField(max_length=100)),
+                ('emoji', models.CharField(blank=True, max_length=16)),
+                ('category', models.CharField(choices=[('mamifero', 'Mamífero'), ('ave', 'Ave'), ('reptil', 'Reptil'), ('anfibio', 'Anfibio'), ('pez', 'Pez'), ('insecto', 'Insecto'), ('aracnido', 'Arácnido'), ('fantastico', 'Fantástico')], max_length=20)),
+                ('is_active', models.BooleanField(default=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Animal',
+                'verbose_name_plural': 'Animales',
+                'db_table': 'animals',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.RunPython(load_catalog, unload_catalog),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.5 on 2026-10-19 12:23
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def _count(queryset, group_field):
+    return Coalesce(Subquery(
+        queryset.values(group_field).annotate(total=Count('pk')).values('total')[:1]
+    ), 0)
+
+
+def populate_counters(apps, schema_editor):
+    """Inicializa los contadores materializados desde las tablas (un UPDATE)"""
+    db = schema_editor.connection.alias
+    UserProgress = apps.get_model('api', 'UserProgress')
+    Chat = apps.get_model('api', 'Chat')
+    ChatMessage = apps.get_model('api', 'ChatMessage')
+    AnimalExplored = apps.get_model('api', 'AnimalExplored')
+
+    user = OuterRef('user_id')
+    messages = ChatMessage.objects.using(db).filter(chat__user_id=user, chat__deleted_at__isnull=True)
+    UserProgress.objects.using(db).update(
+        total_chats=_count(Chat.objects.using(db).filter(user_id=user, deleted_at__isnull=True), 'user_id'),
+        total_messages=_count(messages, 'chat__user_id'),
+        total_questions_asked=_count(messages.filter(role='user'), 'chat__user_id'),
+        total_animals_explored=_count(AnimalExplored.objects.using(db).filter(user_id=user), 'user_id'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_animal_catalog'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprogress',
+            name='total_chats',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='userprogress',
+            name='total_messages',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-19 12:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_user_progress_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usersettings',
+            name='user_timezone',
+            field=models.CharField(default='America/Bogota', max_length=50),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.5 on 2026-10-19 12:56
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_achievement_catalog_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usersettings',
+            name='classroom_code',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=20),
+        ),
+        migrations.CreateModel(
+            name='LeaderboardEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('board', models.CharField(choices=[('points', 'Puntos'), ('animals', 'Animales Explorados'), ('streak', 'Racha')], max_length=20)),
+                ('scope', models.CharField(blank=True, max_length=20)),
+                ('score', models.IntegerField()),
+                ('rank', models.IntegerField()),
+                ('refreshed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Posición en Tabla',
+                'verbose_name_plural': 'Posiciones en Tablas',
+                'db_table': 'leaderboard_entries',
+                'indexes': [models.Index(fields=['board', 'scope', 'rank'], name='leaderboard_board_8c40d4_idx')],
+                'unique_together': {('board', 'scope', 'user')},
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.5 on 2026-10-19 12:58
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_leaderboards'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyActivity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('messages', models.IntegerField(default=0)),
+                ('questions', models.IntegerField(default=0)),
+                ('new_animals', models.IntegerField(default=0)),
+                ('images', models.IntegerField(default=0)),
+                ('tts_seconds', models.FloatField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_activity', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Actividad Diaria',
+                'verbose_name_plural': 'Actividad Diaria',
+                'db_table': 'user_daily_activity',
+                'unique_together': {('user', 'day')},
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.5 on 2026-10-19 13:00
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_daily_activity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnimalPopularity',
+            fields=[
+                ('animal_name', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('log_score', models.FloatField()),
+                ('total_detections', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Popularidad de Animal',
+                'verbose_name_plural': 'Popularidad de Animales',
+                'db_table': 'animal_popularity',
+                'indexes': [models.Index(fields=['-log_score'], name='animal_popu_log_sco_f8c020_idx')],
+            },
+        ),
+    ]
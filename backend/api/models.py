@@ -1,6 +1,8 @@
 from django.db import models
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 from django.utils import timezone
+from bisect import bisect_right
+from itertools import accumulate
 import uuid
 
 
@@ -87,6 +89,8 @@ class User(AbstractBaseUser, PermissionsMixin):
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
     last_login_at = models.DateTimeField(null=True, blank=True)
+    # Soft-delete: la cuenta se desactiva al instante y el purgador la borra en lotes
+    deleted_at = models.DateTimeField(null=True, blank=True)
     
     objects = UserManager()
     
@@ -101,6 +105,11 @@ class User(AbstractBaseUser, PermissionsMixin):
             models.Index(fields=['email']),
             models.Index(fields=['username']),
             models.Index(fields=['is_guest']),
+            models.Index(
+                fields=['deleted_at'],
+                condition=models.Q(deleted_at__isnull=False),
+                name='users_pending_purge_idx'
+            ),
         ]
         constraints = [
             # Si es invitado, email debe ser NULL
@@ -194,6 +203,20 @@ class UserSettings(models.Model):
 # USER PROGRESS
 # ===========================
 
+# Niveles: pasar del nivel n al n+1 cuesta LEVEL_STEPS[n-1] puntos (100, 150, 225, ...)
+# y LEVEL_THRESHOLDS[n-1] son los puntos acumulados necesarios para estar en el nivel n
+LEVEL_STEPS = [100]
+for _ in range(79):
+    LEVEL_STEPS.append(int(LEVEL_STEPS[-1] * 1.5))
+LEVEL_THRESHOLDS = list(accumulate(LEVEL_STEPS[:-1], initial=0))
+
+
+def level_for_points(lifetime_points):
+    """(nivel, puntos dentro del nivel, puntos para el siguiente) en forma cerrada"""
+    index = max(bisect_right(LEVEL_THRESHOLDS, lifetime_points) - 1, 0)
+    return index + 1, lifetime_points - LEVEL_THRESHOLDS[index], LEVEL_STEPS[index]
+
+
 class UserProgress(models.Model):
     """
     Progreso y estadísticas del usuario
@@ -202,11 +225,14 @@ class UserProgress(models.Model):
     
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='progress')
     
-    # Estadísticas generales
+    # Estadísticas generales (contadores materializados: los mantienen las
+    # escrituras vía api/counters.py; reconcile_user_progress repara desvíos)
     total_animals_explored = models.IntegerField(default=0)
     total_questions_asked = models.IntegerField(default=0)
     total_images_generated = models.IntegerField(default=0)
     total_sessions = models.IntegerField(default=0)
+    total_chats = models.IntegerField(default=0)
+    total_messages = models.IntegerField(default=0)
     
     # Rachas
     current_streak_days = models.IntegerField(default=0)
@@ -230,15 +256,17 @@ class UserProgress(models.Model):
     def __str__(self):
         return f"Progreso de {self.user.username} - Nivel {self.current_level}"
     
+    @property
+    def lifetime_points(self):
+        """Puntos acumulados desde el nivel 1 (total_points es lo ganado dentro del nivel)"""
+        level = min(max(self.current_level, 1), len(LEVEL_THRESHOLDS))
+        return LEVEL_THRESHOLDS[level - 1] + self.total_points
+    
     def add_points(self, points):
         """Añade puntos y verifica si sube de nivel"""
-        self.total_points += points
-        
-        while self.total_points >= self.points_to_next_level:
-            self.total_points -= self.points_to_next_level
-            self.current_level += 1
-            self.points_to_next_level = int(self.points_to_next_level * 1.5)
-        
+        self.current_level, self.total_points, self.points_to_next_level = level_for_points(
+            self.lifetime_points + points
+        )
         self.save()
 
 
@@ -246,6 +274,47 @@ class UserProgress(models.Model):
 # ANIMALS EXPLORED
 # ===========================
 
+class Animal(models.Model):
+    """
+    Catálogo de animales (fuente única para detección, traducciones y emojis)
+    Se carga en memoria como índice inmutable: ver api/catalog.py
+    """
+    CATEGORIES = [
+        ('mamifero', 'Mamífero'),
+        ('ave', 'Ave'),
+        ('reptil', 'Reptil'),
+        ('anfibio', 'Anfibio'),
+        ('pez', 'Pez'),
+        ('insecto', 'Insecto'),
+        ('aracnido', 'Arácnido'),
+        ('fantastico', 'Fantástico'),
+    ]
+    
+    slug = models.SlugField(max_length=100, primary_key=True)
+    name = models.CharField(max_length=100, unique=True)  # Nombre canónico: "León"
+    
+    # Otros nombres en español y plurales irregulares (los regulares se generan solos)
+    synonyms = models.JSONField(default=list, blank=True)
+    plurals = models.JSONField(default=list, blank=True)
+    
+    english_name = models.CharField(max_length=100)  # Para el prompt de imágenes
+    emoji = models.CharField(max_length=16, blank=True)
+    category = models.CharField(max_length=20, choices=CATEGORIES)
+    is_active = models.BooleanField(default=True)
+    
+    # Sello de versión del catálogo: los workers recargan cuando cambia
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'animals'
+        verbose_name = 'Animal'
+        verbose_name_plural = 'Animales'
+        ordering = ['name']
+    
+    def __str__(self):
+        return f"{self.emoji} {self.name}".strip()
+
+
 class AnimalExplored(models.Model):
     """
     Animales que el usuario ha explorado
@@ -344,6 +413,8 @@ class Achievement(models.Model):
     points_reward = models.IntegerField(default=10)
     
     created_at = models.DateTimeField(default=timezone.now)
+    # Sello de versión del catálogo: los workers recargan cuando cambia (api/achievements.py)
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         db_table = 'achievements'
@@ -405,6 +476,102 @@ class UserAchievement(models.Model):
         return False
 
 
+# ===========================
+# ANIMAL POPULARITY (tendencias)
+# ===========================
+
+class AnimalPopularity(models.Model):
+    """
+    Popularidad global de cada animal con decaimiento exponencial
+    log_score = log2(Σ peso · 2^((t - época) / vida media)): ordenar por
+    log_score es ordenar por popularidad actual (ver api/popularity.py)
+    """
+    
+    animal_name = models.CharField(max_length=100, primary_key=True)
+    log_score = models.FloatField()
+    total_detections = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        db_table = 'animal_popularity'
+        verbose_name = 'Popularidad de Animal'
+        verbose_name_plural = 'Popularidad de Animales'
+        indexes = [
+            models.Index(fields=['-log_score']),
+        ]
+    
+    def __str__(self):
+        return f"{self.animal_name} ({self.total_detections})"
+
+
+# ===========================
+# DAILY ACTIVITY (rollups)
+# ===========================
+
+class DailyActivity(models.Model):
+    """
+    Actividad de un usuario en un día (de su zona horaria)
+    Se incrementa en cada escritura y se puede reconstruir con
+    backfill_daily_activity; las gráficas del dashboard leen solo esta tabla
+    """
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='daily_activity')
+    day = models.DateField()
+    
+    messages = models.IntegerField(default=0)
+    questions = models.IntegerField(default=0)
+    new_animals = models.IntegerField(default=0)
+    images = models.IntegerField(default=0)
+    tts_seconds = models.FloatField(default=0)
+    
+    class Meta:
+        db_table = 'user_daily_activity'
+        verbose_name = 'Actividad Diaria'
+        verbose_name_plural = 'Actividad Diaria'
+        unique_together = [['user', 'day']]
+    
+    def __str__(self):
+        return f"{self.user_id} - {self.day}"
+
+
+# ===========================
+# LEADERBOARDS
+# ===========================
+
+class LeaderboardEntry(models.Model):
+    """
+    Posición precalculada de un usuario en una tabla de posiciones
+    La reconstruye refresh_leaderboards por lotes (ver api/leaderboards.py):
+    el top-N y "mi posición" son lecturas por índice, sin COUNT(*) por request
+    """
+    
+    BOARDS = [
+        ('points', 'Puntos'),
+        ('animals', 'Animales Explorados'),
+        ('streak', 'Racha'),
+    ]
+    
+    board = models.CharField(max_length=20, choices=BOARDS)
+    scope = models.CharField(max_length=20, blank=True)  # '' = global, o código de aula
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='leaderboard_entries')
+    
+    score = models.IntegerField()
+    rank = models.IntegerField()
+    refreshed_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        db_table = 'leaderboard_entries'
+        verbose_name = 'Posición en Tabla'
+        verbose_name_plural = 'Posiciones en Tablas'
+        unique_together = [['board', 'scope', 'user']]
+        indexes = [
+            models.Index(fields=['board', 'scope', 'rank']),
+        ]
+    
+    def __str__(self):
+        return f"#{self.rank} {self.user_id} ({self.board}/{self.scope or 'global'}: {self.score})"
+
+
 # ===========================
 # GUEST SESSIONS
 # ===========================
@@ -413,6 +580,9 @@ class GuestSession(models.Model):
     """
     Sesiones temporales para usuarios invitados
     Se auto-eliminan después de 24 horas
+    
+    Con tokens firmados (GUEST_SESSION_MODE='signed') solo hay fila si se
+    registra la actividad: session_token = "signed:<sid>" (api/guest_sessions.py)
     """
     
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -454,6 +624,13 @@ class GuestSession(models.Model):
 # CHAT MODELS
 # ===========================
 
+class ChatManager(models.Manager):
+    """Oculta los chats eliminados (soft-delete) en todas las consultas normales"""
+    
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
 class Chat(models.Model):
     """
     Modelo para almacenar conversaciones del Explorer
@@ -464,6 +641,13 @@ class Chat(models.Model):
     
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
+    # Soft-delete: oculto al instante, el purgador borra mensajes y chat en lotes
+    deleted_at = models.DateTimeField(null=True, blank=True)
+    # ID generado por el cliente (chats de invitado importados); hace idempotente la importación
+    client_id = models.CharField(max_length=64, null=True, blank=True)
+    
+    objects = ChatManager()
+    all_objects = models.Manager()
     
     class Meta:
         db_table = 'chats'
@@ -471,13 +655,47 @@ class Chat(models.Model):
         verbose_name_plural = 'Chats'
         ordering = ['-updated_at']
         indexes = [
-            models.Index(fields=['user', '-updated_at']),
+            # Keyset pagination: (updated_at, id) desc por usuario
+            models.Index(fields=['user', '-updated_at', '-id']),
+            models.Index(
+                fields=['deleted_at'],
+                condition=models.Q(deleted_at__isnull=False),
+                name='chats_pending_purge_idx'
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'client_id'],
+                condition=models.Q(client_id__isnull=False),
+                name='chats_user_client_id_uniq'
+            ),
         ]
     
     def __str__(self):
         return f"{self.user.username} - {self.title}"
 
 
+class ImageBlob(models.Model):
+    """
+    Imagen almacenada una sola vez, direccionada por el SHA-256 de su contenido.
+    Los mensajes la referencian por hash en lugar de repetir el base64.
+    """
+    sha256 = models.CharField(max_length=64, primary_key=True)
+    mime_type = models.CharField(max_length=50, default='image/png')
+    data = models.BinaryField()
+    size_bytes = models.IntegerField()
+    
+    created_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        db_table = 'image_blobs'
+        verbose_name = 'Imagen (blob)'
+        verbose_name_plural = 'Imágenes (blobs)'
+    
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.mime_type}, {self.size_bytes} bytes)"
+
+
 class ChatMessage(models.Model):
     """
     Modelo para almacenar mensajes individuales de cada chat
@@ -499,7 +717,10 @@ class ChatMessage(models.Model):
     
     # Contenido del mensaje
     text = models.TextField(blank=True)
-    image_url = models.TextField(null=True, blank=True)  # TextField para soportar imágenes base64 grandes
+    image_url = models.TextField(null=True, blank=True)  # URL externa (los base64 van a image_blob)
+    image_blob = models.ForeignKey(
+        ImageBlob, on_delete=models.PROTECT, null=True, blank=True, related_name='messages'
+    )
     image_alt = models.CharField(max_length=500, null=True, blank=True)
     
     # Animal mencionado (para tracking)
@@ -513,13 +734,39 @@ class ChatMessage(models.Model):
         verbose_name_plural = 'Mensajes de Chat'
         ordering = ['created_at']
         indexes = [
-            models.Index(fields=['chat', 'created_at']),
+            # Keyset pagination: (created_at, id) por chat
+            models.Index(fields=['chat', 'created_at', 'id']),
         ]
     
     def __str__(self):
         return f"{self.chat.title} - {self.role}: {self.text[:50]}"
 
 
+class ChatAnimal(models.Model):
+    """
+    Índice invertido animal -> chats de cada usuario.
+    Se reconstruye para el chat en cada guardado (los mensajes se reemplazan completos),
+    así "chats sobre este animal" es una lectura por índice sin recorrer mensajes.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='chat_animals')
+    chat = models.ForeignKey(Chat, on_delete=models.CASCADE, related_name='animals')
+    animal_name = models.CharField(max_length=100)
+    mentions = models.IntegerField(default=1)
+    last_mentioned_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        db_table = 'chat_animals'
+        verbose_name = 'Animal en Chat'
+        verbose_name_plural = 'Animales en Chats'
+        unique_together = [['chat', 'animal_name']]
+        indexes = [
+            models.Index(fields=['user', 'animal_name', '-last_mentioned_at', '-id']),
+        ]
+    
+    def __str__(self):
+        return f"{self.animal_name} en {self.chat_id} ({self.mentions})"
+
+
 # ===========================
 # USER SETTINGS MODEL
 # ===========================
@@ -536,6 +783,12 @@ class UserSettings(models.Model):
     # Configuraciones de tema (para futuro)
     theme = models.CharField(max_length=50, default='default')
     
+    # Zona horaria del usuario (define el "día" de las rachas de actividad)
+    user_timezone = models.CharField(max_length=50, default='America/Bogota')
+    
+    # Código del aula (lo comparte el docente); define la tabla de posiciones de la clase
+    classroom_code = models.CharField(max_length=20, blank=True, default='', db_index=True)
+    
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -546,3 +799,36 @@ class UserSettings(models.Model):
     
     def __str__(self):
         return f"Settings - {self.user.username}"
+
+
+# ===========================
+# IDEMPOTENCY KEYS
+# ===========================
+
+class IdempotencyRecord(models.Model):
+    """
+    Respuesta guardada para un header Idempotency-Key.
+    Los reintentos con la misma clave reciben esta respuesta sin re-ejecutar
+    la vista (generación de imágenes, TTS, guardado de chats).
+    """
+    # sha256 de (principal, método, ruta, clave)
+    key_hash = models.CharField(max_length=64, primary_key=True)
+    # sha256 del cuerpo de la request original (otra request con la misma clave → 422)
+    request_hash = models.CharField(max_length=64, blank=True, default='')
+    
+    is_complete = models.BooleanField(default=False)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    headers = models.JSONField(default=dict, blank=True)
+    body = models.BinaryField(null=True, blank=True)
+    
+    started_at = models.DateTimeField(default=timezone.now)
+    expires_at = models.DateTimeField(db_index=True)
+    
+    class Meta:
+        db_table = 'idempotency_keys'
+        verbose_name = 'Clave de Idempotencia'
+        verbose_name_plural = 'Claves de Idempotencia'
+    
+    def __str__(self):
+        state = self.status_code if self.is_complete else 'en curso'
+        return f"{self.key_hash[:12]}… ({state})"
@@ -0,0 +1,126 @@
+"""
+Paginación por keyset (cursor) para chats y mensajes
+
+A diferencia de PageNumberPagination (OFFSET), el costo de cada página no
+depende de cuántas filas hay antes: se filtra con la tupla
+(fecha, id) de la última fila devuelta y se aprovechan los índices
+(user, -updated_at, -id) de Chat y (chat, created_at, id) de ChatMessage.
+"""
+
+import base64
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+
+
+def encode_cursor(value, pk):
+    """Codifica (fecha, id) como un token opaco seguro para URLs"""
+    raw = json.dumps([value.isoformat(), str(pk)])
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token, pk_field=None):
+    """
+    Decodifica un cursor; retorna (datetime, id) o None si es inválido.
+    Con `pk_field` el id se valida y convierte con su to_python (un cursor
+    alterado no debe llegar al filtro como un id con otro formato).
+    """
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        value, pk = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        moment = parse_datetime(value)
+        if pk_field is not None:
+            pk = pk_field.to_python(pk)
+    except (ValueError, TypeError, UnicodeError, ValidationError):
+        return None
+    if moment is None or pk is None:
+        return None
+    return moment, pk
+
+
+class KeysetPagination(BasePagination):
+    """
+    Pagina descendente por (ordering_field, id).
+
+    Query params:
+    - cursor: token devuelto como `next_cursor` en la página anterior
+    - page_size: tamaño de página (limitado por CHAT_MAX_PAGE_SIZE)
+    """
+
+    ordering_field = 'updated_at'
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Cursor inválido'
+
+    def get_default_page_size(self):
+        return settings.CHAT_PAGE_SIZE
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, ''))
+        except ValueError:
+            return self.get_default_page_size()
+        return max(1, min(size, settings.CHAT_MAX_PAGE_SIZE))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        self.next_cursor = None
+
+        token = request.query_params.get(self.cursor_query_param)
+        if token:
+            position = decode_cursor(token, queryset.model._meta.pk)
+            if position is None:
+                raise NotFound(self.invalid_cursor_message)
+            moment, pk = position
+            field = self.ordering_field
+            queryset = queryset.filter(
+                Q(**{f'{field}__lt': moment}) |
+                Q(**{field: moment, 'id__lt': pk})
+            )
+
+        queryset = queryset.order_by(f'-{self.ordering_field}', '-id')
+        # Pedir una fila extra para saber si hay más sin hacer COUNT(*)
+        rows = list(queryset[:self.page_size + 1])
+        if len(rows) > self.page_size:
+            rows = rows[:self.page_size]
+            last = rows[-1]
+            self.next_cursor = encode_cursor(getattr(last, self.ordering_field), last.pk)
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response({
+            'results': data,
+            'next_cursor': self.next_cursor,
+            'page_size': self.page_size,
+        })
+
+
+class ChatKeysetPagination(KeysetPagination):
+    """Chats más recientes primero, por (updated_at, id)"""
+
+    ordering_field = 'updated_at'
+
+
+class ChatAnimalKeysetPagination(KeysetPagination):
+    """Entradas del índice animal -> chat, más recientes primero"""
+
+    ordering_field = 'last_mentioned_at'
+
+
+class MessageKeysetPagination(KeysetPagination):
+    """
+    Mensajes más recientes primero, por (created_at, id).
+    El cursor se recibe como `before` para "cargar mensajes anteriores".
+    """
+
+    ordering_field = 'created_at'
+    cursor_query_param = 'before'
+
+    def get_default_page_size(self):
+        return settings.CHAT_MESSAGES_PAGE_SIZE
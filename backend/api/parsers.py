@@ -0,0 +1,179 @@
+"""
+Parser en streaming para el guardado de chats (POST /api/explorer/chats/save)
+
+El JSONParser de DRF materializa todo el cuerpo (imágenes base64 incluidas)
+como objetos Python. Este parser lee el cuerpo de forma incremental con
+ijson y procesa los mensajes de a uno:
+
+- los campos de cada mensaje se toman evento por evento (solo los de
+  MESSAGE_FIELDS; nunca se arma el objeto completo del mensaje);
+- los límites se aplican mientras llegan los bytes: el total sobre el
+  stream y el de cada mensaje desde su `{` (413 sin terminar de leer una
+  imagen enorme, como mucho un buffer de ijson de más);
+- las imágenes base64 se validan (tipo y firma, 400 si no son imágenes)
+  pero no se guardan: la vista escribe los blobs en la misma transacción
+  que los mensajes, así un guardado rechazado no deja blobs huérfanos;
+- cada mensaje ya validado se escribe como una línea JSON en un
+  SpooledTemporaryFile (en memoria hasta CHAT_SAVE_SPOOL_BYTES, luego a disco).
+
+La vista recibe {"chat_id", "title", "messages"} donde `messages` se puede
+recorrer (releyendo el spool) sin tener toda la conversación en memoria.
+"""
+
+import json
+import tempfile
+
+from django.conf import settings
+from rest_framework import status
+from rest_framework.exceptions import APIException, ParseError
+from rest_framework.parsers import BaseParser
+
+from .blobs import InvalidImage, parse_data_url
+
+try:
+    import ijson
+    IJSON_AVAILABLE = True
+    JSON_ERRORS = (ValueError, ijson.JSONError)
+except ImportError:
+    print("⚠️ ijson no disponible - el guardado de chats usará json estándar")
+    IJSON_AVAILABLE = False
+    JSON_ERRORS = (ValueError,)
+
+TOP_LEVEL_FIELDS = ('chat_id', 'title')
+MESSAGE_FIELDS = ('role', 'message_type', 'text', 'image_url', 'image_alt')
+SCALAR_EVENTS = ('string', 'number', 'boolean', 'null')
+MESSAGE_PREFIX = 'messages.item'
+
+
+class PayloadTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = 'El cuerpo de la solicitud es demasiado grande'
+    default_code = 'payload_too_large'
+
+
+class _LimitedStream:
+    """
+    Envuelve el stream de la request y corta al superar `limit` bytes, o
+    `message_limit` bytes desde `message_start` (el mensaje en curso)
+    """
+
+    def __init__(self, stream, limit, message_limit=None):
+        self.stream = stream
+        self.limit = limit
+        self.message_limit = message_limit
+        self.message_start = None
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        chunk = self.stream.read(size)
+        self.bytes_read += len(chunk)
+        if self.bytes_read > self.limit:
+            raise PayloadTooLarge(f'El chat supera el máximo de {self.limit} bytes')
+        if self.message_start is not None and self.bytes_read - self.message_start > self.message_limit:
+            raise PayloadTooLarge(f'Un mensaje supera el máximo de {self.message_limit} bytes')
+        return chunk
+
+
+class SpooledMessages:
+    """Mensajes ya normalizados, guardados como NDJSON en un archivo temporal"""
+
+    def __init__(self):
+        self._file = tempfile.SpooledTemporaryFile(
+            max_size=settings.CHAT_SAVE_SPOOL_BYTES, mode='w+', encoding='utf-8'
+        )
+        self._count = 0
+
+    def append(self, message):
+        self._file.write(json.dumps(message, ensure_ascii=False))
+        self._file.write('\n')
+        self._count += 1
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        self._file.seek(0)
+        for line in self._file:
+            yield json.loads(line)
+
+    def close(self):
+        self._file.close()
+
+    def __repr__(self):
+        return f'<SpooledMessages: {self._count} mensajes>'
+
+
+def _message_size(message):
+    return sum(len(value) for value in message.values() if isinstance(value, str))
+
+
+def _normalize_message(message, spool):
+    """Valida un mensaje (tamaño e imagen) y lo agrega al spool con sus MESSAGE_FIELDS"""
+    if not isinstance(message, dict):
+        raise ParseError('Cada mensaje debe ser un objeto JSON')
+    if _message_size(message) > settings.CHAT_MESSAGE_MAX_BYTES:
+        raise PayloadTooLarge(
+            f'Un mensaje supera el máximo de {settings.CHAT_MESSAGE_MAX_BYTES} bytes'
+        )
+    try:
+        parse_data_url(message.get('image_url'))
+    except InvalidImage as exc:
+        raise ParseError(str(exc))
+    spool.append({field: message[field] for field in MESSAGE_FIELDS if field in message})
+
+
+def _parse_incremental(stream, spool):
+    data = {}
+    message = None
+    field_prefixes = {f'{MESSAGE_PREFIX}.{field}': field for field in MESSAGE_FIELDS}
+    for prefix, event, value in ijson.parse(stream, use_float=True):
+        if message is not None:
+            if prefix == MESSAGE_PREFIX and event == 'end_map':
+                stream.message_start = None
+                _normalize_message(message, spool)
+                message = None
+            elif event in SCALAR_EVENTS and prefix in field_prefixes:
+                message[field_prefixes[prefix]] = value
+        elif prefix == MESSAGE_PREFIX and event == 'start_map':
+            message = {}
+            stream.message_start = stream.bytes_read
+        elif prefix == MESSAGE_PREFIX and event in SCALAR_EVENTS + ('start_array',):
+            raise ParseError('Cada mensaje debe ser un objeto JSON')
+        elif prefix in TOP_LEVEL_FIELDS and event in SCALAR_EVENTS:
+            data[prefix] = value
+    return data
+
+
+def _parse_buffered(stream, spool):
+    """Sin ijson: json estándar, pero con el mismo límite total y validación"""
+    body = json.loads(stream.read(settings.CHAT_SAVE_MAX_BYTES + 1) or b'{}')
+    if not isinstance(body, dict):
+        raise ParseError('El cuerpo debe ser un objeto JSON')
+    for message in body.pop('messages', None) or []:
+        _normalize_message(message, spool)
+    return {field: body[field] for field in TOP_LEVEL_FIELDS if field in body}
+
+
+class StreamingChatParser(BaseParser):
+    """Parser JSON incremental para guardar chats con memoria acotada"""
+
+    media_type = 'application/json'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        spool = SpooledMessages()
+        data = {}
+        if stream is not None:
+            limited = _LimitedStream(stream, settings.CHAT_SAVE_MAX_BYTES, settings.CHAT_MESSAGE_MAX_BYTES)
+            try:
+                if IJSON_AVAILABLE:
+                    data = _parse_incremental(limited, spool)
+                else:
+                    data = _parse_buffered(limited, spool)
+            except APIException:
+                spool.close()
+                raise
+            except JSON_ERRORS as exc:
+                spool.close()
+                raise ParseError(f'JSON inválido: {exc}')
+        data['messages'] = spool
+        return data
@@ -0,0 +1,159 @@
+"""
+Popularidad global de animales ("tendencias") con decaimiento exponencial
+
+Cada detección de un animal (guardar/importar chats, pedir una imagen)
+suma peso con vida media POPULARITY_HALF_LIFE_HOURS: un animal muy
+buscado ayer pesa la mitad hoy.
+
+Decaimiento "hacia adelante": en vez de envejecer todas las filas, cada
+detección se escala a una época fija y se guarda en escala log2:
+
+    log_score = log2(Σ peso · 2^((t - EPOCH) / vida media))
+
+El factor de decaimiento es el mismo para todos los animales, así que
+ordenar por log_score (índice) es ordenar por popularidad actual, y la
+escala log2 no desborda nunca. Popularidad actual:
+2^(log_score - (ahora - EPOCH) / vida media).
+
+- record_detections({"León": 2}): solo memoria del worker, sin consultas.
+- Como mucho cada POPULARITY_MERGE_SECONDS el worker mezcla lo acumulado
+  en animal_popularity (una transacción con las filas tocadas bloqueadas)
+  y recarga su snapshot del top POPULARITY_SNAPSHOT_SIZE.
+- trending_animals(k): los primeros k del snapshot, O(k).
+Si el worker muere se pierde como mucho un intervalo de detecciones.
+"""
+
+import logging
+import math
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+
+from .models import AnimalPopularity
+
+logger = logging.getLogger(__name__)
+
+EPOCH = datetime(2026, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def _half_lives(when):
+    """Vidas medias transcurridas desde EPOCH"""
+    return (when - EPOCH).total_seconds() / (settings.POPULARITY_HALF_LIFE_HOURS * 3600)
+
+
+def _log_add(a, b):
+    """log2(2^a + 2^b) sin desbordar; None es el neutro"""
+    if a is None:
+        return b
+    if b is None:
+        return a
+    high, low = max(a, b), min(a, b)
+    return high + math.log2(1 + 2 ** (low - high))
+
+
+def current_score(log_score, now=None):
+    """Popularidad actual (detecciones equivalentes de este instante)"""
+    return 2 ** (log_score - _half_lives(now or timezone.now()))
+
+
+# ===========================
+# ACUMULADOR POR WORKER
+# ===========================
+
+_pending = {}            # animal -> (log_score, detecciones) aún no mezclados
+_snapshot = ()           # top de la tabla: ((animal, log_score, detecciones), ...)
+_next_merge = 0.0
+_lock = threading.Lock()
+_merge_lock = threading.Lock()
+
+
+def record_detections(animal_counts, now=None):
+    """
+    Suma detecciones ({"León": 2, "Tigre": 1}) en memoria.
+    No consulta la base salvo que toque mezclar (una vez por intervalo).
+    """
+    now = now or timezone.now()
+    with _lock:
+        for animal_name, count in animal_counts.items():
+            if not animal_name or count <= 0:
+                continue
+            log_score, detections = _pending.get(animal_name, (None, 0))
+            _pending[animal_name] = (
+                _log_add(log_score, math.log2(count) + _half_lives(now)),
+                detections + count,
+            )
+    if time.monotonic() >= _next_merge:
+        merge()
+
+
+def _merge_pending(pending, now):
+    names = sorted(pending)
+    with transaction.atomic():
+        # Filas nuevas primero (vacías), así todas quedan bloqueadas en el mismo orden
+        AnimalPopularity.objects.bulk_create(
+            [AnimalPopularity(animal_name=name, log_score=0, total_detections=0) for name in names],
+            ignore_conflicts=True,
+        )
+        rows = list(
+            AnimalPopularity.objects.select_for_update().filter(animal_name__in=names).order_by('animal_name')
+        )
+        for row in rows:
+            log_score, detections = pending[row.animal_name]
+            row.log_score = _log_add(row.log_score if row.total_detections else None, log_score)
+            row.total_detections += detections
+            row.updated_at = now
+        AnimalPopularity.objects.bulk_update(rows, ['log_score', 'total_detections', 'updated_at'])
+
+
+def merge(now=None):
+    """
+    Mezcla lo acumulado por este worker con la tabla y recarga el snapshot.
+    Si la base falla, lo acumulado vuelve al buffer para el próximo intento.
+    """
+    global _pending, _snapshot, _next_merge
+
+    if not _merge_lock.acquire(blocking=False):
+        return  # otro thread de este worker ya está mezclando
+    try:
+        with _lock:
+            pending, _pending = _pending, {}
+            _next_merge = time.monotonic() + settings.POPULARITY_MERGE_SECONDS
+
+        try:
+            if pending:
+                _merge_pending(pending, now or timezone.now())
+            _snapshot = tuple(
+                AnimalPopularity.objects.filter(total_detections__gt=0)
+                .order_by('-log_score')
+                .values_list('animal_name', 'log_score', 'total_detections')[:settings.POPULARITY_SNAPSHOT_SIZE]
+            )
+        except DatabaseError:
+            logger.exception("No se pudo mezclar la popularidad de animales; se reintenta en el próximo intervalo")
+            with _lock:
+                for animal_name, (log_score, detections) in pending.items():
+                    current, current_detections = _pending.get(animal_name, (None, 0))
+                    _pending[animal_name] = (_log_add(current, log_score), current_detections + detections)
+    finally:
+        _merge_lock.release()
+
+
+# ===========================
+# LECTURA
+# ===========================
+
+def trending_animals(limit=10, now=None):
+    """
+    Los `limit` animales más populares ahora: [(animal, puntaje actual, detecciones)]
+    Sale del snapshot del worker (a lo sumo POPULARITY_MERGE_SECONDS de atraso).
+    """
+    if time.monotonic() >= _next_merge:
+        merge()
+    now = now or timezone.now()
+    return [
+        (animal_name, current_score(log_score, now), detections)
+        for animal_name, log_score, detections in _snapshot[:limit]
+    ]
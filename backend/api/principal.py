@@ -0,0 +1,145 @@
+"""
+Principal autenticado en caché (usuario + settings + progreso)
+
+JWTAuthentication carga la fila de User en cada request, y `auth/me`,
+`user/settings` o el dashboard consultan después settings y progress.
+CachedJWTAuthentication (api/authentication.py) resuelve el usuario con
+get_principal(user_id). Con un cache compartido entre workers
+(PRINCIPAL_SHARED_CACHE, ver settings) no toca la base en el caso común:
+
+- Sello de versión por usuario en el cache de Django
+  (`principal:version:<id>`). bump_principal(ids) lo cambia al confirmar
+  la transacción de cada escritura: save()/delete() de User, UserSettings o
+  UserProgress (señales) y los UPDATE directos de contadores, rachas,
+  logros y la baja de cuenta.
+- LRU en memoria del worker (PRINCIPAL_CACHE_SIZE entradas, vida
+  PRINCIPAL_CACHE_TTL): usuario con settings y progress ya cargados
+  (select_related), guardado como pickle. Se reutiliza mientras el sello
+  no cambie; cada request recibe su propia copia.
+- El snapshot también se guarda en el cache de Django por (id, versión),
+  así los otros workers no van a la base.
+
+Una request autenticada hace una lectura de cache y ninguna consulta.
+Si una escritura masiva no cambia el sello (reset_broken_streaks,
+backfills), el snapshot puede quedar viejo como mucho PRINCIPAL_CACHE_TTL
+segundos.
+
+Sin cache compartido (LocMemCache por proceso) un sello cambiado en un
+worker no invalida a los demás, así que no se usa caché: cada request
+carga el usuario con settings y progress en una consulta (falla cerrado).
+"""
+
+import pickle
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import User, UserProgress, UserSettings
+
+VERSION_KEY = 'principal:version:{user_id}'
+SNAPSHOT_KEY = 'principal:snapshot:{user_id}:{version}'
+
+_entries = OrderedDict()  # user_id -> (versión, vence, pickle del usuario)
+_lock = threading.Lock()
+
+
+def _version(user_id):
+    return cache.get(VERSION_KEY.format(user_id=user_id))
+
+
+def _remember(user_id, version, payload):
+    with _lock:
+        _entries[user_id] = (version, time.monotonic() + settings.PRINCIPAL_CACHE_TTL, payload)
+        _entries.move_to_end(user_id)
+        while len(_entries) > settings.PRINCIPAL_CACHE_SIZE:
+            _entries.popitem(last=False)
+
+
+def _load(user_id):
+    return User.objects.select_related('settings', 'progress').filter(pk=user_id).first()
+
+
+def get_principal(user_id):
+    """
+    Usuario (con settings y progress cargados) del id del token, o None si
+    no existe. Una copia nueva por llamada: se puede modificar y guardar.
+    """
+    user_id = User._meta.pk.to_python(user_id)
+    if not settings.PRINCIPAL_SHARED_CACHE:
+        return _load(user_id)
+    version = _version(user_id)
+
+    with _lock:
+        entry = _entries.get(user_id)
+        if entry is not None and entry[0] == version and entry[1] > time.monotonic():
+            _entries.move_to_end(user_id)
+            return pickle.loads(entry[2])
+
+    snapshot_key = SNAPSHOT_KEY.format(user_id=user_id, version=version)
+    payload = cache.get(snapshot_key)
+    if payload is None:
+        # El sello se leyó antes de la consulta: una escritura concurrente lo cambia y fuerza otra carga
+        user = _load(user_id)
+        if user is None:
+            return None
+        payload = pickle.dumps(user, pickle.HIGHEST_PROTOCOL)
+        cache.set(snapshot_key, payload, timeout=settings.PRINCIPAL_CACHE_TTL)
+    else:
+        user = pickle.loads(payload)
+
+    _remember(user_id, version, payload)
+    return user
+
+
+def bump_principal(user_ids):
+    """
+    Cambia el sello de estos usuarios ya y otra vez cuando la transacción
+    en curso confirma: un snapshot cargado antes del commit (con los datos
+    viejos) queda con el sello intermedio y no se vuelve a usar.
+    """
+    user_ids = [User._meta.pk.to_python(user_id) for user_id in user_ids]
+    if not user_ids:
+        return
+
+    def bump():
+        stamp = uuid.uuid4().hex
+        # El sello dura tanto como el snapshot más viejo que podría invalidar
+        cache.set_many(
+            {VERSION_KEY.format(user_id=user_id): stamp for user_id in user_ids},
+            timeout=settings.PRINCIPAL_CACHE_TTL + 1,
+        )
+        with _lock:
+            for user_id in user_ids:
+                _entries.pop(user_id, None)
+
+    bump()
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(bump)
+
+
+def clear_local():
+    """Vacía el LRU de este worker (tests)"""
+    with _lock:
+        _entries.clear()
+
+
+# ===========================
+# SEÑALES (escrituras con save()/delete())
+# ===========================
+
+@receiver([post_save, post_delete], sender=User)
+def _user_changed(sender, instance, **kwargs):
+    bump_principal([instance.pk])
+
+
+@receiver([post_save, post_delete], sender=UserSettings)
+@receiver([post_save, post_delete], sender=UserProgress)
+def _user_related_changed(sender, instance, **kwargs):
+    bump_principal([instance.user_id])
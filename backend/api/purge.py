@@ -0,0 +1,309 @@
+"""
+Purgado en segundo plano de chats y cuentas eliminados (soft-delete)
+
+Las vistas solo marcan `deleted_at` (una UPDATE por PK) y el contenido
+desaparece de inmediato de la API. Este módulo borra después lo marcado
+con sentencias DELETE acotadas (LIMIT por lote, una transacción corta
+cada una), sin pasar por el Collector de Django: nunca se cargan en
+memoria los mensajes ni sus imágenes, y no se retienen locks largos.
+
+Al final se borran los blobs de imagen que ya ningún mensaje referencia
+(purge_orphan_blobs): sin esto las imágenes de un chat o cuenta borrados
+seguirían públicas por su hash.
+
+Se ejecuta con `python manage.py purge_deleted` (cron o --loop).
+`python manage.py reap_guest_data` reutiliza lo mismo para los datos de
+invitados vencidos (sesiones y cuentas de invitado con sus dependientes).
+"""
+
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, connection, models, transaction
+from django.utils import timezone
+
+from .models import User, Chat, ChatMessage, ChatAnimal, GuestSession, ImageBlob
+from .principal import bump_principal
+
+logger = logging.getLogger(__name__)
+
+
+def _execute(sql, params):
+    """Ejecuta una sentencia en su propia transacción corta y retorna las filas afectadas"""
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.rowcount
+
+
+def drain(sql, params, batch_size, pause=0):
+    """
+    Repite un DELETE/UPDATE acotado por LIMIT hasta que afecte menos de un
+    lote, esperando `pause` segundos entre lotes (deja respirar a la base)
+    """
+    total = 0
+    while True:
+        affected = _execute(sql, [*params, batch_size])
+        total += affected
+        if affected < batch_size:
+            return total
+        if pause:
+            time.sleep(pause)
+
+
+def purge_deleted_chats(batch_size, pause=0):
+    """
+    Borra mensajes, entradas de chat_animals y finalmente los chats marcados.
+    Retorna {tabla: filas_borradas}.
+    """
+    chats = Chat._meta.db_table
+    messages = ChatMessage._meta.db_table
+    chat_animals = ChatAnimal._meta.db_table
+
+    deleted = {}
+    deleted[messages] = drain(
+        f"""
+        DELETE FROM {messages} WHERE id IN (
+            SELECT m.id FROM {messages} m
+            JOIN {chats} c ON c.id = m.chat_id
+            WHERE c.deleted_at IS NOT NULL
+            LIMIT %s
+        )
+        """, [], batch_size, pause
+    )
+    deleted[chat_animals] = drain(
+        f"""
+        DELETE FROM {chat_animals} WHERE id IN (
+            SELECT a.id FROM {chat_animals} a
+            JOIN {chats} c ON c.id = a.chat_id
+            WHERE c.deleted_at IS NOT NULL
+            LIMIT %s
+        )
+        """, [], batch_size, pause
+    )
+    # Solo chats ya vacíos: si llegó un mensaje nuevo en medio, se borra en la próxima pasada
+    deleted[chats] = drain(
+        f"""
+        DELETE FROM {chats} WHERE id IN (
+            SELECT c.id FROM {chats} c
+            WHERE c.deleted_at IS NOT NULL
+              AND NOT EXISTS (SELECT 1 FROM {messages} m WHERE m.chat_id = c.id)
+              AND NOT EXISTS (SELECT 1 FROM {chat_animals} a WHERE a.chat_id = c.id)
+            LIMIT %s
+        )
+        """, [], batch_size, pause
+    )
+    return deleted
+
+
+def _has_dependents(model):
+    return any(
+        rel.on_delete in (models.CASCADE, models.SET_NULL, models.PROTECT)
+        for rel in model._meta.related_objects
+    )
+
+
+def _purge_user_relations(user_id, batch_size, deleted, pause=0):
+    """Borra (o desvincula) en lotes todas las filas que referencian al usuario"""
+    for rel in User._meta.related_objects:
+        model = rel.related_model
+        if model is Chat:
+            continue  # se drenan con purge_deleted_chats
+        table = model._meta.db_table
+        fk_column = rel.field.column
+        pk_column = model._meta.pk.column
+        value = rel.field.target_field.get_db_prep_value(user_id, connection)
+
+        if rel.many_to_many:
+            continue  # tablas intermedias: se limpian abajo vía User._meta.many_to_many
+        if rel.on_delete is models.CASCADE and not _has_dependents(model):
+            affected = drain(
+                f"DELETE FROM {table} WHERE {pk_column} IN "
+                f"(SELECT {pk_column} FROM {table} WHERE {fk_column} = %s LIMIT %s)",
+                [value], batch_size, pause
+            )
+        elif rel.on_delete is models.CASCADE:
+            # El modelo tiene sus propios dependientes: lotes pequeños vía ORM
+            affected = 0
+            manager = model._base_manager
+            while True:
+                pks = list(manager.filter(**{rel.field.name: user_id}).values_list('pk', flat=True)[:batch_size])
+                if not pks:
+                    break
+                with transaction.atomic():
+                    manager.filter(pk__in=pks).delete()
+                affected += len(pks)
+                if pause:
+                    time.sleep(pause)
+        elif rel.on_delete is models.SET_NULL:
+            affected = drain(
+                f"UPDATE {table} SET {fk_column} = NULL WHERE {pk_column} IN "
+                f"(SELECT {pk_column} FROM {table} WHERE {fk_column} = %s LIMIT %s)",
+                [value], batch_size, pause
+            )
+        else:
+            continue
+        if affected:
+            deleted[table] = deleted.get(table, 0) + affected
+
+    for field in User._meta.many_to_many:
+        through = field.remote_field.through
+        table = through._meta.db_table
+        column = through._meta.get_field(field.m2m_field_name()).column
+        affected = drain(
+            f"DELETE FROM {table} WHERE id IN (SELECT id FROM {table} WHERE {column} = %s LIMIT %s)",
+            [User._meta.pk.get_db_prep_value(user_id, connection)], batch_size, pause
+        )
+        if affected:
+            deleted[table] = deleted.get(table, 0) + affected
+
+
+def purge_deleted_users(batch_size, max_users=100, pause=0):
+    """
+    Purga hasta `max_users` cuentas marcadas: primero sus chats (como soft-delete),
+    luego cada tabla dependiente en lotes y al final la fila del usuario.
+    Retorna {tabla: filas_borradas}.
+    """
+    deleted = {}
+    user_ids = list(
+        User.objects.filter(deleted_at__isnull=False)
+        .order_by('deleted_at')
+        .values_list('pk', flat=True)[:max_users]
+    )
+    for user_id in user_ids:
+        Chat.all_objects.filter(user_id=user_id, deleted_at__isnull=True).update(deleted_at=timezone.now())
+        for table, count in purge_deleted_chats(batch_size, pause).items():
+            deleted[table] = deleted.get(table, 0) + count
+
+        _purge_user_relations(user_id, batch_size, deleted, pause)
+
+        # Ya no quedan dependientes: el Collector solo verifica tablas vacías
+        with transaction.atomic():
+            count, _ = User.objects.filter(pk=user_id).delete()
+        deleted[User._meta.db_table] = deleted.get(User._meta.db_table, 0) + (1 if count else 0)
+        logger.info("Cuenta %s purgada", user_id)
+    return deleted
+
+
+def purge_orphan_blobs(batch_size, pause=0, now=None):
+    """
+    Borra los blobs que ningún mensaje referencia y tienen más de
+    BLOB_ORPHAN_GRACE_HOURS (un guardado en curso puede haber escrito el blob
+    antes que su mensaje). Recorre image_blobs por ventanas de `batch_size`
+    hashes, así cada DELETE revisa un rango acotado y la pasada completa
+    lee cada fila una sola vez. Retorna {tabla: filas_borradas}.
+    """
+    now = now or timezone.now()
+    cutoff = ImageBlob._meta.get_field('created_at').get_db_prep_value(
+        now - timedelta(hours=settings.BLOB_ORPHAN_GRACE_HOURS), connection
+    )
+    blobs = ImageBlob._meta.db_table
+    messages = ChatMessage._meta.db_table
+
+    deleted = 0
+    last = ''
+    while True:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT sha256 FROM {blobs} WHERE sha256 > %s ORDER BY sha256 LIMIT %s", [last, batch_size]
+            )
+            window = [sha for (sha,) in cursor.fetchall()]
+        if not window:
+            break
+        try:
+            deleted += _execute(
+                f"""
+                DELETE FROM {blobs} WHERE sha256 IN (
+                    SELECT b.sha256 FROM {blobs} b
+                    WHERE b.sha256 >= %s AND b.sha256 <= %s AND b.created_at < %s
+                      AND NOT EXISTS (SELECT 1 FROM {messages} m WHERE m.image_blob_id = b.sha256)
+                )
+                """, [window[0], window[-1], cutoff]
+            )
+        except IntegrityError:
+            # Un mensaje nuevo volvió a referenciar un blob de la ventana: queda para la próxima pasada
+            logger.warning("Blobs %s..%s referenciados durante el purgado; se reintenta luego", window[0], window[-1])
+        if len(window) < batch_size:
+            break
+        last = window[-1]
+        if pause:
+            time.sleep(pause)
+    return {blobs: deleted}
+
+
+# ===========================
+# DATOS DE INVITADOS VENCIDOS
+# ===========================
+
+def reap_guest_sessions(batch_size, pause=0, now=None):
+    """
+    Borra las sesiones de invitado vencidas en DELETE acotados (recorriendo
+    el índice de expires_at). Retorna {tabla: filas_borradas}.
+    """
+    now = GuestSession._meta.get_field('expires_at').get_db_prep_value(now or timezone.now(), connection)
+    sessions = GuestSession._meta.db_table
+    return {
+        sessions: drain(
+            f"""
+            DELETE FROM {sessions} WHERE id IN (
+                SELECT id FROM {sessions}
+                WHERE expires_at < %s
+                ORDER BY expires_at
+                LIMIT %s
+            )
+            """, [now], batch_size, pause
+        )
+    }
+
+
+def mark_expired_guests(batch_size, pause=0, now=None):
+    """
+    Marca como eliminadas (igual que soft_delete_user, en UPDATE acotados) las
+    cuentas de invitado sin actividad en GUEST_USER_RETENTION_HOURS; el borrado
+    de sus dependientes queda para purge_deleted_users. No se invalida el
+    principal en caché: una cuenta inactiva desde hace horas no está en él
+    (y si lo estuviera, vence en PRINCIPAL_CACHE_TTL). Retorna cuentas marcadas.
+    """
+    now = now or timezone.now()
+    field = User._meta.get_field('deleted_at')
+    cutoff = field.get_db_prep_value(now - timedelta(hours=settings.GUEST_USER_RETENTION_HOURS), connection)
+    users = User._meta.db_table
+    return drain(
+        f"""
+        UPDATE {users} SET deleted_at = %s, is_active = %s WHERE id IN (
+            SELECT id FROM {users}
+            WHERE is_guest = %s AND deleted_at IS NULL
+              AND COALESCE(last_login_at, created_at) < %s
+            ORDER BY id
+            LIMIT %s
+        )
+        """, [field.get_db_prep_value(now, connection), False, True, cutoff], batch_size, pause
+    )
+
+
+def reap_guest_data(batch_size, pause=0, max_users=100, now=None):
+    """
+    Una pasada del reaper de invitados: sesiones vencidas, cuentas de invitado
+    abandonadas (marcadas y luego purgadas con sus dependientes, hasta
+    `max_users` por pasada). Retorna {tabla: filas_borradas}.
+    """
+    deleted = reap_guest_sessions(batch_size, pause, now)
+    marked = mark_expired_guests(batch_size, pause, now)
+    if marked:
+        logger.info("%s cuentas de invitado vencidas marcadas para purgar", marked)
+    for table, count in purge_deleted_users(batch_size, max_users, pause).items():
+        deleted[table] = deleted.get(table, 0) + count
+    deleted.update(purge_orphan_blobs(batch_size, pause, now))
+    return deleted
+
+
+def soft_delete_user(user):
+    """Desactiva la cuenta al instante (JWT deja de autenticar) y la deja para el purgador"""
+    deleted = User.objects.filter(pk=user.pk, deleted_at__isnull=True).update(
+        is_active=False,
+        deleted_at=timezone.now()
+    )
+    bump_principal([user.pk])
+    return deleted
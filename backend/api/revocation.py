@@ -0,0 +1,216 @@
+"""
+Revocación rápida de refresh tokens (lista negra de simplejwt)
+
+simplejwt consulta token_blacklist_blacklistedtoken (JOIN con
+outstandingtoken) cada vez que se verifica un refresh token. Casi ningún
+token está revocado, así que cada worker guarda un filtro de Bloom con los
+jti revocados que aún no vencen:
+
+- is_revoked(jti): si el jti no está en el filtro (el caso común) la
+  respuesta es "no" sin tocar la base; si puede estar (revocado o falso
+  positivo, ~JWT_REVOCATION_ERROR_RATE) se confirma con la consulta de siempre.
+- El filtro se pone al día con las filas nuevas de la lista negra (rango
+  por PK) cada JWT_REVOCATION_SYNC_SECONDS, o antes si otro worker publicó
+  una revocación en el cache de Django. Las revocaciones de este worker
+  entran al instante.
+- Cada JWT_REVOCATION_REBUILD_SECONDS se reconstruye sin los vencidos.
+
+RefreshToken (abajo) usa is_revoked en lugar de la consulta de simplejwt.
+prune_expired_tokens() borra en lotes acotados los tokens vencidos, que
+ya no pueden usarse y antes se acumulaban para siempre.
+"""
+
+import hashlib
+import logging
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken as BaseRefreshToken
+
+from .purge import drain
+
+logger = logging.getLogger(__name__)
+
+LAST_REVOKED_KEY = 'jwt-revocation:last-id'
+# Filas ya vistas que se releen en cada sincronización: un INSERT que
+# confirma tarde puede tener un id menor que el último leído
+SYNC_OVERLAP = 100
+
+
+class BloomFilter:
+    """Filtro de Bloom sobre un bytearray (doble hashing con blake2b)"""
+
+    def __init__(self, capacity, error_rate):
+        self.capacity = max(1, capacity)
+        self.size = max(8, math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        step = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * step) % self.size for i in range(self.hashes)]
+
+    def add(self, item):
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+# ===========================
+# FILTRO POR WORKER
+# ===========================
+
+_filter = None
+_last_id = 0
+_published = 0           # última revocación publicada por otro worker ya atendida
+_next_sync = 0.0
+_next_rebuild = 0.0
+_lock = threading.Lock()
+_stats = {'filtered': 0, 'checked': 0}
+
+
+def _rebuild(now):
+    """Filtro nuevo con los jti revocados que aún no vencen"""
+    global _filter, _last_id, _next_rebuild
+    last_id = BlacklistedToken.objects.aggregate(last=Max('id'))['last'] or 0
+    jtis = list(
+        BlacklistedToken.objects.filter(id__lte=last_id, token__expires_at__gt=now)
+        .values_list('token__jti', flat=True)
+    )
+    bloom = BloomFilter(
+        max(settings.JWT_REVOCATION_MIN_CAPACITY, 2 * len(jtis)), settings.JWT_REVOCATION_ERROR_RATE
+    )
+    for jti in jtis:
+        bloom.add(jti)
+    _filter, _last_id = bloom, last_id
+    _next_rebuild = time.monotonic() + settings.JWT_REVOCATION_REBUILD_SECONDS
+    logger.info("Filtro de tokens revocados reconstruido: %s jti", len(jtis))
+
+
+def _catch_up():
+    """Agrega al filtro las filas de la lista negra posteriores a la última leída"""
+    global _last_id
+    rows = BlacklistedToken.objects.filter(id__gt=_last_id - SYNC_OVERLAP).values_list('id', 'token__jti')
+    for row_id, jti in rows:
+        _filter.add(jti)
+        if row_id > _last_id:
+            _last_id = row_id
+        else:
+            _filter.count -= 1  # ya contada: releerla no acerca la reconstrucción
+
+
+def _sync():
+    global _next_sync, _published
+    now = time.monotonic()
+    published = cache.get(LAST_REVOKED_KEY) or 0
+    if _filter is not None and now < _next_sync and published <= max(_last_id, _published):
+        return
+    with _lock:
+        _published = published
+        if _filter is None or now >= _next_rebuild or _filter.count > _filter.capacity:
+            _rebuild(timezone.now())
+        else:
+            _catch_up()
+        _next_sync = now + settings.JWT_REVOCATION_SYNC_SECONDS
+
+
+def is_revoked(jti):
+    """True si el jti está en la lista negra; sin consulta si el filtro lo descarta"""
+    _sync()
+    if jti not in _filter:
+        _stats['filtered'] += 1
+        return False
+    _stats['checked'] += 1
+    return BlacklistedToken.objects.filter(token__jti=jti).exists()
+
+
+def note_revoked(jti, blacklisted_id):
+    """Registra una revocación hecha en este worker y la publica a los demás"""
+    with _lock:
+        if _filter is not None:
+            _filter.add(jti)
+    if blacklisted_id > (cache.get(LAST_REVOKED_KEY) or 0):
+        cache.set(LAST_REVOKED_KEY, blacklisted_id, timeout=None)
+
+
+def revocation_stats():
+    """Verificaciones resueltas por el filtro vs. confirmadas en la base (este worker)"""
+    return dict(_stats)
+
+
+def reset():
+    """Descarta el filtro de este worker (se reconstruye en el próximo uso)"""
+    global _filter, _last_id
+    with _lock:
+        _filter, _last_id = None, 0
+
+
+class RefreshToken(BaseRefreshToken):
+    """RefreshToken de simplejwt con la verificación de lista negra a través del filtro"""
+
+    def check_blacklist(self):
+        if is_revoked(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError(_("Token is blacklisted"))
+
+    def blacklist(self):
+        blacklisted, created = super().blacklist()
+        note_revoked(self.payload[api_settings.JTI_CLAIM], blacklisted.id)
+        return blacklisted, created
+
+
+# ===========================
+# PODA DE TOKENS VENCIDOS
+# ===========================
+
+def prune_expired_tokens(batch_size, now=None):
+    """
+    Borra los tokens vencidos (ya no verifican) en DELETE acotados, cada uno
+    en su transacción corta: primero sus filas de la lista negra y luego los
+    tokens pendientes. Los vencidos son los de id más bajo, así que cada lote
+    los encuentra recorriendo la PK desde el inicio.
+    Retorna {tabla: filas_borradas}.
+    """
+    now = OutstandingToken._meta.get_field('expires_at').get_db_prep_value(now or timezone.now(), connection)
+    outstanding = OutstandingToken._meta.db_table
+    blacklisted = BlacklistedToken._meta.db_table
+
+    deleted = {}
+    deleted[blacklisted] = drain(
+        f"""
+        DELETE FROM {blacklisted} WHERE id IN (
+            SELECT b.id FROM {blacklisted} b
+            JOIN {outstanding} o ON o.id = b.token_id
+            WHERE o.expires_at <= %s
+            ORDER BY b.id
+            LIMIT %s
+        )
+        """, [now], batch_size
+    )
+    deleted[outstanding] = drain(
+        f"""
+        DELETE FROM {outstanding} WHERE id IN (
+            SELECT o.id FROM {outstanding} o
+            WHERE o.expires_at <= %s
+              AND NOT EXISTS (SELECT 1 FROM {blacklisted} b WHERE b.token_id = o.id)
+            ORDER BY o.id
+            LIMIT %s
+        )
+        """, [now], batch_size
+    )
+    return deleted
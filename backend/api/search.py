@@ -0,0 +1,214 @@
+"""
+Búsqueda de texto completo en el historial de chats del usuario
+
+- PostgreSQL: columna generada `search_vector` (tsvector, config 'spanish')
+  con índice GIN. Al ser GENERATED ... STORED se mantiene sola en cada
+  INSERT/UPDATE de chat_messages.
+- SQLite (desarrollo): tabla virtual FTS5 de contenido externo
+  (`chat_messages_fts`) sincronizada con triggers.
+- Otros motores: LIKE sin ranking (solo para no romper).
+
+El ranking y el snippet se calculan únicamente para la página pedida.
+"""
+
+import re
+
+from django.db import connection
+
+SNIPPET_START = '«'
+SNIPPET_STOP = '»'
+FTS_TABLE = 'chat_messages_fts'
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+# ===========================
+# ESQUEMA (comando rebuild_search_index)
+# ===========================
+# La migración 0006 tiene su propia copia de este DDL: si cambia aquí, el
+# cambio va en una migración nueva.
+
+POSTGRES_SETUP = [
+    """
+    ALTER TABLE chat_messages ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS (to_tsvector('spanish', coalesce(text, ''))) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS chat_messages_search_gin ON chat_messages USING GIN (search_vector)",
+]
+
+POSTGRES_TEARDOWN = [
+    "DROP INDEX IF EXISTS chat_messages_search_gin",
+    "ALTER TABLE chat_messages DROP COLUMN IF EXISTS search_vector",
+]
+
+SQLITE_SETUP = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        text, content='chat_messages', content_rowid='rowid',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON chat_messages BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.rowid, new.text);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON chat_messages BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text) VALUES ('delete', old.rowid, old.text);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF text ON chat_messages BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text) VALUES ('delete', old.rowid, old.text);
+        INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.rowid, new.text);
+    END
+    """,
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+SQLITE_TEARDOWN = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ai",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_au",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+
+def _statements(vendor, setup=True):
+    if vendor == 'postgresql':
+        return POSTGRES_SETUP if setup else POSTGRES_TEARDOWN
+    if vendor == 'sqlite':
+        return SQLITE_SETUP if setup else SQLITE_TEARDOWN
+    return []
+
+
+def install_search_index(schema_editor):
+    """Crea (idempotente) la columna/tabla de búsqueda e índice del motor actual"""
+    for sql in _statements(schema_editor.connection.vendor, setup=True):
+        schema_editor.execute(sql)
+
+
+def drop_search_index(schema_editor):
+    for sql in _statements(schema_editor.connection.vendor, setup=False):
+        schema_editor.execute(sql)
+
+
+# ===========================
+# CONSULTA
+# ===========================
+
+def _fts5_query(q):
+    """Convierte texto libre en una consulta FTS5 segura (AND de términos, prefijo en el último)"""
+    tokens = _TOKEN_RE.findall(q)
+    if not tokens:
+        return None
+    quoted = ['"' + token.replace('"', '""') + '"' for token in tokens]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+def _postgres_search(user_pk, q, limit, offset):
+    # Primero se rankea y pagina; ts_headline (caro) solo corre sobre la página
+    sql = f"""
+        SELECT page.id, page.rank,
+               ts_headline('spanish', page.text, page.query,
+                           'MaxFragments=1, MaxWords=20, MinWords=6, StartSel={SNIPPET_START}, StopSel={SNIPPET_STOP}')
+        FROM (
+            SELECT m.id, m.created_at, m.text, q AS query, ts_rank(m.search_vector, q) AS rank
+            FROM chat_messages m
+            JOIN chats c ON c.id = m.chat_id,
+                 websearch_to_tsquery('spanish', %s) q
+            WHERE c.user_id = %s AND c.deleted_at IS NULL AND m.search_vector @@ q
+            ORDER BY rank DESC, m.created_at DESC, m.id DESC
+            LIMIT %s OFFSET %s
+        ) page
+        ORDER BY page.rank DESC, page.created_at DESC, page.id DESC
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [q, user_pk, limit, offset])
+        return cursor.fetchall()
+
+
+def _sqlite_search(user_pk, q, limit, offset):
+    match = _fts5_query(q)
+    if match is None:
+        return []
+    # bm25() es "menor es mejor": se invierte para exponer un rank "mayor es mejor"
+    sql = f"""
+        SELECT m.id, -bm25({FTS_TABLE}) AS rank,
+               snippet({FTS_TABLE}, 0, '{SNIPPET_START}', '{SNIPPET_STOP}', '…', 16)
+        FROM {FTS_TABLE}
+        JOIN chat_messages m ON m.rowid = {FTS_TABLE}.rowid
+        JOIN chats c ON c.id = m.chat_id
+        WHERE {FTS_TABLE} MATCH %s AND c.user_id = %s AND c.deleted_at IS NULL
+        ORDER BY bm25({FTS_TABLE}), m.created_at DESC
+        LIMIT %s OFFSET %s
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [match, user_pk, limit, offset])
+        return cursor.fetchall()
+
+
+def _fallback_search(user_pk, q, limit, offset):
+    from .models import ChatMessage
+
+    rows = (
+        ChatMessage.objects.filter(chat__user_id=user_pk, chat__deleted_at__isnull=True, text__icontains=q)
+        .order_by('-created_at', '-id')
+        .values_list('id', 'text')[offset:offset + limit]
+    )
+    return [(pk, 0.0, text[:160]) for pk, text in rows]
+
+
+def search_messages(user, q, page=1, page_size=20):
+    """
+    Busca `q` en los mensajes del usuario.
+    Retorna (resultados, has_more); cada resultado es un dict con
+    message_id, chat_id, chat_title, role, created_at, rank y snippet.
+    """
+    from .models import ChatMessage, User
+
+    q = (q or '').strip()
+    if not q:
+        return [], False
+
+    vendor = connection.vendor
+    if vendor == 'postgresql':
+        backend = _postgres_search
+    elif vendor == 'sqlite':
+        backend = _sqlite_search
+    else:
+        backend = _fallback_search
+
+    user_pk = User._meta.pk.get_db_prep_value(user.pk, connection)
+    offset = (page - 1) * page_size
+    rows = backend(user_pk, q, page_size + 1, offset)
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+
+    # Datos del mensaje/chat vía ORM (lectura por PK de la página) para tipos consistentes
+    id_field = ChatMessage._meta.pk
+    ids = [id_field.to_python(pk) for pk, _, _ in rows]
+    messages = {
+        message.pk: message
+        for message in ChatMessage.objects.filter(pk__in=ids)
+        .select_related('chat')
+        .only('id', 'role', 'created_at', 'chat__id', 'chat__title')
+    }
+
+    results = []
+    for pk, (_, rank, snippet) in zip(ids, rows):
+        message = messages.get(pk)
+        if message is None:
+            continue
+        results.append({
+            'message_id': str(message.pk),
+            'chat_id': str(message.chat.pk),
+            'chat_title': message.chat.title,
+            'role': message.role,
+            'created_at': message.created_at,
+            'rank': round(float(rank or 0), 6),
+            'snippet': snippet,
+        })
+    return results, has_more
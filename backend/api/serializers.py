@@ -4,6 +4,7 @@ Convierte modelos Django a JSON y viceversa
 """
 
 from rest_framework import serializers
+from django.conf import settings
 from django.contrib.auth import authenticate
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
@@ -179,23 +180,14 @@ class GuestSessionSerializer(serializers.Serializer):
     )
     
     def create(self, validated_data):
-        """Crear token de invitado"""
-        from .models import GuestSession
-        from django.utils import timezone
-        import datetime
+        """Crear token de invitado (firmado, sin fila: ver api/guest_sessions.py)"""
+        from .guest_sessions import create_guest_session
         
         nickname = validated_data.get('nickname', '')
         if not nickname:
             nickname = f"Invitado_{secrets.token_hex(4)}"
         
-        # Crear sesión temporal
-        session = GuestSession.objects.create(
-            session_token=secrets.token_urlsafe(32),
-            user_nickname=nickname,
-            expires_at=timezone.now() + datetime.timedelta(hours=24)
-        )
-        
-        return session
+        return create_guest_session(nickname)
 
 
 # ===========================
@@ -328,10 +320,19 @@ class UserProgressDetailSerializer(serializers.ModelSerializer):
 class ChatMessageSerializer(serializers.ModelSerializer):
     """Serializer para mensajes de chat"""
     
+    image_url = serializers.SerializerMethodField()
+    
     class Meta:
         model = ChatMessage
         fields = ['id', 'role', 'message_type', 'text', 'image_url', 'image_alt', 'created_at']
         read_only_fields = ['id', 'created_at']
+    
+    def get_image_url(self, obj):
+        # Las imágenes deduplicadas se sirven por URL en lugar de base64 inline
+        if obj.image_blob_id:
+            from .blobs import blob_url
+            return blob_url(obj.image_blob_id, self.context.get('request'))
+        return obj.image_url
 
 
 class ChatSerializer(serializers.ModelSerializer):
@@ -346,7 +347,11 @@ class ChatSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
     
     def get_message_count(self, obj):
-        return obj.messages.count()
+        # Usar la anotación Count('messages') si la vista la incluyó
+        count = getattr(obj, 'message_count', None)
+        if count is None:
+            count = obj.messages.count()
+        return count
 
 
 class ChatListSerializer(serializers.ModelSerializer):
@@ -360,7 +365,11 @@ class ChatListSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
     
     def get_message_count(self, obj):
-        return obj.messages.count()
+        # Usar la anotación Count('messages') si la vista la incluyó
+        count = getattr(obj, 'message_count', None)
+        if count is None:
+            count = obj.messages.count()
+        return count
 
 
 # ===========================
@@ -372,4 +381,50 @@ class UserSettingsUpdateSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = UserSettings
-        fields = ['voice_enabled', 'theme']
+        fields = ['voice_enabled', 'theme', 'user_timezone', 'classroom_code']
+    
+    def validate_user_timezone(self, value):
+        from zoneinfo import available_timezones
+        if value not in available_timezones():
+            raise serializers.ValidationError("Zona horaria inválida")
+        return value
+    
+    def validate_classroom_code(self, value):
+        value = value.strip().upper()
+        if value and not value.replace('-', '').isalnum():
+            raise serializers.ValidationError("El código de aula solo puede tener letras, números y guiones")
+        return value
+
+
+class ChatImportMessageSerializer(serializers.Serializer):
+    """Mensaje de un chat de invitado a importar"""
+    
+    role = serializers.ChoiceField(choices=ChatMessage.MESSAGE_ROLES, default='user')
+    message_type = serializers.ChoiceField(choices=ChatMessage.MESSAGE_TYPES, default='text')
+    text = serializers.CharField(allow_blank=True, required=False, default='', trim_whitespace=False)
+    image_url = serializers.CharField(allow_null=True, allow_blank=True, required=False, default=None)
+    image_alt = serializers.CharField(max_length=500, allow_null=True, allow_blank=True, required=False, default=None)
+
+    def validate_image_url(self, value):
+        from .blobs import InvalidImage, parse_data_url
+
+        try:
+            parse_data_url(value)
+        except InvalidImage as exc:
+            raise serializers.ValidationError(str(exc))
+        return value
+
+
+class ChatImportItemSerializer(serializers.Serializer):
+    """Chat de invitado identificado por el ID que generó el cliente"""
+    
+    client_id = serializers.CharField(max_length=64)
+    title = serializers.CharField(max_length=200, required=False, default='Nueva conversación')
+    created_at = serializers.DateTimeField(required=False, default=None)
+    messages = ChatImportMessageSerializer(many=True)
+
+
+class ChatImportSerializer(serializers.Serializer):
+    """Cuerpo de POST /api/explorer/chats/import"""
+    
+    chats = ChatImportItemSerializer(many=True, allow_empty=False, max_length=settings.CHAT_IMPORT_MAX_CHATS)
@@ -0,0 +1,128 @@
+"""
+Rachas de actividad diaria (UserProgress.current_streak_days)
+
+Cada evento de actividad (preguntar, guardar un chat, generar una imagen)
+llama a record_activity(user_id):
+
+- Guardia en caché: solo la primera actividad del día (en la zona horaria
+  del usuario) llega a la base. La caché guarda hasta cuándo dura el día
+  local actual; el resto de eventos de ese día no escribe nada.
+- La racha se actualiza con un único UPDATE condicional, O(1):
+      last_activity_date = ayer  -> current_streak_days + 1
+      last_activity_date < ayer  -> 1
+      last_activity_date = hoy   -> no se toca (otro worker ya la contó)
+  longest_streak_days se ajusta en la misma sentencia.
+- Las rachas que se cortan (nadie volvió ayer) las pone en 0
+  reset_broken_streaks con un UPDATE por zona horaria, no usuario a usuario.
+"""
+
+import logging
+from datetime import datetime, time as dt_time, timedelta
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Case, F, Q, Value, When
+from django.utils import timezone
+
+from .models import UserProgress, UserSettings
+from .principal import bump_principal
+
+logger = logging.getLogger(__name__)
+
+GUARD_KEY = 'activity-day-end:{user_id}'
+
+
+def get_zone(name):
+    """ZoneInfo del nombre dado, o la de TIME_ZONE si no es válido"""
+    try:
+        return ZoneInfo(name or settings.TIME_ZONE)
+    except (ZoneInfoNotFoundError, ValueError):
+        return ZoneInfo(settings.TIME_ZONE)
+
+
+def user_zone(user_id):
+    name = UserSettings.objects.filter(user_id=user_id).values_list('user_timezone', flat=True).first()
+    return get_zone(name)
+
+
+def _day_end(local_date, zone):
+    """Instante (UTC) en que termina el día local"""
+    midnight = datetime.combine(local_date + timedelta(days=1), dt_time.min, tzinfo=zone)
+    return midnight.astimezone(ZoneInfo('UTC'))
+
+
+def _streak_update(today):
+    yesterday = today - timedelta(days=1)
+    continues = Q(last_activity_date=yesterday)
+    return {
+        'current_streak_days': Case(
+            When(continues, then=F('current_streak_days') + 1),
+            default=Value(1),
+        ),
+        'longest_streak_days': Case(
+            When(continues & Q(longest_streak_days__lte=F('current_streak_days')),
+                 then=F('current_streak_days') + 1),
+            When(longest_streak_days__lt=1, then=Value(1)),
+            default=F('longest_streak_days'),
+        ),
+        'last_activity_date': today,
+    }
+
+
+def record_activity(user_id, now=None):
+    """
+    Registra una actividad del usuario. Retorna True si fue la primera del
+    día y se actualizó la racha, False si la guardia la descartó.
+    """
+    now = now or timezone.now()
+    key = GUARD_KEY.format(user_id=user_id)
+    day_end = cache.get(key)
+    if day_end is not None and now.timestamp() < day_end:
+        return False
+
+    zone = user_zone(user_id)
+    today = now.astimezone(zone).date()
+    pending = UserProgress.objects.filter(user_id=user_id).filter(
+        Q(last_activity_date__isnull=True) | Q(last_activity_date__lt=today)
+    )
+    updated = pending.update(**_streak_update(today), updated_at=now)
+    if not updated and not UserProgress.objects.filter(user_id=user_id).exists():
+        UserProgress.objects.get_or_create(user_id=user_id)
+        updated = pending.update(**_streak_update(today), updated_at=now)
+
+    if updated:
+        bump_principal([user_id])
+
+    end = _day_end(today, zone)
+    cache.set(key, end.timestamp(), timeout=max(1, int((end - now).total_seconds()) + 1))
+    return bool(updated)
+
+
+def forget_activity_guard(user_id):
+    """Olvida la guardia (p. ej. si el usuario cambia de zona horaria)"""
+    cache.delete(GUARD_KEY.format(user_id=user_id))
+
+
+def reset_broken_streaks(now=None):
+    """
+    Pone en 0 las rachas de quienes no tuvieron actividad ni hoy ni ayer
+    (según su zona horaria). Un UPDATE por zona horaria en uso.
+    Retorna la cantidad de rachas reiniciadas.
+    """
+    now = now or timezone.now()
+    default_zone = settings.TIME_ZONE
+    zones = set(UserSettings.objects.values_list('user_timezone', flat=True).distinct())
+    zones.add(default_zone)
+
+    reset = 0
+    for name in sorted(zones):
+        yesterday = now.astimezone(get_zone(name)).date() - timedelta(days=1)
+        in_zone = Q(user__settings__user_timezone=name)
+        if name == default_zone:
+            # Sin fila de configuración se usa TIME_ZONE
+            in_zone |= Q(user__settings__isnull=True)
+        reset += UserProgress.objects.filter(
+            in_zone, current_streak_days__gt=0, last_activity_date__lt=yesterday
+        ).update(current_streak_days=0, updated_at=now)
+    return reset
@@ -1,3 +1,1361 @@
-from django.test import TestCase
+import base64
+import gzip
+import hashlib
+import io
+import json
+import tempfile
+import threading
+import uuid
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection, connections
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from . import (
+    achievements, activity, backfill, catalog, chat_import, guest_sessions, idempotency, popularity, principal,
+    revocation,
+)
+from .chat_views import detect_animal_in_text
+from .conditional import get_conditional_savings
+from .counters import adjust_progress, increment_animals_explored, reconcile_progress
+from .leaderboards import my_rank, refresh_leaderboards, top
+from .lexicon import EXCLUDED_CONTEXTS, AnimalLexicon
+from .models import (
+    Achievement, Animal, AnimalExplored, AnimalPopularity, Chat, ChatAnimal, ChatMessage, DailyActivity,
+    GuestSession, IdempotencyRecord, ImageBlob, User, UserAchievement, UserProgress, UserSettings,
+    level_for_points,
+)
+from .pagination import encode_cursor
+from .parsers import PayloadTooLarge, SpooledMessages, StreamingChatParser
+from .purge import purge_orphan_blobs, reap_guest_data, soft_delete_user
+from .streaks import record_activity, reset_broken_streaks
+
+
+# ===========================
+# PAGINACIÓN POR KEYSET
+# ===========================
+
+class KeysetPaginationTest(TestCase):
+
+    def setUp(self):
+        self.addCleanup(principal.clear_local)
+        self.user = User.objects.create_user(
+            username='paginas', email='paginas@example.com', password='secret-pass-123'
+        )
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+
+    def test_chat_pages_cover_every_chat_once(self):
+        now = timezone.now()
+        for index in range(45):
+            chat = Chat.objects.create(user=self.user, title=f'chat {index}')
+            # Empates de updated_at: el id desempata
+            Chat.objects.filter(pk=chat.pk).update(updated_at=now - timedelta(minutes=index // 2))
+
+        seen, params = [], {'page_size': 10}
+        while True:
+            response = self.client.get('/api/explorer/chats', params)
+            self.assertEqual(response.status_code, 200)
+            seen += [chat['id'] for chat in response.data['results']]
+            if not response.data['next_cursor']:
+                break
+            params = {'page_size': 10, 'cursor': response.data['next_cursor']}
+        self.assertEqual(len(seen), 45)
+        self.assertEqual(len(set(seen)), 45)
+
+    def test_message_pages_load_older_messages(self):
+        chat = Chat.objects.create(user=self.user, title='mensajes')
+        now = timezone.now()
+        for index in range(7):
+            ChatMessage.objects.create(chat=chat, role='user', text=f'm{index}', created_at=now + timedelta(seconds=index))
+
+        response = self.client.get(f'/api/explorer/chats/{chat.id}', {'page_size': 3})
+        self.assertEqual([message['text'] for message in response.data['messages']], ['m4', 'm5', 'm6'])
+        response = self.client.get(
+            f'/api/explorer/chats/{chat.id}', {'page_size': 3, 'before': response.data['next_cursor']}
+        )
+        self.assertEqual([message['text'] for message in response.data['messages']], ['m1', 'm2', 'm3'])
+        self.assertEqual(len(self.client.get(f'/api/explorer/chats/{chat.id}').data['messages']), 7)
+
+    def test_forged_cursors_are_rejected(self):
+        forged = encode_cursor(timezone.now(), 'no-es-un-uuid')
+        for url in ('/api/explorer/chats', '/api/explorer/animals/tigre/chats'):
+            self.assertEqual(self.client.get(url, {'cursor': 'zzz'}).status_code, 404)
+            self.assertEqual(self.client.get(url, {'cursor': forged}).status_code, 404)
+
+
+# ===========================
+# GET CONDICIONAL (ETag)
+# ===========================
+
+class ConditionalGetTest(TestCase):
+
+    def setUp(self):
+        self.addCleanup(principal.clear_local)
+        self.addCleanup(cache.clear)
+        self.user = User.objects.create_user(
+            username='etags', email='etags@example.com', password='secret-pass-123'
+        )
+        UserProgress.objects.create(user=self.user)
+        self.chat = Chat.objects.create(user=self.user, title='ballenas')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+
+    def test_unchanged_reads_answer_304(self):
+        for url in ('/api/explorer/chats', f'/api/explorer/chats/{self.chat.id}',
+                    '/api/explorer/animals', '/api/user/stats'):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            revalidated = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual(revalidated.status_code, 304, url)
+            self.assertEqual(revalidated['ETag'], response['ETag'])
+        self.assertEqual(get_conditional_savings(self.user.pk)['not_modified'], 4)
+
+    def test_writes_change_the_etag(self):
+        etag = self.client.get('/api/explorer/chats')['ETag']
+        self.chat.title = 'orcas'
+        self.chat.save()
+        response = self.client.get('/api/explorer/chats', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+# ===========================
+# IMÁGENES DEDUPLICADAS (blobs)
+# ===========================
+
+PNG_BYTES = b'\x89PNG\r\n\x1a\n' + b'pixeles' * 100
+
+
+def data_url(data, mime_type='image/png'):
+    return f'data:{mime_type};base64,{base64.b64encode(data).decode("ascii")}'
+
+
+class ImageBlobTest(TestCase):
+
+    def setUp(self):
+        self.addCleanup(principal.clear_local)
+        self.user = User.objects.create_user(
+            username='imagenes', email='imagenes@example.com', password='secret-pass-123'
+        )
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+
+    def save(self, *image_urls):
+        return self.client.post('/api/explorer/chats/save', {'title': 'fotos', 'messages': [
+            {'role': 'assistant', 'message_type': 'image', 'text': '', 'image_url': image_url}
+            for image_url in image_urls
+        ]}, format='json')
+
+    def test_images_are_stored_once_and_served_as_images(self):
+        response = self.save(data_url(PNG_BYTES), data_url(PNG_BYTES, 'image/jpeg'))
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(ImageBlob.objects.get().mime_type, 'image/png')  # el tipo sale de los bytes
+        url = response.data['messages'][0]['image_url']
+
+        served = APIClient().get(url)
+        self.assertEqual((served.status_code, served['Content-Type']), (200, 'image/png'))
+        self.assertEqual(served.content, PNG_BYTES)
+        self.assertEqual(served['Content-Security-Policy'], "default-src 'none'; sandbox")
+        self.assertTrue(served['Content-Disposition'].startswith('inline; filename='))
+        self.assertEqual(APIClient().get(url, HTTP_IF_NONE_MATCH=served['ETag']).status_code, 304)
+
+    def test_rejects_anything_but_images(self):
+        html = b'<script>alert(1)</script>'
+        for image_url in (data_url(html, 'text/html'), data_url(html), 'data:text/html,<script>alert(1)</script>',
+                          'data:image/png;base64,no es base64'):
+            self.assertEqual(self.save(image_url).status_code, 400, image_url)
+        self.assertFalse(ImageBlob.objects.exists())
+
+        response = self.client.post('/api/explorer/chats/import', {'chats': [{'client_id': '1', 'messages': [
+            {'role': 'assistant', 'message_type': 'image', 'image_url': data_url(html, 'text/html')},
+        ]}]}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_legacy_non_image_blobs_are_not_served(self):
+        html = b'<script>alert(1)</script>'
+        sha = hashlib.sha256(html).hexdigest()
+        ImageBlob.objects.create(sha256=sha, mime_type='text/html', data=html, size_bytes=len(html))
+        self.assertEqual(APIClient().get(f'/api/images/blob/{sha}').status_code, 404)
+
+
+# ===========================
+# BÚSQUEDA EN EL HISTORIAL
+# ===========================
+
+class ChatSearchTest(TestCase):
+
+    def setUp(self):
+        self.addCleanup(principal.clear_local)
+        self.user = User.objects.create_user(
+            username='buscador', email='buscador@example.com', password='secret-pass-123'
+        )
+        self.chat = Chat.objects.create(user=self.user, title='Tiburones')
+        ChatMessage.objects.create(chat=self.chat, role='assistant', text='Los tiburones tienen muchas filas de dientes')
+        ChatMessage.objects.create(chat=self.chat, role='user', text='háblame del tiburón blanco')
+        other = User.objects.create_user(username='ajeno', email='ajeno@example.com', password='secret-pass-123')
+        ChatMessage.objects.create(chat=Chat.objects.create(user=other), role='user', text='tiburón')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+
+    def search(self, **params):
+        return self.client.get('/api/explorer/search', params).data
+
+    def test_finds_own_messages_ignoring_accents(self):
+        results = self.search(q='tiburon blanco')['results']
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0]['chat_title'], 'Tiburones')
+        self.assertIn('«', results[0]['snippet'])
+        self.assertEqual(len(self.search(q='tibu')['results']), 2)  # prefijo en el último término
+
+    def test_index_follows_updates_and_soft_deletes(self):
+        message = ChatMessage.objects.create(chat=self.chat, role='user', text='gatos')
+        message.text = 'el gran tiburon'
+        message.save()
+        self.assertEqual(len(self.search(q='tiburon')['results']), 3)
+        self.assertTrue(self.search(q='tiburon', page_size=2)['has_more'])
+
+        self.client.delete(f'/api/explorer/chats/{self.chat.id}/delete')
+        self.assertEqual(self.search(q='tiburon')['results'], [])
+
+
+# ===========================
+# ÍNDICE ANIMAL -> CHATS
+# ===========================
+
+class AnimalChatIndexTest(TestCase):
+
+    def setUp(self):
+        self.addCleanup(principal.clear_local)
+        self.user = User.objects.create_user(
+            username='indice', email='indice@example.com', password='secret-pass-123'
+        )
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+
+    def save(self, texts, chat_id=None):
+        return self.client.post('/api/explorer/chats/save', {
+            'chat_id': chat_id, 'title': 'tigres',
+            'messages': [{'role': 'user', 'text': text} for text in texts],
+        }, format='json').data['id']
+
+    def test_pages_chats_about_an_animal(self):
+        chat_ids = [self.save(['háblame del tigre', 'el tigre es grande']) for _ in range(3)]
+
+        response = self.client.get('/api/explorer/animals/tigre/chats', {'page_size': 2})
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertEqual(response.data['results'][0]['mentions'], 2)
+        response = self.client.get(
+            '/api/explorer/animals/tigre/chats', {'page_size': 2, 'cursor': response.data['next_cursor']}
+        )
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertIsNone(response.data['next_cursor'])
+
+        # Re-guardar sin el animal lo saca del índice
+        self.save(['hola'], chat_id=chat_ids[0])
+        results = self.client.get('/api/explorer/animals/Tigre/chats').data['results']
+        self.assertEqual(len(results), 2)
+        self.assertNotIn(chat_ids[0], [entry['id'] for entry in results])
+
+
+# ===========================
+# EXPORTACIÓN NDJSON
+# ===========================
+
+class ChatExportTest(TestCase):
+
+    def setUp(self):
+        self.addCleanup(principal.clear_local)
+        self.user = User.objects.create_user(
+            username='archivo', email='archivo@example.com', password='secret-pass-123'
+        )
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+        self.client.post('/api/explorer/chats/save', {'title': 'tigres', 'messages': [
+            {'role': 'user', 'text': 'el tigre ñandú'},
+            {'role': 'assistant', 'message_type': 'image', 'text': '', 'image_url': data_url(PNG_BYTES)},
+        ]}, format='json')
+
+    def test_streams_one_record_per_line(self):
+        response = self.client.get('/api/explorer/export')
+        self.assertTrue(response.streaming)
+        records = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([record['type'] for record in records], ['export', 'chat', 'message', 'message'])
+        self.assertEqual(records[2]['text'], 'el tigre ñandú')
+        image = records[3]
+        self.assertEqual(image['image_sha256'], hashlib.sha256(PNG_BYTES).hexdigest())
+        self.assertIn('/images/blob/', image['image_url'])
+
+    def test_gzip_archive(self):
+        response = self.client.get('/api/explorer/export', {'gzip': '1'})
+        self.assertIn('.ndjson.gz', response['Content-Disposition'])
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)).decode().count('\n'), 4)
+
+
+# ===========================
+# PURGADO EN SEGUNDO PLANO
+# ===========================
+
+class BackgroundPurgeTest(TestCase):
+
+    def setUp(self):
+        self.addCleanup(principal.clear_local)
+        self.user = User.objects.create_user(
+            username='purgas', email='purgas@example.com', password='secret-pass-123'
+        )
+        UserProgress.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+
+    def save(self, image=PNG_BYTES):
+        return self.client.post('/api/explorer/chats/save', {'title': 'tigres', 'messages': [
+            {'role': 'user', 'text': 'háblame del tigre'},
+            {'role': 'assistant', 'message_type': 'image', 'text': '', 'image_url': data_url(image)},
+        ]}, format='json').data['id']
+
+    def purge(self):
+        call_command('purge_deleted', batch_size=2, stdout=io.StringIO())
+
+    def test_deleted_chat_disappears_then_is_purged(self):
+        kept, deleted = self.save(), self.save(PNG_BYTES + b'otra')
+        self.assertEqual(self.client.delete(f'/api/explorer/chats/{deleted}/delete').status_code, 200)
+        self.assertEqual(self.client.get(f'/api/explorer/chats/{deleted}').status_code, 404)
+        self.assertEqual(self.client.delete(f'/api/explorer/chats/{deleted}/delete').status_code, 404)
+
+        with self.settings(BLOB_ORPHAN_GRACE_HOURS=0):
+            self.purge()
+        self.assertEqual([str(pk) for pk in Chat.all_objects.values_list('pk', flat=True)], [kept])
+        self.assertEqual(ChatMessage.objects.count(), 2)
+        self.assertEqual(
+            list(ImageBlob.objects.values_list('pk', flat=True)), [hashlib.sha256(PNG_BYTES).hexdigest()]
+        )
+
+    def test_recent_orphan_blobs_wait_for_the_grace_period(self):
+        chat_id = self.save()
+        self.client.delete(f'/api/explorer/chats/{chat_id}/delete')
+        self.purge()
+        self.assertEqual(ImageBlob.objects.count(), 1)
+        self.assertEqual(purge_orphan_blobs(10, now=timezone.now() + timedelta(days=2)), {'image_blobs': 1})
+
+    def test_deleted_account_is_purged_with_its_rows(self):
+        self.save()
+        self.assertEqual(self.client.delete('/api/user/account').status_code, 200)
+        with self.settings(BLOB_ORPHAN_GRACE_HOURS=0):
+            self.purge()
+        self.assertFalse(User.objects.filter(pk=self.user.pk).exists())
+        self.assertFalse(ChatMessage.objects.exists())
+        self.assertFalse(AnimalExplored.objects.exists())
+        self.assertFalse(ImageBlob.objects.exists())
+
+
+# ===========================
+# GUARDADO DE CHATS EN STREAMING
+# ===========================
+
+class StreamingChatSaveTest(TestCase):
+
+    def setUp(self):
+        self.addCleanup(principal.clear_local)
+        self.user = User.objects.create_user(
+            username='streaming', email='streaming@example.com', password='secret-pass-123'
+        )
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+
+    def post(self, body, client=None):
+        return (client or self.client).post('/api/explorer/chats/save', body, content_type='application/json')
+
+    def test_saves_large_chats_and_deduplicates_images(self):
+        image = {'role': 'assistant', 'message_type': 'image', 'text': 'león', 'image_url': data_url(PNG_BYTES)}
+        response = self.post(json.dumps({'title': 'tarde', 'messages': [image] * 30, 'chat_id': None}))
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data['title'], len(response.data['messages'])), ('tarde', 30))
+        self.assertEqual(ImageBlob.objects.count(), 1)
+
+    def test_spool_is_closed_when_the_save_fails(self):
+        closed = []
+        close = SpooledMessages.close
+
+        def tracking_close(spool):
+            closed.append(spool)
+            close(spool)
+
+        client = APIClient(raise_request_exception=False)
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+        with mock.patch.object(SpooledMessages, 'close', tracking_close), \
+                mock.patch('api.chat_views.record_activity', side_effect=RuntimeError('caída')):
+            response = self.post(json.dumps({'title': 'x', 'messages': [{'text': 'hola'}]}), client=client)
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(len(closed), 1)
+
+    def test_size_limits_are_enforced_while_reading(self):
+        huge = data_url(PNG_BYTES * 5000)  # ~5 MB
+        body = json.dumps({'messages': [{'role': 'assistant', 'image_url': huge}]}).encode()
+        stream = io.BytesIO(body)
+        with self.settings(CHAT_MESSAGE_MAX_BYTES=100_000), self.assertRaises(PayloadTooLarge):
+            StreamingChatParser().parse(stream)
+        self.assertLess(stream.tell(), 1_000_000)  # cortó sin leer la imagen completa
+
+        with self.settings(CHAT_SAVE_MAX_BYTES=20_000):
+            self.assertEqual(self.post(body).status_code, 413)
+
+    def test_malformed_bodies_are_rejected(self):
+        for body in ('{"messages": [1', '{"messages": [{"text": "a"}', '{"messages": [1]}'):
+            self.assertEqual(self.post(body).status_code, 400, body)
+        self.assertFalse(Chat.objects.exists())
+
+    def test_rejected_saves_leave_no_blobs(self):
+        body = json.dumps({'title': 'mezcla', 'messages': [
+            {'role': 'assistant', 'message_type': 'image', 'image_url': data_url(PNG_BYTES)},
+            {'role': 'assistant', 'message_type': 'image', 'image_url': data_url(b'<html>', 'text/html')},
+        ]})
+        self.assertEqual(self.post(body).status_code, 400)
+
+        guest = User.objects.create_user(username='invitado-streaming')
+        guest_client = APIClient()
+        guest_client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(guest).access_token}')
+        body = json.dumps({'messages': [{'role': 'assistant', 'image_url': data_url(PNG_BYTES)}]})
+        self.assertEqual(self.post(body, guest_client).status_code, 200)
+        self.assertFalse(ImageBlob.objects.exists())
+
+    def test_clients_cannot_choose_the_blob(self):
+        ImageBlob.objects.create(sha256='a' * 64, mime_type='image/png', data=PNG_BYTES, size_bytes=len(PNG_BYTES))
+        body = json.dumps({'messages': [{'role': 'assistant', 'text': 'hola', 'image_blob_id': 'a' * 64}]})
+        self.assertEqual(self.post(body).status_code, 201)
+        self.assertIsNone(ChatMessage.objects.get().image_blob_id)
+
+
+# ===========================
+# IMPORTACIÓN DE CHATS DE INVITADO
+# ===========================
+
+class ChatImportTest(TestCase):
+
+    def setUp(self):
+        self.addCleanup(principal.clear_local)
+        self.user = User.objects.create_user(
+            username='importador', email='importador@example.com', password='secret-pass-123'
+        )
+        UserProgress.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+
+    def chats(self, count, messages=2):
+        return [{
+            'client_id': str(1700000000000 + index), 'title': f'chat {index}', 'created_at': '2025-01-01T10:00:00Z',
+            'messages': [{'role': 'user', 'text': f'el tigre {position}'} for position in range(messages)],
+        } for index in range(count)]
+
+    def post(self, chats):
+        return self.client.post('/api/explorer/chats/import', {'chats': chats}, format='json')
+
+    def test_bulk_import_is_idempotent(self):
+        chats = self.chats(120)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post(chats)
+        self.assertEqual(response.status_code, 201)
+        self.assertLess(len(queries), 40)
+        self.assertEqual(response.data['imported'], 120)
+        self.assertEqual(AnimalExplored.objects.get(animal_name='Tigre').times_explored, 240)
+        self.assertEqual(UserProgress.objects.get(user=self.user).total_messages, 240)
+
+        again = self.post(chats[:5])
+        self.assertEqual((again.status_code, again.data['imported'], again.data['skipped']), (200, 0, 5))
+        self.assertEqual(again.data['chats'][chats[0]['client_id']], response.data['chats'][chats[0]['client_id']])
+        self.assertEqual(Chat.objects.count(), 120)
+
+    def test_messages_keep_their_order(self):
+        chat_id = self.post(self.chats(1, messages=12)).data['chats']['1700000000000']
+        texts = [message['text'] for message in self.client.get(f'/api/explorer/chats/{chat_id}').data['messages']]
+        self.assertEqual(texts, [f'el tigre {position}' for position in range(12)])
+
+    def test_concurrent_import_of_the_same_chat(self):
+        chats = self.chats(2)
+        build_batch = chat_import._build_batch
+
+        def racing_build_batch(user, items):
+            # Otra importación del mismo chat confirma después de la lectura de idempotencia
+            winner = Chat.objects.create(user=user, client_id=items[0]['client_id'], title='ganador')
+            racing_build_batch.winner = winner
+            return build_batch(user, items)
+
+        with mock.patch.object(chat_import, '_build_batch', racing_build_batch):
+            response = self.post(chats)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data['imported'], response.data['skipped']), (1, 1))
+        self.assertEqual(response.data['chats'][chats[0]['client_id']], str(racing_build_batch.winner.pk))
+        self.assertEqual(ChatMessage.objects.count(), 2)
+        self.assertEqual(UserProgress.objects.get(user=self.user).total_chats, 1)
+
+
+# ===========================
+# IDEMPOTENCY-KEY
+# ===========================
+
+class IdempotencyKeyTest(TestCase):
+
+    def setUp(self):
+        self.addCleanup(principal.clear_local)
+        self.user = User.objects.create_user(
+            username='reintentos', email='reintentos@example.com', password='secret-pass-123'
+        )
+        UserProgress.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+
+    def save(self, title, key='clave-1'):
+        body = {'title': title, 'messages': [{'role': 'user', 'text': 'el tigre'}]}
+        return self.client.post('/api/explorer/chats/save', body, format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retry_replays_the_stored_response(self):
+        first = self.save('safari')
+        again = self.save('safari')
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(again.status_code, 201)
+        self.assertEqual(again['Idempotent-Replayed'], 'true')
+        self.assertEqual(json.loads(again.content), json.loads(first.content))
+        self.assertEqual(Chat.objects.count(), 1)
+
+    def test_same_key_with_another_body_is_rejected(self):
+        self.save('safari')
+        response = self.save('otro safari')
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Chat.objects.count(), 1)
+        self.assertEqual(self.save('otro safari', key='clave-2').status_code, 201)
+
+    def test_duplicate_while_in_progress_gets_409_without_waiting(self):
+        IdempotencyRecord.objects.all().delete()
+        with mock.patch.object(idempotency, '_store'):
+            self.save('safari')  # la reserva queda "en curso"
+        response = self.save('safari')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response['Retry-After'], '1')
+        self.assertEqual(self.save('otro safari').status_code, 422)
+
+    @override_settings(IDEMPOTENCY_MAX_BODY_BYTES=64)
+    def test_oversized_body_is_rejected_before_claiming(self):
+        self.assertEqual(self.save('x' * 100).status_code, 413)
+        self.assertFalse(IdempotencyRecord.objects.exists())
+
+
+# ===========================
+# LÉXICO DE ANIMALES
+# ===========================
+
+class AnimalLexiconTest(TestCase):
+
+    def setUp(self):
+        self.lexicon = AnimalLexicon(
+            [('Gato', ['gato']), ('Oso', ['oso']), ('Pez', ['pez']), ('Tiburón', ['tiburón']),
+             ('Llama', ['llama']), ('León', ['león']), ('León marino', ['león marino'])],
+            EXCLUDED_CONTEXTS,
+        )
+
+    def test_only_whole_words_match(self):
+        self.assertEqual(self.lexicon.counts('Tomé gatorade con un oso precioso'), {'Oso': 1})
+
+    def test_plurals_accents_and_case(self):
+        self.assertEqual(
+            self.lexicon.counts('TIBURONES, un tiburon y dos PECES'), {'Tiburón': 2, 'Pez': 1}
+        )
+
+    def test_longest_form_wins(self):
+        matches = self.lexicon.find('el león marino y el león')
+        self.assertEqual([match.name for match in matches], ['León marino', 'León'])
+        self.assertEqual(matches[0].text, 'león marino')
+
+    def test_names_that_differ_only_in_a_final_accented_letter(self):
+        lexicon = AnimalLexicon([('Cangrejo de río', ['cangrejo de río']), ('Cangrejo de ría', ['cangrejo de ría'])])
+        self.assertEqual(
+            lexicon.counts('un cangrejo de río, dos cangrejos de rio y un cangrejo de RÍA'),
+            {'Cangrejo de río': 2, 'Cangrejo de ría': 1},
+        )
+
+    def test_se_llama_is_not_the_animal(self):
+        self.assertEqual(self.lexicon.counts('mi gato se llama Bigotes'), {'Gato': 1})
+        self.assertEqual(self.lexicon.counts('una llama en los Andes'), {'Llama': 1})
+
+    def test_detection_returns_the_most_mentioned_animal(self):
+        self.assertEqual(detect_animal_in_text('el gato mira al oso; el oso se va'), 'Oso')
+        self.assertEqual(detect_animal_in_text('hola, ¿cómo estás?'), None)
+
+
+# ===========================
+# CATÁLOGO DE ANIMALES
+# ===========================
+
+class AnimalCatalogTest(TestCase):
+
+    def setUp(self):
+        self.addCleanup(catalog.invalidate)
+        catalog.invalidate()
+
+    def test_catalog_is_seeded_from_the_fixture(self):
+        self.assertEqual(Animal.objects.count(), len(catalog.load_fixture_animals()))
+        self.assertEqual(catalog.detect_animal('un minino'), 'Gato')
+        self.assertEqual(catalog.translate_animal('leones'), 'lion')
+        self.assertEqual(catalog.translate_animal('grifo'), 'grifo')
+
+    def test_edits_reach_the_index_after_invalidation(self):
+        version = catalog.get_index().version
+        tigre = Animal.objects.get(slug='tigre')
+        tigre.synonyms = ['felino rayado']
+        tigre.save()
+        self.assertIs(catalog.get_index().version, version)  # dentro del intervalo de verificación
+        catalog.invalidate()
+        self.assertNotEqual(catalog.get_index().version, version)
+        self.assertEqual(catalog.detect_animal('vimos un felino rayado'), 'Tigre')
+
+        Animal.objects.filter(slug='tigre').update(is_active=False, updated_at=timezone.now())
+        catalog.invalidate()
+        self.assertIsNone(catalog.detect_animal('vimos un tigre'))
+
+    def test_multi_word_names_keep_their_catalog_spelling(self):
+        Animal.objects.create(
+            slug='ajolote-mexicano', name='Ajolote Mexicano', english_name='axolotl', category='anfibio'
+        )
+        catalog.invalidate()
+        self.assertEqual(catalog.canonical_name('ajolote mexicano'), 'Ajolote Mexicano')
+        self.assertEqual(catalog.canonical_name('grifo'), 'Grifo')
+
+        user = User.objects.create_user(username='ajolotes', email='ajolotes@example.com', password='x' * 12)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+        client.post('/api/explorer/chats/save', {
+            'title': 'ajolotes', 'messages': [{'role': 'user', 'text': 'un ajolote mexicano'}],
+        }, format='json')
+        self.assertEqual(
+            AnimalExplored.objects.get(user=user, animal_name='Ajolote Mexicano').times_explored, 1
+        )
+        results = client.get('/api/explorer/animals/ajolote mexicano/chats').data['results']
+        self.assertEqual(len(results), 1)
+
+    def test_missing_table_falls_back_to_the_fixture(self):
+        with mock.patch.object(catalog, '_catalog_version', return_value=None):
+            index = catalog.get_index()
+        self.assertEqual(index.version, 'fixture')
+        self.assertEqual(index.get('Tiburones').english_name, 'shark')
+
+
+# ===========================
+# BACKFILL DE ANIMALES
+# ===========================
+
+class AnimalBackfillTest(TestCase):
+
+    def setUp(self):
+        self.addCleanup(principal.clear_local)
+        self.user = User.objects.create_user(
+            username='historial', email='historial@example.com', password='secret-pass-123'
+        )
+        UserProgress.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+        self.client.post('/api/explorer/chats/save', {'title': 'safari', 'messages': [
+            {'role': 'user', 'text': 'el tigre'}, {'role': 'assistant', 'text': 'el tigre y el tigre'},
+            {'role': 'user', 'text': 'y el oso?'},
+        ]}, format='json')
+        checkpoints = tempfile.TemporaryDirectory()
+        self.addCleanup(checkpoints.cleanup)
+        self.checkpoints = Path(checkpoints.name)
+
+    def backfill(self, *args):
+        call_command('backfill_animals', *args, stdout=io.StringIO())
+
+    def test_partitions_cover_the_uuid_space(self):
+        bounds = [backfill.partition_bounds(partition, 4) for partition in range(4)]
+        self.assertEqual(bounds[0][0], uuid.UUID(int=0))
+        self.assertIsNone(bounds[-1][1])
+        self.assertEqual([high for _, high in bounds[:-1]], [low for low, _ in bounds[1:]])
+        with self.assertRaises(ValueError):
+            backfill.partition_bounds(4, 4)
+
+    def test_rebuilds_mentions_and_aggregates(self):
+        ChatMessage.objects.update(animal_mentioned='Lobo')
+        ChatAnimal.objects.all().delete()
+        AnimalExplored.objects.filter(animal_name='Tigre').update(times_explored=99)
+        AnimalExplored.objects.create(user=self.user, animal_name='Lobo', times_explored=5, is_favorite=True)
+        AnimalExplored.objects.create(user=self.user, animal_name='Grifo', times_explored=2)
+        UserProgress.objects.filter(user=self.user).update(total_animals_explored=0)
+
+        for partition in ('0', '1'):
+            self.backfill('--partitions', '2', '--partition', partition,
+                          '--checkpoint', str(self.checkpoints / f'{partition}.json'))
+
+        self.assertEqual(
+            sorted(ChatMessage.objects.values_list('animal_mentioned', flat=True)), ['Oso', 'Tigre', 'Tigre']
+        )
+        self.assertEqual(
+            dict(ChatAnimal.objects.values_list('animal_name', 'mentions')), {'Oso': 1, 'Tigre': 2}
+        )
+        self.assertEqual(
+            dict(AnimalExplored.objects.values_list('animal_name', 'times_explored')),
+            {'Oso': 1, 'Tigre': 2, 'Lobo': 0},
+        )
+        self.assertEqual(UserProgress.objects.get(user=self.user).total_animals_explored, 2)
+
+    def test_resume_skips_finished_work(self):
+        path = str(self.checkpoints / 'todo.json')
+        self.backfill('--checkpoint', path)
+        self.assertEqual(backfill.load_checkpoint(path)['phase'], backfill.PHASE_DONE)
+        ChatMessage.objects.update(animal_mentioned='Lobo')
+        self.backfill('--checkpoint', path, '--resume')
+        self.assertEqual(set(ChatMessage.objects.values_list('animal_mentioned', flat=True)), {'Lobo'})
+
+
+# ===========================
+# CONTADORES DE PROGRESO
+# ===========================
+
+class ProgressCountersTest(TestCase):
+
+    def setUp(self):
+        self.addCleanup(principal.clear_local)
+        self.user = User.objects.create_user(
+            username='contadora', email='contadora@example.com', password='secret-pass-123'
+        )
+        UserProgress.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+
+    def save(self, messages, chat_id=None):
+        body = {'title': 'safari', 'messages': [{'role': role, 'text': text} for role, text in messages]}
+        if chat_id:
+            body['chat_id'] = chat_id
+        return self.client.post('/api/explorer/chats/save', body, format='json')
+
+    def test_writes_keep_the_counters_in_sync(self):
+        conversation = [('user', 'hola tigre'), ('assistant', 'el tigre')]
+        chat_id = self.save(conversation).data['id']
+        self.save(conversation + [('user', 'y el oso?')], chat_id=chat_id)
+        self.save([('user', 'lobo')])
+
+        response = self.client.get('/api/user/stats')
+        self.assertEqual(
+            response.data, {'total_animals': 3, 'total_chats': 2, 'total_messages': 4, 'current_streak': 1}
+        )
+        self.assertEqual(UserProgress.objects.get(user=self.user).total_questions_asked, 3)
+        self.assertEqual(reconcile_progress([self.user.id]), {'created': 0, 'fixed': 0})
+
+        etag = response['ETag']
+        self.assertEqual(self.client.get('/api/user/stats', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.client.delete(f'/api/explorer/chats/{chat_id}/delete')
+        response = self.client.get('/api/user/stats', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['total_chats'], response.data['total_messages']), (1, 1))
+        self.assertEqual(reconcile_progress([self.user.id]), {'created': 0, 'fixed': 0})
+
+    def test_reconcile_fixes_drift_and_missing_rows(self):
+        self.save([('user', 'el tigre')])
+        UserProgress.objects.filter(user=self.user).update(total_chats=40, total_messages=0)
+        other = User.objects.create_user(username='sin-fila', email='sin-fila@example.com', password='x' * 12)
+
+        call_command('reconcile_user_progress', stdout=io.StringIO())
+        progress = UserProgress.objects.get(user=self.user)
+        self.assertEqual((progress.total_chats, progress.total_messages), (1, 1))
+        self.assertTrue(UserProgress.objects.filter(user=other).exists())
+
+    def test_reconcile_a_single_user(self):
+        self.save([('user', 'el tigre')])
+        UserProgress.objects.filter(user=self.user).update(total_chats=40)
+        output = io.StringIO()
+        call_command('reconcile_user_progress', user=[str(self.user.id)], stdout=output)
+        self.assertIn('1 con contadores desviados corregidos, 0 filas creadas', output.getvalue())
+        self.assertEqual(UserProgress.objects.get(user=self.user).total_chats, 1)
+
+        with self.assertRaises(CommandError):
+            call_command('reconcile_user_progress', user=['no-es-un-uuid'], stdout=io.StringIO())
+        with self.assertRaises(CommandError):
+            call_command('reconcile_user_progress', user=[str(uuid.uuid4())], stdout=io.StringIO())
+
+
+# ===========================
+# RACHAS DE ACTIVIDAD
+# ===========================
+
+def utc(day, hour):
+    return datetime(2026, 3, day, hour, tzinfo=dt_timezone.utc)
+
+
+class ActivityStreakTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user = User.objects.create_user(
+            username='constante', email='constante@example.com', password='secret-pass-123'
+        )
+        UserSettings.objects.create(user=self.user, user_timezone='Asia/Tokyo')
+
+    def streak(self, user=None):
+        progress = UserProgress.objects.get(user=user or self.user)
+        return progress.current_streak_days, progress.longest_streak_days
+
+    def test_days_follow_the_user_timezone(self):
+        self.assertTrue(record_activity(self.user.id, utc(1, 10)))   # 1 de marzo, 19:00 en Tokio
+        with self.assertNumQueries(0):
+            self.assertFalse(record_activity(self.user.id, utc(1, 12)))
+        self.assertTrue(record_activity(self.user.id, utc(1, 16)))   # 2 de marzo, 01:00 en Tokio
+        self.assertTrue(record_activity(self.user.id, utc(2, 16)))
+        self.assertEqual(self.streak(), (3, 3))
+
+    def test_same_day_counts_once_across_workers(self):
+        record_activity(self.user.id, utc(1, 10))
+        cache.clear()  # otro worker, sin la guardia
+        self.assertFalse(record_activity(self.user.id, utc(1, 11)))
+        self.assertEqual(self.streak(), (1, 1))
+
+    def test_broken_streaks_are_reset_per_timezone(self):
+        for day in (1, 2, 3):
+            record_activity(self.user.id, utc(day, 16))
+        # Última actividad: 4 de marzo en Tokio
+        self.assertEqual(reset_broken_streaks(utc(4, 16)), 0)   # 5 de marzo: ayer hubo actividad
+        self.assertEqual(reset_broken_streaks(utc(5, 16)), 1)   # 6 de marzo: se cortó
+        self.assertEqual(self.streak(), (0, 3))
+
+        cache.clear()
+        record_activity(self.user.id, utc(6, 16))
+        self.assertEqual(self.streak(), (1, 3))
+
+    def test_users_without_progress_or_settings(self):
+        other = User.objects.create_user(username='nueva', email='nueva@example.com', password='secret-pass-123')
+        self.assertTrue(record_activity(other.id, utc(6, 17)))
+        self.assertEqual(self.streak(other), (1, 1))
+
+
+# ===========================
+# TABLAS DE POSICIONES
+# ===========================
+
+class LeaderboardTest(TestCase):
+
+    def setUp(self):
+        self.addCleanup(principal.clear_local)
+        self.users = []
+        for index, (level, points, animals, classroom) in enumerate([
+            (1, 50, 3, 'A'), (2, 10, 5, 'A'), (1, 90, 5, 'B'), (1, 0, 0, 'A'), (3, 0, 1, ''),
+        ]):
+            user = User.objects.create_user(
+                username=f'alumno{index}', email=f'alumno{index}@example.com', password='secret-pass-123'
+            )
+            UserProgress.objects.create(
+                user=user, current_level=level, total_points=points, total_animals_explored=animals
+            )
+            UserSettings.objects.create(user=user, classroom_code=classroom)
+            self.users.append(user)
+        guest = User.objects.create_user(username='invitado-top', is_guest=True)
+        UserProgress.objects.create(user=guest, total_animals_explored=99)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.users[0]).access_token}')
+
+    def test_ranks_are_precomputed_per_scope(self):
+        written = refresh_leaderboards()
+        self.assertEqual(written['animals'], 4 + 3)  # global (sin invitados ni puntaje 0) + aulas A y B
+        self.assertEqual(
+            [(entry.rank, entry.user_id, entry.score) for entry in top('animals')][:3],
+            sorted([(1, self.users[1].id, 5), (1, self.users[2].id, 5)]) + [(3, self.users[0].id, 3)],
+        )
+        self.assertEqual(my_rank('animals', self.users[1].id, 'A'), (1, 5))
+        self.assertEqual(my_rank('points', self.users[4].id), (1, 250))  # nivel 3 = 100 + 150 puntos
+        self.assertIsNone(my_rank('animals', self.users[3].id))
+
+    def test_endpoint(self):
+        refresh_leaderboards()
+        response = self.client.get('/api/leaderboards/animals', {'scope': 'classroom'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['me'], {'rank': 2, 'score': 3})
+        self.assertEqual([row['is_me'] for row in response.data['top']], [False, True])
+        self.assertEqual(self.client.get('/api/leaderboards/zzz').status_code, 404)
+        self.assertEqual(self.client.get('/api/leaderboards/points', {'limit': 'x'}).status_code, 400)
+
+    def test_classroom_codes_are_normalized(self):
+        response = self.client.put('/api/user/settings', {'classroom_code': ' b '}, format='json')
+        self.assertEqual(response.data['classroom_code'], 'B')
+        refresh_leaderboards(['animals'])
+        response = self.client.get('/api/leaderboards/animals', {'scope': 'classroom'})
+        self.assertEqual(response.data['me'], {'rank': 2, 'score': 3})
+
+
+# ===========================
+# CONTADORES DE ANIMALES EXPLORADOS
+# ===========================
+
+class AnimalExploredCountersTest(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='explorer', password='secret-pass-123')
+
+    def test_creates_and_increments(self):
+        increment_animals_explored(self.user.id, {'León': 2, 'tigre': 1})
+        increment_animals_explored(self.user.id, {'León': 3})
+
+        counts = dict(AnimalExplored.objects.filter(user=self.user).values_list('animal_name', 'times_explored'))
+        self.assertEqual(counts, {'León': 5, 'Tigre': 1})
+
+    def test_keeps_favorite_and_first_explored(self):
+        increment_animals_explored(self.user.id, {'Oso': 1})
+        animal = AnimalExplored.objects.get(user=self.user, animal_name='Oso')
+        animal.is_favorite = True
+        animal.save()
+
+        increment_animals_explored(self.user.id, {'Oso': 1})
+        updated = AnimalExplored.objects.get(pk=animal.pk)
+        self.assertTrue(updated.is_favorite)
+        self.assertEqual(updated.first_explored_at, animal.first_explored_at)
+        self.assertEqual(updated.times_explored, 2)
+
+    def test_empty_counts_do_nothing(self):
+        increment_animals_explored(self.user.id, {})
+        increment_animals_explored(self.user.id, {'': 3, 'Lobo': 0})
+        self.assertFalse(AnimalExplored.objects.filter(user=self.user).exists())
+
+
+class AnimalExploredConcurrencyTest(TransactionTestCase):
+    """Muchos threads incrementando los mismos animales del mismo usuario"""
+
+    THREADS = 8
+    ROUNDS = 25
+
+    def test_concurrent_increments_are_exact(self):
+        user = User.objects.create_user(username='hammer', password='secret-pass-123')
+        barrier = threading.Barrier(self.THREADS)
+        errors = []
+        created = []
+
+        def worker():
+            try:
+                barrier.wait()
+                for _ in range(self.ROUNDS):
+                    created.append(increment_animals_explored(user.id, {'León': 1, 'Tigre': 2}))
+            except Exception as exc:  # se reporta en el hilo principal
+                errors.append(exc)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=worker) for _ in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        counts = dict(AnimalExplored.objects.filter(user=user).values_list('animal_name', 'times_explored'))
+        self.assertEqual(counts, {
+            'León': self.THREADS * self.ROUNDS,
+            'Tigre': 2 * self.THREADS * self.ROUNDS,
+        })
+        self.assertEqual(sum(created), 2)  # cada animal es nuevo una sola vez
+
+
+# ===========================
+# MOTOR DE LOGROS
+# ===========================
+
+class AchievementEngineTest(TestCase):
+
+    def setUp(self):
+        self.addCleanup(achievements.invalidate)
+        achievements.invalidate()
+        for code, requirement_type, value, reward in [
+            ('q1', 'questions_asked', 1, 10),
+            ('q10', 'questions_asked', 10, 50),
+            ('s3', 'streak_days', 3, 30),
+            ('p50', 'total_points', 50, 20),
+            ('p100', 'total_points', 100, 25),
+        ]:
+            Achievement.objects.create(
+                code=code, name=code, description=code,
+                requirement_type=requirement_type, requirement_value=value, points_reward=reward,
+            )
+        self.user = User.objects.create_user(username='logros', password='secret-pass-123')
+        UserProgress.objects.create(user=self.user, total_questions_asked=10, longest_streak_days=2)
+
+    def test_level_closed_form_matches_loop(self):
+        for points in [0, 99, 100, 249, 250, 1000, 12345, 10 ** 7]:
+            level, remaining, next_level = 1, points, 100
+            while remaining >= next_level:
+                remaining -= next_level
+                level += 1
+                next_level = int(next_level * 1.5)
+            self.assertEqual(level_for_points(points), (level, remaining, next_level))
+
+    def test_unlocks_cascade_through_points(self):
+        result = achievements.evaluate_achievements([self.user.id])
+
+        # 10 + 50 = 60 puntos cruzan p50 (+20 = 80); p100 no se alcanza
+        self.assertEqual(sorted(result[self.user.id]), ['p50', 'q1', 'q10'])
+        progress = UserProgress.objects.get(user=self.user)
+        self.assertEqual((progress.current_level, progress.total_points), (1, 80))
+        self.assertEqual(achievements.evaluate_achievements([self.user.id]), {})
+
+        UserProgress.objects.filter(user=self.user).update(longest_streak_days=3)
+        result = achievements.evaluate_achievements([self.user.id])
+        self.assertEqual(result[self.user.id], ['s3', 'p100'])
+        progress.refresh_from_db()
+        self.assertEqual((progress.current_level, progress.total_points, progress.points_to_next_level), (2, 35, 150))
+
+    def test_backfill_matches_event_evaluation(self):
+        achievements.evaluate_achievements([self.user.id])
+        expected = UserProgress.objects.values_list('current_level', 'total_points').get(user=self.user)
+        codes = set(UserAchievement.objects.values_list('achievement__code', flat=True))
+
+        UserAchievement.objects.all().delete()
+        UserProgress.objects.filter(user=self.user).update(total_points=0, current_level=1)
+        self.assertEqual(achievements.backfill_achievements([self.user.id]), 3)
+        self.assertEqual(achievements.backfill_achievements([self.user.id]), 0)
+
+        self.assertEqual(set(UserAchievement.objects.values_list('achievement__code', flat=True)), codes)
+        self.assertEqual(
+            UserProgress.objects.values_list('current_level', 'total_points').get(user=self.user), expected
+        )
+
+
+# ===========================
+# DASHBOARD
+# ===========================
+
+@override_settings(PRINCIPAL_SHARED_CACHE=True)
+class DashboardQueriesTest(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='dashboard', email='dashboard@example.com', password='secret-pass-123'
+        )
+        UserProgress.objects.create(user=self.user)
+        for index in range(8):
+            chat = Chat.objects.create(user=self.user, title=f'chat {index}')
+            ChatMessage.objects.create(chat=chat, role='user', text='¿Qué come el león?')
+        increment_animals_explored(self.user.id, {'León': 2, 'Tigre': 1})
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+        self.addCleanup(principal.clear_local)
+
+    def test_fixed_number_of_queries(self):
+        self.client.get('/api/dashboard')  # carga el principal
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/dashboard', {'limit': 5})
+        self.assertEqual(set(response.data), {'user', 'stats', 'animals', 'chats', 'settings'})
+        self.assertEqual(len(response.data['chats']), 5)
+        self.assertEqual(response.data['chats'][0]['message_count'], 1)
+        self.assertEqual(len(response.data['animals']), 2)
+
+    def test_field_selection(self):
+        self.client.get('/api/dashboard')
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/dashboard', {'fields': 'animals', 'limit': 1})
+        self.assertEqual(list(response.data), ['animals'])
+        self.assertEqual(len(response.data['animals']), 1)
+        self.assertEqual(self.client.get('/api/dashboard', {'fields': 'secretos'}).status_code, 400)
+
+
+# ===========================
+# ACTIVIDAD DIARIA
+# ===========================
+
+class DailyActivityTest(TestCase):
+
+    def setUp(self):
+        self.addCleanup(principal.clear_local)
+        self.user = User.objects.create_user(
+            username='graficas', email='graficas@example.com', password='secret-pass-123'
+        )
+        UserSettings.objects.create(user=self.user, user_timezone='Asia/Tokyo')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+
+    def save(self, messages, chat_id=None):
+        body = {'title': 'safari', 'messages': [{'role': role, 'text': text} for role, text in messages]}
+        if chat_id:
+            body['chat_id'] = chat_id
+        return self.client.post('/api/explorer/chats/save', body, format='json')
+
+    def today(self):
+        return DailyActivity.objects.values('messages', 'questions', 'new_animals').get(
+            user=self.user, day=activity.local_today(self.user.id)
+        )
+
+    def test_writes_roll_up_into_today(self):
+        conversation = [('user', 'hola tigre'), ('assistant', 'el tigre y el oso')]
+        chat_id = self.save(conversation).data['id']
+        self.save(conversation + [('user', 'y el león?')], chat_id=chat_id)
+        self.assertEqual(self.today(), {'messages': 3, 'questions': 2, 'new_animals': 2})
+
+        response = self.client.get('/api/user/activity')
+        self.assertEqual(len(response.data['series']), settings.ACTIVITY_DEFAULT_DAYS)
+        self.assertEqual(response.data['series'][-1]['messages'], 3)
+        self.assertEqual(str(response.data['to']), str(activity.local_today(self.user.id)))
+        self.assertEqual(self.client.get('/api/user/activity', {'bucket': 'year'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/user/activity', {'from': '2020-01-01'}).status_code, 400)
+
+    def test_buckets_return_a_dense_series(self):
+        DailyActivity.objects.create(user=self.user, day=date(2026, 1, 5), messages=4)
+        DailyActivity.objects.create(user=self.user, day=date(2026, 1, 9), messages=2, images=1)
+        series = activity.activity_series(self.user.id, date(2026, 1, 1), date(2026, 1, 31), 'week')
+        self.assertEqual(series[0]['date'], date(2025, 12, 29))
+        self.assertEqual([bucket['messages'] for bucket in series], [0, 6, 0, 0, 0])
+        self.assertEqual(series[1]['images'], 1)
+
+    def test_new_animals_are_counted_once(self):
+        self.assertEqual(increment_animals_explored(self.user.id, {'León': 2, 'tigre': 1}), 2)
+        self.assertEqual(increment_animals_explored(self.user.id, {'León': 1, 'Oso': 1}), 1)
+        self.assertEqual(AnimalExplored.objects.get(user=self.user, animal_name='León').times_explored, 3)
+
+    def test_backfill_rebuilds_from_history(self):
+        self.save([('user', 'el tigre'), ('assistant', 'el tigre')])
+        DailyActivity.objects.update(messages=50, questions=0, new_animals=9, images=2)
+        call_command('backfill_daily_activity', user=[str(self.user.id)], stdout=io.StringIO())
+        self.assertEqual(self.today(), {'messages': 2, 'questions': 1, 'new_animals': 1})
+        self.assertEqual(DailyActivity.objects.get(user=self.user).images, 2)
+
+    def test_resaving_a_chat_keeps_message_dates(self):
+        conversation = [('user', 'hola tigre'), ('assistant', 'el tigre')]
+        chat_id = self.save(conversation).data['id']
+        last_week = timezone.now() - timedelta(days=7)
+        ChatMessage.objects.filter(chat_id=chat_id).update(created_at=last_week)
+
+        self.save(conversation + [('user', 'y el oso?')], chat_id=chat_id)
+        dates = list(ChatMessage.objects.filter(chat_id=chat_id).values_list('created_at', flat=True))
+        self.assertEqual(dates[:2], [last_week, last_week])
+        self.assertGreater(dates[2], last_week)
+
+        call_command('backfill_daily_activity', user=[str(self.user.id)], stdout=io.StringIO())
+        self.assertEqual(self.today(), {'messages': 1, 'questions': 1, 'new_animals': 2})
+        self.assertEqual(
+            DailyActivity.objects.get(user=self.user, day=activity.local_today(self.user.id, last_week)).messages, 2
+        )
+
+
+# ===========================
+# POPULARIDAD DE ANIMALES
+# ===========================
+
+class AnimalPopularityTest(TestCase):
+
+    def setUp(self):
+        self.addCleanup(principal.clear_local)
+        # Acumulador propio del test; se mezcla solo al llamar a merge()
+        for name, value in (('_pending', {}), ('_snapshot', ()), ('_next_merge', float('inf'))):
+            patcher = mock.patch.object(popularity, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.user = User.objects.create_user(
+            username='tendencias', email='tendencias@example.com', password='secret-pass-123'
+        )
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+
+    def detections(self):
+        popularity.merge()
+        return dict(AnimalPopularity.objects.values_list('animal_name', 'total_detections'))
+
+    def test_resaving_a_chat_only_adds_new_mentions(self):
+        conversation = [{'role': 'user', 'text': 'el tigre'}, {'role': 'assistant', 'text': 'el tigre y el oso'}]
+        chat_id = self.client.post(
+            '/api/explorer/chats/save', {'title': 'safari', 'messages': conversation}, format='json'
+        ).data['id']
+        self.assertEqual(self.detections(), {'Tigre': 2})
+
+        conversation.append({'role': 'user', 'text': 'otro tigre'})
+        self.client.post(
+            '/api/explorer/chats/save', {'chat_id': chat_id, 'title': 'safari', 'messages': conversation},
+            format='json',
+        )
+        self.assertEqual(self.detections(), {'Tigre': 3})
+
+    @override_settings(POPULARITY_HALF_LIFE_HOURS=24)
+    def test_scores_decay_with_the_half_life(self):
+        start = datetime(2026, 3, 1, tzinfo=dt_timezone.utc)
+        popularity.record_detections({'León': 4}, now=start)
+        popularity.record_detections({'Tigre': 1}, now=start + timedelta(days=1))
+        popularity.merge(now=start + timedelta(days=1))
+
+        trending = popularity.trending_animals(now=start + timedelta(days=2))
+        self.assertEqual([name for name, _, _ in trending], ['León', 'Tigre'])
+        self.assertAlmostEqual(trending[0][1], 1.0)
+        self.assertAlmostEqual(trending[1][1], 0.5)
+
+    def test_trending_endpoint(self):
+        popularity.record_detections({'León': 2, 'Tigre': 1})
+        popularity.merge()
+        response = self.client.get('/api/explorer/animals/trending', {'limit': 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([animal['name'] for animal in response.json()['animals']], ['León'])
+        self.assertEqual(self.client.get('/api/explorer/animals/trending', {'limit': 'x'}).status_code, 400)
+
+
+# ===========================
+# PRINCIPAL AUTENTICADO EN CACHÉ
+# ===========================
+
+@override_settings(PRINCIPAL_SHARED_CACHE=True)  # en los tests el LocMemCache es el de todos
+class CachedPrincipalTest(TestCase):
+
+    def setUp(self):
+        self.addCleanup(principal.clear_local)
+        self.addCleanup(cache.clear)
+        self.user = User.objects.create_user(
+            username='principal', email='principal@example.com', password='secret-pass-123'
+        )
+        UserProgress.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+
+    def test_me_without_queries(self):
+        self.client.get('/api/auth/me')
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/auth/me')
+        self.assertEqual(response.data['user']['username'], 'principal')
+
+    def test_writes_bump_the_snapshot(self):
+        self.client.get('/api/auth/me')
+        self.client.put('/api/user/settings', {'theme': 'selva'}, format='json')
+        adjust_progress(self.user.id, total_chats=2)
+
+        response = self.client.get('/api/auth/me')
+        self.assertEqual(response.data['user']['settings']['theme'], 'selva')
+        self.assertEqual(response.data['user']['progress']['total_chats'], 2)
+
+        soft_delete_user(self.user)
+        self.assertEqual(self.client.get('/api/auth/me').status_code, 401)
+
+    @override_settings(PRINCIPAL_SHARED_CACHE=False)
+    def test_without_shared_cache_every_request_reads_the_database(self):
+        UserSettings.objects.create(user=self.user)
+        self.client.get('/api/auth/me')
+        # UPDATE directo: ningún sello cambia, como si lo hiciera otro worker con su propio cache
+        UserSettings.objects.filter(user=self.user).update(theme='selva')
+        response = self.client.get('/api/auth/me')
+        self.assertEqual(response.data['user']['settings']['theme'], 'selva')
+
+        User.objects.filter(pk=self.user.pk).update(is_active=False, deleted_at=timezone.now())
+        self.assertEqual(self.client.get('/api/auth/me').status_code, 401)
+
+
+# ===========================
+# REVOCACIÓN DE REFRESH TOKENS
+# ===========================
+
+class TokenRevocationTest(TestCase):
+
+    def setUp(self):
+        revocation.reset()
+        self.addCleanup(revocation.reset)
+        self.user = User.objects.create_user(
+            username='tokens', email='tokens@example.com', password='secret-pass-123'
+        )
+        self.client = APIClient()
+
+    def refresh(self, token):
+        return self.client.post('/api/auth/token/refresh', {'refresh': str(token)}, format='json')
+
+    def test_refresh_skips_blacklist_table(self):
+        token = revocation.RefreshToken.for_user(self.user)
+        self.refresh(token)  # construye el filtro
+        with self.assertNumQueries(0):
+            response = self.refresh(token)
+        self.assertEqual(response.status_code, 200)
+
+    def test_revoked_token_is_rejected(self):
+        token = revocation.RefreshToken.for_user(self.user)
+        self.assertEqual(self.refresh(token).status_code, 200)
+        revocation.RefreshToken(str(token)).blacklist()
+        self.assertEqual(self.refresh(token).status_code, 401)
+
+        # Otro worker (filtro recién construido) también lo rechaza
+        revocation.reset()
+        self.assertEqual(self.refresh(token).status_code, 401)
+
+    def test_prune_expired_tokens(self):
+        live = revocation.RefreshToken.for_user(self.user)
+        expired = revocation.RefreshToken.for_user(self.user)
+        revocation.RefreshToken(str(expired)).blacklist()
+        OutstandingToken.objects.filter(jti=expired['jti']).update(expires_at=timezone.now() - timedelta(days=1))
+
+        deleted = revocation.prune_expired_tokens(batch_size=1)
+        self.assertEqual(sum(deleted.values()), 2)
+        self.assertEqual(list(OutstandingToken.objects.values_list('jti', flat=True)), [live['jti']])
+        self.assertFalse(BlacklistedToken.objects.exists())
+
+
+# ===========================
+# SESIONES DE INVITADO FIRMADAS
+# ===========================
+
+class SignedGuestSessionTest(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def verify(self, token):
+        return self.client.get('/api/auth/guest/verify', {'token': token})
+
+    def test_create_and_verify_without_queries(self):
+        with self.assertNumQueries(0):
+            created = self.client.post('/api/auth/guest', {'nickname': 'Zorrito'}, format='json')
+            response = self.verify(created.data['guest_token'])
+        self.assertEqual(created.status_code, 201)
+        self.assertEqual((response.status_code, response.data['nickname']), (200, 'Zorrito'))
+        self.assertFalse(GuestSession.objects.exists())
+
+    def test_rejects_tampered_and_expired_tokens(self):
+        token = guest_sessions.create_guest_session('Zorrito').session_token
+        self.assertEqual(self.verify(token[:-2] + 'xx').status_code, 404)
+
+        expired = guest_sessions.create_guest_session('Zorrito', now=timezone.now() - timedelta(days=2))
+        self.assertEqual(self.verify(expired.session_token).status_code, 401)
+
+    def test_activity_is_written_in_batches(self):
+        guest = guest_sessions.create_guest_session('Zorrito')
+        with self.settings(GUEST_ACTIVITY_TRACKING=True, GUEST_ACTIVITY_FLUSH_SECONDS=3600):
+            guest_sessions.flush_guest_activity()
+            with self.assertNumQueries(0):
+                for _ in range(3):
+                    self.verify(guest.session_token)
+            self.assertEqual(guest_sessions.flush_guest_activity(), 1)
+
+        session = GuestSession.objects.get()
+        self.assertEqual(session.user_nickname, 'Zorrito')
+        self.assertTrue(session.session_token.startswith(guest_sessions.SIGNED_PREFIX))
+
+
+# ===========================
+# LIMPIEZA DE DATOS DE INVITADOS
+# ===========================
+
+class GuestReaperTest(TestCase):
+
+    def test_reaps_expired_guest_data_in_batches(self):
+        now = timezone.now()
+        old = now - timedelta(days=5)
+        stale = User.objects.create_user(username='invitado-viejo', created_at=old)
+        fresh = User.objects.create_user(username='invitado-nuevo')
+        registered = User.objects.create_user(
+            username='registrado', email='registrado@example.com', password='secret-pass-123', created_at=old
+        )
+        for user in (stale, fresh, registered):
+            UserProgress.objects.create(user=user)
+            chat = Chat.objects.create(user=user)
+            ChatMessage.objects.bulk_create(ChatMessage(chat=chat, role='user', text='hola') for _ in range(3))
+        for hours in (-3, -2, -1, 1):
+            GuestSession.objects.create(
+                session_token=f'token{hours}', user_nickname='Zorrito', expires_at=now + timedelta(hours=hours)
+            )
+
+        deleted = reap_guest_data(batch_size=2, now=now)
+        self.assertEqual(deleted[GuestSession._meta.db_table], 3)
+        self.assertEqual(deleted[ChatMessage._meta.db_table], 3)
+        self.assertEqual(deleted[User._meta.db_table], 1)
+        self.assertEqual(set(User.objects.values_list('username', flat=True)), {'invitado-nuevo', 'registrado'})
+        self.assertEqual(ChatMessage.objects.count(), 6)
+        self.assertEqual(list(GuestSession.objects.values_list('session_token', flat=True)), ['token1'])
+        self.assertEqual(sum(reap_guest_data(batch_size=2, now=now).values()), 0)
@@ -38,6 +38,7 @@ urlpatterns = [
     # ===========================
     path('explorer/', views.explorer, name='explorer'),
     path('images/generate', views.generate_image, name='generate_image'),
+    path('images/blob/<str:sha256>', views.image_blob, name='image_blob'),
     path('tts/synthesize', views.text_to_speech, name='text_to_speech'),
     
 
@@ -46,14 +47,23 @@ urlpatterns = [
     # ===========================
     path('explorer/chats', chat_views.list_chats, name='list_chats'),
     path('explorer/chats/save', chat_views.create_or_update_chat, name='create_or_update_chat'),
+    path('explorer/chats/import', chat_views.import_chats, name='import_chats'),
     path('explorer/chats/<uuid:chat_id>', chat_views.get_chat, name='get_chat'),
     path('explorer/chats/<uuid:chat_id>/delete', chat_views.delete_chat, name='delete_chat'),
+    path('explorer/search', chat_views.search_chats, name='search_chats'),
+    path('explorer/export', chat_views.export_chats, name='export_chats'),
     path('explorer/animals', chat_views.get_animals_explored, name='get_animals_explored'),
+    path('explorer/animals/trending', views.trending, name='trending_animals'),
+    path('explorer/animals/<str:animal_name>/chats', chat_views.get_animal_chats, name='get_animal_chats'),
     
     # ===========================
     # USER SETTINGS & STATS
     # ===========================
     path('user/settings', chat_views.user_settings, name='user_settings'),
     path('user/profile', chat_views.update_user_profile, name='update_user_profile'),
+    path('user/account', chat_views.delete_account, name='delete_account'),
     path('user/stats', chat_views.get_user_stats, name='get_user_stats'),
+    path('user/activity', chat_views.get_user_activity, name='get_user_activity'),
+    path('dashboard', chat_views.get_dashboard, name='get_dashboard'),
+    path('leaderboards/<str:board>', chat_views.get_leaderboard, name='get_leaderboard'),
 ]
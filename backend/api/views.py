@@ -4,11 +4,20 @@ import base64
 import logging
 import re
 import requests
-from django.http import JsonResponse, HttpResponseBadRequest
+from django.http import JsonResponse, HttpResponse, HttpResponseBadRequest
+from django.utils.cache import get_conditional_response, patch_cache_control
 from django.views.decorators.http import require_GET, require_POST
 from django.views.decorators.csrf import csrf_exempt
 from io import BytesIO
 from PIL import Image
+from .idempotency import idempotent
+from .catalog import count_animals, translate_animal
+from .authentication import get_token_user_id
+from .counters import adjust_progress
+from .streaks import record_activity
+from .achievements import evaluate_achievements
+from .activity import record_daily_activity, tts_seconds
+from .popularity import record_detections, trending_animals
 
 # Importar Vertex AI para generación de imágenes
 try:
@@ -142,6 +151,11 @@ def explorer(request):
 	if not q:
 		return JsonResponse({"answer": "¡Hola! Pregúntame sobre cualquier animal 🦁"})
 	
+	# Racha diaria: solo la primera pregunta del día escribe en la base
+	user_id = get_token_user_id(request, include_guests=False)
+	if user_id and record_activity(user_id):
+		evaluate_achievements([user_id])
+	
 	# Si no hay API key, devolvemos una respuesta breve para pruebas locales
 	if not _get_key():
 		return JsonResponse({"answer": f"Información breve sobre {q}: es un animal fascinante que vive en hábitats variados."})
@@ -193,6 +207,7 @@ def explorer(request):
 		return JsonResponse({"answer": f"Información breve sobre {q}: es un animal fascinante que vive en hábitats variados."})
 
 
+@idempotent
 @csrf_exempt
 @require_POST
 def generate_image(request):
@@ -218,73 +233,18 @@ def generate_image(request):
 	logger.info("="*80)
 	
 	# Extraer el nombre del animal del prompt
-	# El prompt ahora incluye tanto la pregunta del usuario como la respuesta de Jaggy con contexto
-	prompt_lower = prompt.lower()
-	
-	# Estrategia 1: Buscar el animal directamente con patrones específicos
+	# El prompt incluye la pregunta del usuario y la respuesta de Jaggy con contexto:
+	# el animal del léxico más mencionado es el de la conversación
 	animal_name = None
-	
-	# Patrones ordenados por especificidad (más específicos primero)
-	animal_patterns = [
-		# Patrón 1: "un/una [animal]" - el más directo
-		r'\b(?:un|una)\s+([a-záéíóúñü]+s?)\b',
-		# Patrón 2: "el/la/los/las [animal]"
-		r'\b(?:el|la|los|las)\s+([a-záéíóúñü]+s?)\b',
-		# Patrón 3: "de [animal]" o "sobre [animal]"
-		r'\b(?:de|del|sobre)\s+(?:un|una|el|la|los|las)?\s*([a-záéíóúñü]+s?)\b',
-		# Patrón 4: "muestras/muéstrame [animal]"
-		r'\b(?:muestras?|muéstrame|genera|pinta|dibuja)\s+(?:un|una|el|la|los|las)?\s*([a-záéíóúñü]+s?)\b',
-	]
-	
-	for pattern in animal_patterns:
-		matches = re.findall(pattern, prompt_lower)
-		if matches:
-			# Filtrar palabras comunes que NO son animales
-			stop_words = {'imagen', 'foto', 'dibujo', 'claro', 'aquí', 'para', 'desde', 
-			              'esta', 'este', 'belleza', 'pradera', 'vista', 'libertad', 'viento'}
-			
-			for candidate in matches:
-				candidate = candidate.strip()
-				if len(candidate) >= 4 and candidate not in stop_words:
-					animal_name = candidate
-					logger.info(f"✅ Animal encontrado con patrón '{pattern}': '{animal_name}'")
-					break
-		
-		if animal_name:
-			break
-	
-	# Estrategia 2: Análisis de frecuencia (palabras que se repiten = animal de conversación)
-	if not animal_name or len(animal_name) < 4:
-		words = re.findall(r'\b([a-záéíóúñü]{4,}s?)\b', prompt_lower)
-		word_count = {}
-		
-		# Lista ampliada de palabras a ignorar
-		stop_words = {
-			'imagen', 'foto', 'dibujo', 'animal', 'claro', 'aquí', 'tiene', 'hermoso', 
-			'belleza', 'quieres', 'saber', 'sobre', 'esta', 'este', 'encantan', 
-			'elegantes', 'fuertes', 'sabías', 'pueden', 'desde', 'hasta', 'raza', 
-			'razas', 'favorita', 'animales', 'majestuosos', 'super', 'inteligentes',
-			'práctica', 'practico', 'gustaría', 'gustaria', 'compartir', 'estoy',
-			'para', 'fascina', 'emocionado', 'admirar', 'admires', 'supuesto'
-		}
-		
-		for word in words:
-			if word not in stop_words and len(word) >= 4:
-				word_count[word] = word_count.get(word, 0) + 1
-		
-		# Priorizar palabras que aparecen 2+ veces
-		if word_count:
-			frequent = {k: v for k, v in word_count.items() if v >= 2}
-			if frequent:
-				animal_name = max(frequent, key=frequent.get)
-				logger.info(f"🔄 Animal por frecuencia alta: '{animal_name}' ({word_count[animal_name]}x)")
-			else:
-				animal_name = max(word_count, key=word_count.get)
-				logger.info(f"🔄 Animal por frecuencia: '{animal_name}' ({word_count[animal_name]}x)")
-	
-	# Estrategia 3: Si no encontró, limpiar el prompt del usuario
-	if not animal_name or len(animal_name) < 3:
-		cleaned_prompt = prompt_lower
+	animal_counts = count_animals(prompt)
+	if animal_counts:
+		animal_name = max(animal_counts, key=animal_counts.get)
+		logger.info(f"✅ Animal encontrado en el léxico: '{animal_name}' (menciones: {animal_counts})")
+		record_detections({animal_name: 1})
+	
+	# Animal fuera del léxico: quitar la frase de pedido y tomar la primera palabra significativa
+	if not animal_name:
+		cleaned_prompt = prompt.lower()
 		remove_patterns = [
 			r'me\s+(pasas|muestras|generas?|das)\s+(una?\s+)?(imagen|foto|dibujo|ilustraci[oó]n)\s+(de|del?)\s+',
 			r'quiero\s+(ver|una?\s+imagen\s+de)\s+',
@@ -298,24 +258,13 @@ def generate_image(request):
 		for pattern in remove_patterns:
 			cleaned_prompt = re.sub(pattern, '', cleaned_prompt, flags=re.IGNORECASE)
 		
-		# Tomar la primera palabra significativa
-		words = [w for w in cleaned_prompt.split() if len(w) >= 4]
+		words = re.findall(r'[a-záéíóúñü]{4,}', cleaned_prompt)
 		if words:
 			animal_name = words[0]
-	
-	# Fallback final: buscar primera palabra significativa
-	if not animal_name or len(animal_name) < 4:
-		# Buscar sustantivos que parezcan animales (evitando verbos y artículos)
-		candidates = re.findall(r'\b([a-záéíóúñü]{5,}s?)\b', prompt_lower)
-		stop_words_final = {'imagen', 'muestras', 'claro', 'aquí', 'tienes', 'desde', 'pradera'}
-		for candidate in candidates:
-			if candidate not in stop_words_final:
-				animal_name = candidate
-				logger.warning(f"⚠️ Animal por fallback: '{animal_name}'")
-				break
+			logger.warning(f"⚠️ Animal fuera del léxico: '{animal_name}'")
 	
 	# Última opción: usar prompt completo truncado
-	if not animal_name or len(animal_name) < 4:
+	if not animal_name:
 		animal_name = prompt[:50]
 		logger.error(f"❌ No se pudo extraer animal, usando prompt: '{animal_name}'")
 	
@@ -350,42 +299,8 @@ def generate_image(request):
 		# Inicializar Vertex AI
 		vertexai.init(project=project_id, location=location)
 		
-		# Diccionario de traducción español -> inglés para animales comunes
-		animal_translations = {
-			'oso': 'bear', 'osos': 'bear',
-			'tigre': 'tiger', 'tigres': 'tiger',
-			'león': 'lion', 'leones': 'lion', 'leon': 'lion',
-			'elefante': 'elephant', 'elefantes': 'elephant',
-			'jirafa': 'giraffe', 'jirafas': 'giraffe',
-			'cebra': 'zebra', 'cebras': 'zebra',
-			'perro': 'dog', 'perros': 'dog',
-			'gato': 'cat', 'gatos': 'cat',
-			'lobo': 'wolf', 'lobos': 'wolf',
-			'zorro': 'fox', 'zorros': 'fox',
-			'conejo': 'rabbit', 'conejos': 'rabbit',
-			'caballo': 'horse', 'caballos': 'horse',
-			'panda': 'panda', 'pandas': 'panda',
-			'koala': 'koala', 'koalas': 'koala',
-			'mono': 'monkey', 'monos': 'monkey',
-			'ballena': 'whale', 'ballenas': 'whale',
-			'delfín': 'dolphin', 'delfines': 'dolphin', 'delfin': 'dolphin',
-			'tiburón': 'shark', 'tiburones': 'shark', 'tiburon': 'shark',
-			'águila': 'eagle', 'águilas': 'eagle', 'aguila': 'eagle', 'aguilas': 'eagle',
-			'búho': 'owl', 'búhos': 'owl', 'buho': 'owl', 'buhos': 'owl',
-			'loro': 'parrot', 'loros': 'parrot',
-			'serpiente': 'snake', 'serpientes': 'snake',
-			'cocodrilo': 'crocodile', 'cocodrilos': 'crocodile',
-			'tortuga': 'turtle', 'tortugas': 'turtle',
-			'pingüino': 'penguin', 'pingüinos': 'penguin', 'pinguino': 'penguin', 'pinguinos': 'penguin',
-			'flamenco': 'flamingo', 'flamencos': 'flamingo',
-			'hipopótamo': 'hippopotamus', 'hipopótamos': 'hippopotamus', 'hipopotamo': 'hippopotamus',
-			'rinoceronte': 'rhinoceros', 'rinocerontes': 'rhinoceros',
-			'canguro': 'kangaroo', 'canguros': 'kangaroo',
-			'dragón': 'dragon', 'dragones': 'dragon', 'dragon': 'dragon',
-		}
-		
-		# Traducir el animal al inglés para mejor calidad de imagen
-		clean_animal = animal_translations.get(animal_name.lower(), animal_name)
+		# Traducir el animal al inglés (catálogo) para mejor calidad de imagen
+		clean_animal = translate_animal(animal_name)
 		
 		# Prompt MUCHO más específico y detallado para Vertex AI Imagen 3
 		full_prompt = (
@@ -464,6 +379,14 @@ def generate_image(request):
 		
 		logger.info("Imagen generada exitosamente con Vertex AI")
 		
+		# Contador de imágenes del usuario registrado (el id sale del JWT, sin consultar la base)
+		user_id = get_token_user_id(request, include_guests=False)
+		if user_id:
+			adjust_progress(user_id, total_images_generated=1)
+			record_activity(user_id)
+			evaluate_achievements([user_id])
+			record_daily_activity(user_id, images=1)
+		
 		return JsonResponse({
 			"imageBase64": image_base64,
 			"mime": "image/png",
@@ -479,6 +402,78 @@ def generate_image(request):
 		}, status=500)
 
 
+@require_GET
+def trending(request):
+	"""
+	Animales en tendencia (todos los usuarios, con decaimiento exponencial).
+	GET /api/explorer/animals/trending?limit=10
+	
+	Retorna:
+	{
+		"animals": [{"name": "León", "emoji": "🦁", "score": 12.5, "detections": 340}],
+		"halfLifeHours": 24
+	}
+	"""
+	from django.conf import settings
+	from .catalog import get_index
+
+	try:
+		limit = int(request.GET.get('limit', 10))
+	except ValueError:
+		return HttpResponseBadRequest("limit debe ser un número")
+	limit = max(1, min(limit, settings.POPULARITY_SNAPSHOT_SIZE))
+
+	index = get_index()
+	animals = []
+	for name, score, detections in trending_animals(limit):
+		entry = index.get(name)
+		animals.append({
+			"name": name,
+			"emoji": entry.emoji if entry else "",
+			"score": round(score, 2),
+			"detections": detections,
+		})
+
+	response = JsonResponse({
+		"animals": animals,
+		"halfLifeHours": settings.POPULARITY_HALF_LIFE_HOURS,
+	})
+	patch_cache_control(response, public=True, max_age=int(settings.POPULARITY_MERGE_SECONDS))
+	return response
+
+
+@require_GET
+def image_blob(request, sha256):
+	"""
+	Sirve una imagen deduplicada de los chats por su hash SHA-256.
+	El contenido es inmutable: se cachea indefinidamente y el ETag es el hash.
+	Es pública (las etiquetas <img> no envían el JWT); el hash no es adivinable.
+	Solo se sirven tipos de imagen permitidos (los blobs anteriores a la
+	validación con otro tipo dan 404) y con una CSP que impide ejecutar nada.
+	"""
+	from .blobs import ALLOWED_IMAGE_TYPES, sniff_image_type
+	from .models import ImageBlob
+
+	etag = f'"{sha256}"'
+	response = get_conditional_response(request, etag=etag)
+	if response is None:
+		blob = ImageBlob.objects.filter(pk=sha256).values_list('mime_type', 'data').first()
+		if blob is None:
+			return JsonResponse({"error": "Imagen no encontrada"}, status=404)
+		mime_type, data = blob
+		if mime_type not in ALLOWED_IMAGE_TYPES or sniff_image_type(data) != mime_type:
+			return JsonResponse({"error": "Imagen no encontrada"}, status=404)
+		response = HttpResponse(bytes(data), content_type=mime_type)
+		extension = mime_type.split('/')[1]
+		response.headers['Content-Disposition'] = f'inline; filename="{sha256[:16]}.{extension}"'
+	response.headers['ETag'] = etag
+	response.headers['Content-Security-Policy'] = "default-src 'none'; sandbox"
+	response.headers['X-Content-Type-Options'] = 'nosniff'
+	patch_cache_control(response, public=True, max_age=60 * 60 * 24 * 365, immutable=True)
+	return response
+
+
+@idempotent
 @csrf_exempt
 @require_POST
 def text_to_speech(request):
@@ -560,6 +555,11 @@ def text_to_speech(request):
 		
 		logger.info("✅ Audio generado exitosamente con Google Cloud Text-to-Speech")
 		
+		# Segundos de voz del día (gráficas del dashboard)
+		user_id = get_token_user_id(request, include_guests=False)
+		if user_id:
+			record_daily_activity(user_id, tts_seconds=tts_seconds(response.audio_content))
+		
 		return JsonResponse({
 			"audioContent": audio_base64,
 			"mime": "audio/mp3",
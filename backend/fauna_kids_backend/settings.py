@@ -13,6 +13,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 from pathlib import Path
 import os
 from dotenv import load_dotenv
+from django.core.exceptions import ImproperlyConfigured
 
 # Load environment variables from .env file
 load_dotenv()
@@ -61,6 +62,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.conditional.ConditionalGetStatsMiddleware',
 ]
 
 ROOT_URLCONF = 'fauna_kids_backend.urls'
@@ -169,6 +171,7 @@ CORS_ALLOW_HEADERS = [
     'authorization',
     'content-type',
     'dnt',
+    'idempotency-key',
     'origin',
     'user-agent',
     'x-csrftoken',
@@ -183,7 +186,7 @@ CSRF_TRUSTED_ORIGINS = [
 # === REST FRAMEWORK CONFIGURATION ===
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.CachedJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
@@ -194,6 +197,133 @@ REST_FRAMEWORK = {
     'DATETIME_FORMAT': '%Y-%m-%dT%H:%M:%S%z',
 }
 
+# === PAGINACIÓN DE CHATS (keyset) ===
+# Tamaños por defecto para /api/explorer/chats y el historial de mensajes
+CHAT_PAGE_SIZE = int(os.environ.get('CHAT_PAGE_SIZE', '20'))
+CHAT_MESSAGES_PAGE_SIZE = int(os.environ.get('CHAT_MESSAGES_PAGE_SIZE', '50'))
+CHAT_MAX_PAGE_SIZE = int(os.environ.get('CHAT_MAX_PAGE_SIZE', '100'))
+# Filas por lote al exportar el archivo de chats (cursor del lado del servidor)
+EXPORT_CHUNK_SIZE = int(os.environ.get('EXPORT_CHUNK_SIZE', '500'))
+
+# === GUARDADO DE CHATS EN STREAMING ===
+# Límites del cuerpo de POST /api/explorer/chats/save (413 si se superan) y
+# bytes del spool de mensajes que se mantienen en memoria antes de pasar a disco
+CHAT_SAVE_MAX_BYTES = int(os.environ.get('CHAT_SAVE_MAX_BYTES', str(50 * 1024 * 1024)))
+CHAT_MESSAGE_MAX_BYTES = int(os.environ.get('CHAT_MESSAGE_MAX_BYTES', str(10 * 1024 * 1024)))
+CHAT_SAVE_SPOOL_BYTES = int(os.environ.get('CHAT_SAVE_SPOOL_BYTES', str(1024 * 1024)))
+
+# === IMPORTACIÓN DE CHATS DE INVITADO ===
+# Máximo de chats por request y chats por transacción en /api/explorer/chats/import
+CHAT_IMPORT_MAX_CHATS = int(os.environ.get('CHAT_IMPORT_MAX_CHATS', '200'))
+CHAT_IMPORT_BATCH_SIZE = int(os.environ.get('CHAT_IMPORT_BATCH_SIZE', '50'))
+
+# === IDEMPOTENCY-KEY ===
+# Tiempo que se guarda la respuesta y tiempo tras el cual una ejecución sin
+# terminar se considera abandonada (segundos); tamaño máximo del cuerpo que se
+# hashea y bytes del spool que se mantienen en memoria antes de pasar a disco
+IDEMPOTENCY_TTL = int(os.environ.get('IDEMPOTENCY_TTL', str(60 * 60 * 24)))
+IDEMPOTENCY_LOCK_TIMEOUT = int(os.environ.get('IDEMPOTENCY_LOCK_TIMEOUT', '120'))
+IDEMPOTENCY_MAX_BODY_BYTES = int(os.environ.get('IDEMPOTENCY_MAX_BODY_BYTES', str(CHAT_SAVE_MAX_BYTES)))
+IDEMPOTENCY_SPOOL_BYTES = int(os.environ.get('IDEMPOTENCY_SPOOL_BYTES', str(1024 * 1024)))
+
+# === CATÁLOGO DE ANIMALES ===
+# Cada cuántos segundos un worker verifica si el catálogo cambió (y lo recarga)
+ANIMAL_CATALOG_CHECK_SECONDS = float(os.environ.get('ANIMAL_CATALOG_CHECK_SECONDS', '30'))
+
+# === CATÁLOGO DE LOGROS ===
+# Cada cuántos segundos un worker verifica si el catálogo de logros cambió
+ACHIEVEMENT_CATALOG_CHECK_SECONDS = float(os.environ.get('ACHIEVEMENT_CATALOG_CHECK_SECONDS', '30'))
+
+# === POPULARIDAD DE ANIMALES (tendencias) ===
+# Vida media del puntaje, cada cuántos segundos un worker mezcla sus detecciones
+# con la tabla y cuántos animales guarda en su snapshot del top
+POPULARITY_HALF_LIFE_HOURS = float(os.environ.get('POPULARITY_HALF_LIFE_HOURS', '24'))
+POPULARITY_MERGE_SECONDS = float(os.environ.get('POPULARITY_MERGE_SECONDS', '60'))
+POPULARITY_SNAPSHOT_SIZE = int(os.environ.get('POPULARITY_SNAPSHOT_SIZE', '50'))
+
+# === ACTIVIDAD DIARIA (gráficas) ===
+# Días por defecto y rango máximo de /api/user/activity
+ACTIVITY_DEFAULT_DAYS = int(os.environ.get('ACTIVITY_DEFAULT_DAYS', '30'))
+ACTIVITY_MAX_RANGE_DAYS = int(os.environ.get('ACTIVITY_MAX_RANGE_DAYS', '366'))
+
+# === TABLAS DE POSICIONES ===
+# Tamaño por defecto y máximo del top en /api/leaderboards/<tabla>
+LEADERBOARD_TOP_SIZE = int(os.environ.get('LEADERBOARD_TOP_SIZE', '10'))
+LEADERBOARD_MAX_SIZE = int(os.environ.get('LEADERBOARD_MAX_SIZE', '100'))
+
+# === CACHE ===
+# Cache de Django compartido entre workers (sellos del principal, revocaciones
+# de tokens). Sin REDIS_URL cada worker usa su propio LocMemCache
+REDIS_URL = os.environ.get('REDIS_URL', '')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# === PRINCIPAL AUTENTICADO EN CACHÉ ===
+# Usuarios por worker en el LRU y segundos que vive cada snapshot.
+# PRINCIPAL_SHARED_CACHE activa el principal en caché y exige un cache
+# compartido (por defecto, si hay REDIS_URL): sin él cada request carga el
+# usuario de la base, porque los sellos de un cache por proceso no invalidan
+# a los otros workers (settings viejos, cuentas dadas de baja que siguen entrando)
+PRINCIPAL_CACHE_SIZE = int(os.environ.get('PRINCIPAL_CACHE_SIZE', '2000'))
+PRINCIPAL_CACHE_TTL = int(os.environ.get('PRINCIPAL_CACHE_TTL', '60'))
+PRINCIPAL_SHARED_CACHE = os.environ.get('PRINCIPAL_SHARED_CACHE', str(bool(REDIS_URL))) == 'True'
+if PRINCIPAL_SHARED_CACHE and CACHES['default']['BACKEND'].endswith(('LocMemCache', 'DummyCache')):
+    raise ImproperlyConfigured(
+        'PRINCIPAL_SHARED_CACHE=True necesita un cache compartido entre workers (REDIS_URL)'
+    )
+
+# === DASHBOARD ===
+# Animales y chats recientes por defecto y máximo en /api/dashboard
+DASHBOARD_RECENT_SIZE = int(os.environ.get('DASHBOARD_RECENT_SIZE', '5'))
+DASHBOARD_MAX_RECENT_SIZE = int(os.environ.get('DASHBOARD_MAX_RECENT_SIZE', '20'))
+
+# === PURGADO EN SEGUNDO PLANO (soft-delete) ===
+# Filas por sentencia DELETE acotada en `purge_deleted`
+PURGE_BATCH_SIZE = int(os.environ.get('PURGE_BATCH_SIZE', '500'))
+# Blobs de imagen sin mensajes se borran tras estas horas (margen para guardados en curso)
+BLOB_ORPHAN_GRACE_HOURS = float(os.environ.get('BLOB_ORPHAN_GRACE_HOURS', '24'))
+
+# === LIMPIEZA DE DATOS DE INVITADOS ===
+# Cuentas de invitado sin actividad en estas horas se purgan con sus dependientes
+# (`reap_guest_data`); pausa en segundos entre lotes DELETE para no acaparar la base
+GUEST_USER_RETENTION_HOURS = int(os.environ.get('GUEST_USER_RETENTION_HOURS', '48'))
+GUEST_REAP_PAUSE_SECONDS = float(os.environ.get('GUEST_REAP_PAUSE_SECONDS', '0.1'))
+
+# === SESIONES DE INVITADO ===
+# 'signed': token firmado autocontenido, sin fila por invitado; 'database': una
+# fila en guest_sessions por sesión (modo anterior). Duración de la sesión en horas
+GUEST_SESSION_MODE = os.environ.get('GUEST_SESSION_MODE', 'signed')
+GUEST_SESSION_HOURS = int(os.environ.get('GUEST_SESSION_HOURS', '24'))
+# Registro opcional de actividad de invitados: se acumula en memoria y se escribe
+# en guest_sessions cada GUEST_ACTIVITY_FLUSH_SECONDS, en lotes de GUEST_ACTIVITY_BATCH_SIZE
+GUEST_ACTIVITY_TRACKING = os.environ.get('GUEST_ACTIVITY_TRACKING', 'False') == 'True'
+GUEST_ACTIVITY_FLUSH_SECONDS = float(os.environ.get('GUEST_ACTIVITY_FLUSH_SECONDS', '60'))
+GUEST_ACTIVITY_BATCH_SIZE = int(os.environ.get('GUEST_ACTIVITY_BATCH_SIZE', '500'))
+
+# === REVOCACIÓN DE REFRESH TOKENS ===
+# Filtro de Bloom por worker con los jti revocados: cada cuántos segundos se
+# pone al día con la lista negra, cada cuántos se reconstruye sin los vencidos,
+# capacidad mínima y tasa de falsos positivos (esos sí consultan la base)
+JWT_REVOCATION_SYNC_SECONDS = float(os.environ.get('JWT_REVOCATION_SYNC_SECONDS', '5'))
+JWT_REVOCATION_REBUILD_SECONDS = float(os.environ.get('JWT_REVOCATION_REBUILD_SECONDS', '3600'))
+JWT_REVOCATION_MIN_CAPACITY = int(os.environ.get('JWT_REVOCATION_MIN_CAPACITY', '100000'))
+JWT_REVOCATION_ERROR_RATE = float(os.environ.get('JWT_REVOCATION_ERROR_RATE', '0.01'))
+
+# === GET CONDICIONAL (ETag) ===
+# Ventana (segundos) para medir bytes/tiempo ahorrados por respuestas 304
+CONDITIONAL_STATS_TTL = int(os.environ.get('CONDITIONAL_STATS_TTL', str(60 * 60 * 24)))
+
 # === JWT CONFIGURATION ===
 from datetime import timedelta
 
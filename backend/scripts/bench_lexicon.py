@@ -0,0 +1,79 @@
+"""
+Micro-benchmark de la detección de animales por mensaje
+
+Compara el escaneo anterior (lista de ~100 nombres reconstruida en cada
+llamada + `animal in texto` por cada uno) con el léxico compilado del
+catálogo (api/lexicon.py + api/catalog.py), para mensajes de distintos largos.
+
+Ejecutar con: python scripts/bench_lexicon.py
+"""
+import random
+import sys
+import timeit
+from pathlib import Path
+
+# Agregar el directorio backend al path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from api.catalog import AnimalIndex, load_fixture_animals  # noqa: E402
+
+# El mismo índice que usa el backend, construido desde la fixture (sin base de datos)
+INDEX = AnimalIndex(load_fixture_animals(), 'fixture')
+ANIMAL_NAMES = [name.lower() for name in INDEX.animals]
+find_animals = INDEX.lexicon.find
+detect_animal = INDEX.lexicon.most_mentioned
+
+FILLER = (
+    'los animales son increíbles y viven en la selva el bosque o el océano '
+    'sabías que pueden recorrer muchos kilómetros cada día buscando comida '
+).split()
+
+
+def legacy_detect(text):
+    """Implementación anterior de detect_animal_in_text (primer nombre de la lista)"""
+    animales = list(ANIMAL_NAMES)
+    text_lower = text.lower()
+    for animal in animales:
+        if animal in text_lower:
+            return animal.capitalize()
+    return None
+
+
+def make_message(length, rng, density):
+    words = []
+    size = 0
+    while size < length:
+        word = rng.choice(ANIMAL_NAMES) if rng.random() < density else rng.choice(FILLER)
+        words.append(word)
+        size += len(word) + 1
+    return ' '.join(words)[:length]
+
+
+def bench(func, text, number):
+    seconds = min(timeit.repeat(lambda: func(text), number=number, repeat=5))
+    return seconds / number * 1e6
+
+
+print("=" * 78)
+print("🐾 BENCHMARK: detección de animales por mensaje (µs por llamada)")
+print("=" * 78)
+print(f"{'largo':>8} | {'caso':<13} | {'anterior':>10} | {'léxico':>10} | {'léxico (todas)':>14} | menciones")
+print("-" * 78)
+
+rng = random.Random(42)
+for length in (80, 500, 2_000, 10_000, 50_000):
+    number = max(5, 20_000 // length)
+    # "con animales": ~2% de las palabras son animales; "sin animales": peor caso del escaneo anterior
+    for case, density in (('con animales', 0.02), ('sin animales', 0.0)):
+        text = make_message(length, rng, density)
+        legacy = bench(legacy_detect, text, number)
+        lexicon = bench(detect_animal, text, number)
+        all_matches = bench(find_animals, text, number)
+        matches = len(find_animals(text))
+        print(f"{length:>8} | {case:<13} | {legacy:>10.1f} | {lexicon:>10.1f} | {all_matches:>14.1f} | {matches}")
+
+print("-" * 78)
+print("El escaneo anterior es O(largo × animales), se corta en el primer nombre de la")
+print("lista que aparezca (aunque sea parte de otra palabra) y retorna solo ese.")
+print("El léxico recorre el texto una vez y retorna todas las menciones con su posición.")
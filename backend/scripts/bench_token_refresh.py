@@ -0,0 +1,136 @@
+"""
+Benchmark de refresh de tokens JWT con una lista negra grande
+
+Llena una base SQLite temporal (nunca la configurada) con N tokens
+pendientes (outstandingtoken) y una fracción en lista negra, y mide cuántos
+refresh tokens por segundo se verifican con:
+
+- simplejwt: consulta a la lista negra (JOIN por jti) en cada verificación
+- filtro:    api.revocation.RefreshToken (filtro de Bloom por worker)
+
+Después mide la poda de los vencidos (prune_expired_tokens) en filas/s.
+
+Ejecutar con: python scripts/bench_token_refresh.py --outstanding 10000000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import timedelta
+from pathlib import Path
+
+# Agregar el directorio backend al path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'fauna_kids_backend.settings')
+
+parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+parser.add_argument('--outstanding', type=int, default=10_000_000, help='Tokens pendientes (default: 10M)')
+parser.add_argument('--blacklisted', type=float, default=0.01, help='Fracción en lista negra (default: 0.01)')
+parser.add_argument('--expired', type=float, default=0.5, help='Fracción ya vencida (default: 0.5)')
+parser.add_argument('--refreshes', type=int, default=5_000, help='Refresh a medir (default: 5000)')
+args = parser.parse_args()
+
+import django  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+db_path = Path(tempfile.mkdtemp()) / 'bench_tokens.sqlite3'
+settings.DATABASES['default'] = {'ENGINE': 'django.db.backends.sqlite3', 'NAME': str(db_path)}
+django.setup()
+
+from django.core.management import call_command  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.utils import timezone  # noqa: E402
+from rest_framework_simplejwt.exceptions import TokenError  # noqa: E402
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken  # noqa: E402
+from rest_framework_simplejwt.tokens import RefreshToken as SimpleJWTRefreshToken  # noqa: E402
+
+from api import revocation  # noqa: E402
+from api.models import User  # noqa: E402
+
+print("=" * 78)
+print(f"🔑 BENCHMARK: refresh de tokens con {args.outstanding:,} pendientes ({db_path})")
+print("=" * 78)
+
+call_command('migrate', verbosity=0)
+user = User.objects.create_user(username='bench', email='bench@example.com', password='secret-pass-123')
+
+# ===========================
+# DATOS
+# ===========================
+
+outstanding = OutstandingToken._meta.db_table
+blacklisted = BlacklistedToken._meta.db_table
+now = timezone.now()
+adapt = connection.ops.adapt_datetimefield_value
+expired_rows = int(args.outstanding * args.expired)
+blacklist_every = max(1, round(1 / args.blacklisted)) if args.blacklisted else 0
+
+started = time.perf_counter()
+with connection.cursor() as cursor:
+    # Los vencidos son los más viejos (ids bajos), como en producción
+    cursor.execute(
+        f"""
+        WITH RECURSIVE seq(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < %s)
+        INSERT INTO {outstanding} (jti, token, created_at, expires_at, user_id)
+        SELECT 'bench-' || n, '', %s, CASE WHEN n <= %s THEN %s ELSE %s END, NULL FROM seq
+        """,
+        [args.outstanding, adapt(now), expired_rows, adapt(now - timedelta(days=1)), adapt(now + timedelta(days=7))]
+    )
+    if blacklist_every:
+        cursor.execute(
+            f"INSERT INTO {blacklisted} (token_id, blacklisted_at) "
+            f"SELECT id, %s FROM {outstanding} WHERE id %% %s = 0",
+            [adapt(now), blacklist_every]
+        )
+    cursor.execute(f"SELECT COUNT(*) FROM {blacklisted}")
+    blacklisted_rows = cursor.fetchone()[0]
+print(f"Datos: {args.outstanding:,} pendientes, {blacklisted_rows:,} en lista negra "
+      f"({time.perf_counter() - started:.1f}s)")
+
+# Tokens reales: 1 de cada 100 revocado
+tokens = [str(revocation.RefreshToken.for_user(user)) for _ in range(args.refreshes)]
+for token in tokens[::100]:
+    revocation.RefreshToken(token).blacklist()
+
+# ===========================
+# MEDICIÓN
+# ===========================
+
+
+def bench(token_class):
+    rejected = 0
+    started = time.perf_counter()
+    for token in tokens:
+        try:
+            token_class(token)
+        except TokenError:
+            rejected += 1
+    return len(tokens) / (time.perf_counter() - started), rejected
+
+
+revocation.reset()
+bench(revocation.RefreshToken)  # construye el filtro (fuera de la medición)
+
+print("-" * 78)
+print(f"{'verificación':<12} | {'refresh/s':>10} | {'rechazados':>10}")
+print("-" * 78)
+for name, token_class in (('simplejwt', SimpleJWTRefreshToken), ('filtro', revocation.RefreshToken)):
+    before = revocation.revocation_stats()
+    per_second, rejected = bench(token_class)
+    print(f"{name:<12} | {per_second:>10,.0f} | {rejected:>10}")
+stats = {key: value - before[key] for key, value in revocation.revocation_stats().items()}
+print(f"Filtro: {stats['filtered']:,} resueltos en memoria, {stats['checked']:,} confirmados en la base")
+
+print("-" * 78)
+started = time.perf_counter()
+deleted = revocation.prune_expired_tokens(settings.PURGE_BATCH_SIZE)
+elapsed = time.perf_counter() - started
+total = sum(deleted.values())
+print(f"Poda: {total:,} filas vencidas en {elapsed:.1f}s ({total / elapsed:,.0f} filas/s, "
+      f"lotes de {settings.PURGE_BATCH_SIZE})")
+print(f"Tras la poda: {OutstandingToken.objects.count():,} pendientes, "
+      f"{BlacklistedToken.objects.count():,} en lista negra")
+
+db_path.unlink()
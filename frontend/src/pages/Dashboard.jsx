@@ -2,8 +2,7 @@ import React, { useState, useEffect } from 'react';
 import { Link, useNavigate } from 'react-router-dom';
 import DashboardLayout from '../components/layout/DashboardLayout.jsx';
 import JaggyAvatar from '../components/JaggyAvatar';
-import { getUserStats, getUserProfile } from '../services/user.service';
-import { getAnimalsExplored, isGuestUser } from '../services';
+import { getDashboard } from '../services/user.service';
 
 const cards = [
   { id: 'explorar', to: '/explorar', title: 'Explorar', desc: 'Haz preguntas sobre animales y descubre curiosidades.', accent: 'from-emerald-500/20 to-teal-500/10', icon: '🔎' },
@@ -60,29 +59,14 @@ export default function Dashboard() {
 
   async function loadUserData() {
     try {
-      const promises = [
-        getUserProfile().catch(() => null),
-        getUserStats().catch(() => null)
-      ];
-
-      // Solo cargar animales si no es invitado
-      if (!isGuestUser()) {
-        promises.push(
-          getAnimalsExplored().catch(() => [])
-        );
-      }
-
-      const [profileData, statsData, animalsData] = await Promise.all(promises);
+      // Perfil y estadísticas en una sola llamada (solo lo que se pinta)
+      const data = await getDashboard(['user', 'stats']);
       
-      if (profileData) {
-        setProfile(prev => ({ ...prev, ...profileData }));
-      }
-      if (statsData) {
-        setStats(statsData);
+      if (data?.profile) {
+        setProfile(prev => ({ ...prev, ...data.profile }));
       }
-      // Actualizar conteo de animales con datos reales de la API
-      if (animalsData && animalsData.length > 0) {
-        setStats(prev => ({ ...prev, totalAnimals: animalsData.length }));
+      if (data?.stats) {
+        setStats(data.stats);
       }
     } catch {
       // Error silencioso
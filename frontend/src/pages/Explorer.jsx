@@ -11,6 +11,15 @@ import {
 import DashboardLayout from '../components/layout/DashboardLayout.jsx'
 import JaggyAvatar from '../components/JaggyAvatar.jsx'
 
+// Chat del backend -> elemento de la lista del historial
+function toChatListItem(chat) {
+    return {
+        id: chat.id,
+        title: chat.title,
+        timestamp: chat.updated_at || chat.created_at  // Usar updated_at o created_at del backend
+    }
+}
+
 export default function Explorer(){
     // Estado de carga inicial para evitar errores de hidratación
     const [isReady, setIsReady] = useState(false);
@@ -63,6 +72,9 @@ export default function Explorer(){
     })
 
     const [showChatList, setShowChatList] = useState(false)
+    // next_cursor de la última página de chats cargada (null = no hay más)
+    const [chatListCursor, setChatListCursor] = useState(null)
+    const [isLoadingMoreChats, setIsLoadingMoreChats] = useState(false)
     const [input, setInput] = useState('')
     const [isThinking, setIsThinking] = useState(false)
     const [isListening, setIsListening] = useState(false)
@@ -133,16 +145,11 @@ export default function Explorer(){
         async function loadChatsFromAPI() {
             if (!isGuest) {
                 try {
-                    const chats = await listChats()
+                    const { results: chats = [], next_cursor } = await listChats()
                     
                     // Transformar chats del backend al formato del frontend
-                    const transformedChats = chats.map(chat => ({
-                        id: chat.id,
-                        title: chat.title,
-                        timestamp: chat.updated_at || chat.created_at  // Usar updated_at o created_at del backend
-                    }))
-                    
-                    setChatList(transformedChats)
+                    setChatList(chats.map(toChatListItem))
+                    setChatListCursor(next_cursor || null)
                 } catch {
                     // Error silencioso
                 }
@@ -151,6 +158,24 @@ export default function Explorer(){
         loadChatsFromAPI()
     }, [isGuest])
 
+    // Cargar la siguiente página del historial (chats más antiguos)
+    async function loadMoreChats() {
+        if (!chatListCursor || isLoadingMoreChats) return
+        setIsLoadingMoreChats(true)
+        try {
+            const { results: chats = [], next_cursor } = await listChats({ cursor: chatListCursor })
+            setChatList(prev => {
+                const known = new Set(prev.map(chat => chat.id))
+                return [...prev, ...chats.filter(chat => !known.has(chat.id)).map(toChatListItem)]
+            })
+            setChatListCursor(next_cursor || null)
+        } catch {
+            // Error silencioso
+        } finally {
+            setIsLoadingMoreChats(false)
+        }
+    }
+
     // Inicializar reconocimiento de voz
     useEffect(() => {
         if (typeof window !== 'undefined') {
@@ -501,9 +526,9 @@ export default function Explorer(){
                 localStorage.setItem('fauna_chat_list', JSON.stringify(newList))
             } else {
                 // Usuarios registrados usan API
+                // Quitarlo localmente: recargar la primera página perdería las siguientes ya cargadas
                 await deleteChatAPI(chatId)
-                const updatedChats = await listChats()
-                setChatList(updatedChats)
+                setChatList(prev => prev.filter(c => c.id !== chatId))
             }
             
             // Si es el chat actual, crear uno nuevo
@@ -719,6 +744,16 @@ export default function Explorer(){
                                                 </button>
                                             </div>
                                         ))}
+                                        {chatListCursor && (
+                                            <button
+                                                onClick={loadMoreChats}
+                                                disabled={isLoadingMoreChats}
+                                                className="w-full p-2 text-xs font-medium rounded-lg transition"
+                                                style={{ color: 'var(--text-color)', opacity: 0.7 }}
+                                            >
+                                                {isLoadingMoreChats ? 'Cargando...' : 'Cargar más'}
+                                            </button>
+                                        )}
                                     </div>
                                 </div>
                             )}
@@ -988,6 +1023,16 @@ export default function Explorer(){
                                             </button>
                                         </div>
                                     ))}
+                                    {chatListCursor && (
+                                        <button
+                                            onClick={loadMoreChats}
+                                            disabled={isLoadingMoreChats}
+                                            className="w-full p-3 text-sm font-medium rounded-lg transition"
+                                            style={{ background: 'var(--bg-subtle)', color: 'var(--text-color)' }}
+                                        >
+                                            {isLoadingMoreChats ? 'Cargando...' : 'Cargar más chats'}
+                                        </button>
+                                    )}
                                 </div>
                             )}
                         </div>
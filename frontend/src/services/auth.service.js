@@ -2,6 +2,7 @@
 // Servicio de autenticación para Fauna Kids
 
 import { api } from '../utils/api';
+import { importGuestChats } from './explorerChat.service';
 
 /**
  * Registra un nuevo usuario
@@ -14,6 +15,13 @@ export const register = async (userData) => {
     localStorage.setItem('access_token', response.tokens.access);
     localStorage.setItem('refresh_token', response.tokens.refresh);
     localStorage.setItem('user', JSON.stringify(response.user));
+
+    // Llevar a la cuenta nueva los chats que tenía como invitado (una sola request)
+    try {
+      await importGuestChats();
+    } catch (error) {
+      console.error('Error importando chats de invitado:', error);
+    }
   }
   return response;
 };
@@ -1,4 +1,4 @@
-import { api } from '../utils/api'
+import { api, newIdempotencyKey } from '../utils/api'
 
 // Llamada al backend Django con fallback a mock
 // Ahora soporta historial de conversación para respuestas más naturales
@@ -57,7 +57,7 @@ export async function generateExplorerImage(prompt, { size = '768x768' } = {}){
   if(!cleanPrompt) return null
   
   try{
-    const res = await api.post('/images/generate', { prompt: p, size })
+    const res = await api.post('/images/generate', { prompt: p, size }, { idempotencyKey: newIdempotencyKey() })
     // Backend puede responder { imageBase64, mime } o { imageUrl }
     if(res?.imageBase64){
       const mime = res?.mime || 'image/png'
@@ -87,7 +87,7 @@ export async function textToSpeech(text, options = {}) {
       voiceName: options.voiceName || 'es-US-Neural2-B', // Voz masculina joven
       pitch: options.pitch !== undefined ? options.pitch : 5.0, // Agudo estilo Bob Esponja
       speakingRate: options.speakingRate !== undefined ? options.speakingRate : 1.2 // Rápido
-    })
+    }, { idempotencyKey: newIdempotencyKey() })
 
     if (res?.audioContent) {
       return {
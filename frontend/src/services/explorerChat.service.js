@@ -2,14 +2,21 @@
  * Servicio para el manejo de chats del Explorer con persistencia en BD
  */
 
-import { api } from '../utils/api';
+import { api, newIdempotencyKey } from '../utils/api';
 
 /**
- * Lista todos los chats del usuario
- * @returns {Promise<Array>} Array de chats sin mensajes
+ * Lista los chats del usuario (paginados por cursor)
+ * @param {Object} [params]
+ * @param {string} [params.cursor] - next_cursor de la página anterior
+ * @param {number} [params.pageSize] - Tamaño de página
+ * @returns {Promise<{results: Array, next_cursor: string|null}>} Página de chats sin mensajes
  */
-export const listChats = async () => {
-  const response = await api.get('/explorer/chats');
+export const listChats = async ({ cursor, pageSize } = {}) => {
+  const query = new URLSearchParams();
+  if (cursor) query.set('cursor', cursor);
+  if (pageSize) query.set('page_size', String(pageSize));
+  const qs = query.toString();
+  const response = await api.get(`/explorer/chats${qs ? `?${qs}` : ''}`);
   return response; // api.get() devuelve directamente el JSON, no tiene .data
 };
 
@@ -32,7 +39,7 @@ export const getChat = async (chatId) => {
  * @returns {Promise<Object>} Chat creado o actualizado
  */
 export const saveChat = async (chatData) => {
-  const response = await api.post('/explorer/chats/save', chatData);
+  const response = await api.post('/explorer/chats/save', chatData, { idempotencyKey: newIdempotencyKey() });
   return response; // api.post() devuelve directamente el JSON, no tiene .data
 };
 
@@ -148,6 +155,68 @@ export const getAnimalsExplored = async () => {
   }
 };
 
+/**
+ * Lista los chats donde se habló de un animal (paginados por cursor)
+ * @param {string} animalName - Nombre del animal (como en getAnimalsExplored)
+ * @param {Object} [params]
+ * @param {string} [params.cursor] - next_cursor de la página anterior
+ * @param {number} [params.pageSize] - Tamaño de página
+ * @returns {Promise<{results: Array, next_cursor: string|null}>} Página de chats
+ */
+export const getAnimalChats = async (animalName, { cursor, pageSize } = {}) => {
+  const query = new URLSearchParams();
+  if (cursor) query.set('cursor', cursor);
+  if (pageSize) query.set('page_size', String(pageSize));
+  const qs = query.toString();
+  const response = await api.get(`/explorer/animals/${encodeURIComponent(animalName)}/chats${qs ? `?${qs}` : ''}`);
+  return response;
+};
+
+/**
+ * Importa en una sola llamada los chats que el invitado guardó en localStorage.
+ * Idempotente: el backend ignora los chats (client_id) ya importados.
+ * @returns {Promise<Object|null>} {imported, skipped, chats} o null si no había chats
+ */
+export const importGuestChats = async () => {
+  let chatList = [];
+  try {
+    chatList = JSON.parse(localStorage.getItem('fauna_chat_list') || '[]');
+  } catch {
+    return null;
+  }
+
+  const chats = chatList
+    .map(({ id }) => {
+      try {
+        const chat = JSON.parse(localStorage.getItem(`fauna_chat_${id}`) || 'null');
+        if (!chat?.messages?.length) return null;
+        return {
+          client_id: String(id),
+          title: chat.title || 'Nueva conversación',
+          created_at: new Date(chat.timestamp || Date.now()).toISOString(),
+          messages: chat.messages.map(msg => ({
+            role: msg.role,
+            message_type: msg.type === 'image' || msg.image || msg.url ? 'image' : 'text',
+            text: msg.text || '',
+            image_url: msg.url || msg.image || null,
+            image_alt: msg.alt || null
+          }))
+        };
+      } catch {
+        return null;
+      }
+    })
+    .filter(Boolean);
+
+  if (!chats.length) return null;
+
+  const response = await api.post('/explorer/chats/import', { chats });
+  chatList.forEach(({ id }) => localStorage.removeItem(`fauna_chat_${id}`));
+  localStorage.removeItem('fauna_chat_list');
+  localStorage.removeItem('fauna_current_chat_id');
+  return response;
+};
+
 export default {
   listChats,
   getChat,
@@ -157,5 +226,7 @@ export default {
   updateUserSettings,
   isGuestUser,
   generateChatTitle,
-  getAnimalsExplored
+  getAnimalsExplored,
+  getAnimalChats,
+  importGuestChats
 };
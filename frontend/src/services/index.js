@@ -1,6 +1,6 @@
 /* Barrel export para servicios */
 export { askExplorer, generateExplorerImage, textToSpeech } from './explorer.service';
-export { getUserStats, getUserProfile, getUserPreferences, updateUserPreferences, updateUserProfile, logout } from './user.service';
+export { getUserStats, getUserProfile, getDashboard, getUserPreferences, updateUserPreferences, updateUserProfile, logout } from './user.service';
 export { 
   register, 
   login, 
@@ -21,5 +21,7 @@ export {
   updateUserSettings,
   isGuestUser,
   generateChatTitle,
-  getAnimalsExplored
+  getAnimalsExplored,
+  getAnimalChats,
+  importGuestChats
 } from './explorerChat.service';
\ No newline at end of file
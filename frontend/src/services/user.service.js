@@ -38,6 +38,43 @@ export async function getUserStats() {
   }
 }
 
+/**
+ * Obtener perfil y estadísticas del dashboard en una sola llamada
+ * (null si falla: el dashboard se queda con los datos de localStorage)
+ */
+export async function getDashboard(fields = ['user', 'stats']) {
+  try {
+    const data = await api.get(`/dashboard?fields=${fields.join(',')}`);
+    const result = {};
+
+    if (data.user) {
+      localStorage.setItem('user', JSON.stringify(data.user));
+      result.profile = {
+        nick: data.user.display_name || data.user.username || 'Explorador',
+        email: data.user.email || null,
+        photoUrl: data.user.avatar_url || null,
+        initial: ((data.user.display_name || data.user.username || 'E').trim()[0]).toUpperCase()
+      };
+    }
+    if (data.stats) {
+      result.stats = {
+        totalAnimals: data.stats.total_animals || 0,
+        totalMessages: data.stats.total_messages || 0,
+        totalChats: data.stats.total_chats || 0,
+        currentStreak: data.stats.current_streak || 0,
+        achievements: []
+      };
+    }
+    if (data.animals) result.animals = data.animals;
+    if (data.chats) result.chats = data.chats;
+    if (data.settings) result.settings = data.settings;
+
+    return result;
+  } catch {
+    return null;
+  }
+}
+
 /**
  * Obtener perfil del usuario
  */
@@ -58,7 +58,28 @@ async function refreshAccessToken() {
   }
 }
 
-async function request(path, { method = 'GET', headers = {}, body } = {}) {
+// Genera una clave única para el header Idempotency-Key
+export function newIdempotencyKey() {
+  if (globalThis.crypto?.randomUUID) {
+    return globalThis.crypto.randomUUID();
+  }
+  return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
+}
+
+// fetch con reintentos ante fallos de red; solo se usa con Idempotency-Key,
+// así el backend devuelve la respuesta guardada en lugar de repetir el trabajo
+async function fetchWithRetry(url, init, retries) {
+  for (let attempt = 0; ; attempt++) {
+    try {
+      return await fetch(url, init);
+    } catch (error) {
+      if (attempt >= retries) throw error;
+      await new Promise(resolve => setTimeout(resolve, 500 * (attempt + 1)));
+    }
+  }
+}
+
+async function request(path, { method = 'GET', headers = {}, body, idempotencyKey } = {}) {
   const url = path.startsWith('http') ? path : `${API_BASE}${path}`;
   
   // Obtener token de acceso del localStorage
@@ -79,11 +100,15 @@ async function request(path, { method = 'GET', headers = {}, body } = {}) {
     init.headers['Authorization'] = `Bearer ${token}`;
   }
   
+  if (idempotencyKey) {
+    init.headers['Idempotency-Key'] = idempotencyKey;
+  }
+  
   if (body !== undefined) {
     init.body = typeof body === 'string' ? body : JSON.stringify(body);
   }
   
-  const res = await fetch(url, init);
+  const res = await fetchWithRetry(url, init, idempotencyKey ? 2 : 0);
   
   // Si el token expiró (401), intentar renovarlo
   if (res.status === 401 && !path.includes('/auth/token/refresh') && !path.includes('/auth/login') && !path.includes('/auth/register') && !path.includes('/auth/guest') && !path.includes('/auth/google')) {